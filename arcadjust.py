@@ -2,6 +2,8 @@ import bpy
 import bmesh
 import rmlib
 import mathutils
+from .modalutil import FrameBudget
+from .meshutil import MeshRegion
 
 def get_vec( v_a, v_b, face_normals ):
 	avg_nml = mathutils.Vector( ( 0.0, 0.0, 0.0 ) )
@@ -239,10 +241,10 @@ class MESH_OT_arcadjust( bpy.types.Operator ):
 		  context.tool_settings.mesh_select_mode[:][1] )
 
 	def cleanup( self ):
-			if hasattr(self, "bmList"):
-				for bm in self.bmList:
-					bm.free()
-			self.bmList.clear()
+			if hasattr(self, "regionList"):
+				for region in self.regionList:
+					region.Free()
+				self.regionList.clear()
 			if hasattr(self, "meshList"):
 				self.meshList.clear()
 
@@ -250,38 +252,37 @@ class MESH_OT_arcadjust( bpy.types.Operator ):
 		self.cleanup()
 		
 	def execute( self, context ):
-		bpy.ops.object.mode_set( mode='OBJECT', toggle=False )
-		
-		for i, bmlistelem in enumerate( self.bmList ):
-			bm = bmlistelem.copy()
+		if not getattr( self, "regionList", None ):
+			return { 'CANCELLED' }
+
+		for i, region in enumerate( self.regionList ):
+			#adjust a copy of the faces around the selected edges
+			bm = region.Copy()
 			
 			if self.radial:
 				success = radial_arc_adjust( bm, self.scale - 1.0 )
 				if not success:
 					self.report( { 'WARNING' }, 'Radial Arc Adjust failed!!!' )
-					bpy.ops.object.mode_set( mode='EDIT', toggle=False )
 					bm.free()
 					continue
 			else:
 				result = arc_adjust( bm, self.scale )
 				if not result:
 					self.report( { 'WARNING' }, 'Arc Adjust failed!!!' )
-					bpy.ops.object.mode_set( mode='EDIT', toggle=False )
 					bm.free()
 					continue
 
-			targetMesh = self.meshList[i]
-			bm.to_mesh( targetMesh )
-			bm.calc_loop_triangles()
-			targetMesh.update()
+			#stitch the result into the edit mesh
+			region.Commit( bpy.data.meshes[ self.meshList[i] ], bm )
 			bm.free()
 		
-		bpy.ops.object.mode_set( mode='EDIT', toggle=False )
-		
 		return { 'FINISHED' }
 
 	def modal( self, context, event ):
 		if event.type == 'LEFTMOUSE':
+			if self._budget.pending:
+				self.execute( context )
+			self._budget.Stop( context )
 			return { 'FINISHED' }
 		elif event.type == 'RIGHTMOUSE':
 			if event.value == 'RELEASE':
@@ -290,15 +291,25 @@ class MESH_OT_arcadjust( bpy.types.Operator ):
 			delta_x = float( event.mouse_x - event.mouse_prev_press_x ) / context.region.width
 			#delta_y = float( event.mouse_prev_press_y - event.mouse_y ) / context.region.height
 			self.scale = 1.0 + ( delta_x * 4.0 )
-			self.execute( context )			
+			if self._budget.Poll( event ):
+				self.execute( context )
+		elif event.type == 'TIMER':
+			if self._budget.Poll( event ):
+				self.execute( context )
 		elif event.type == 'ESC':
+			self._budget.Stop( context )
+			for region, name in zip( self.regionList, self.meshList ):
+				region.Revert( bpy.data.meshes[ name ] )
+			self.cleanup()
 			return { 'CANCELLED' }
 
 		return { 'RUNNING_MODAL' }
 	
 	def invoke( self, context, event ):
+		#the regions of the previous run are kept for redo until now
+		self.cleanup()
 		self.meshList = []
-		self.bmList = []
+		self.regionList = []
 
 		includes_invalid_selection = False
 
@@ -316,14 +327,18 @@ class MESH_OT_arcadjust( bpy.types.Operator ):
 						break
 
 
-				rmmesh.readme = True
-				self.meshList.append( rmmesh.mesh )
-				self.bmList.append( rmmesh.bmesh.copy() )
+				rmmesh.readonly = True
+				#by name, an undo before a redo can reload the mesh datablocks
+				self.meshList.append( rmmesh.mesh.name )
+				self.regionList.append( MeshRegion( rmmesh.bmesh, [], edges ) )
 
 		if includes_invalid_selection:
 			self.report( { 'WARNING' }, 'Includes invalid edge selection. Selected loops must not be closed ang be longer than 2 edges each.' )
+			self.cleanup()
 			return { 'CANCELLED' }
-				
+
+		self._budget = FrameBudget()
+		self._budget.Start( context )
 		context.window_manager.modal_handler_add( self )
 		return { 'RUNNING_MODAL' }
 
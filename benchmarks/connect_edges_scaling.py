@@ -0,0 +1,103 @@
+"""
+Scaling benchmark for the Connect Edges element registry.
+
+Builds a two column strip of quads, selects the ring of edges that runs down the strip and times
+how long Connect Edges takes to build its CEVert/CEEdge/CEPoly structure for rings of increasing
+length. The registry lookups are constant time, so the time per selected edge should stay flat as
+the ring grows.
+
+Usage:
+	blender --background --factory-startup --python benchmarks/connect_edges_scaling.py -- [options]
+
+	--edges 250,1000,4000,16000    selected edge counts to measure
+	--repeat 3                     builds per count, the fastest one is reported
+	--json out.json                also write the results as json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+
+import bpy
+import bmesh
+
+sys.path.insert( 0, os.path.dirname( os.path.abspath( __file__ ) ) )
+import modal_replay
+
+
+def build_strip( rows ):
+	if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+		bpy.ops.object.mode_set( mode='OBJECT' )
+	for obj in list( bpy.data.objects ):
+		bpy.data.objects.remove( obj, do_unlink=True )
+
+	mesh = bpy.data.meshes.new( 'ScalingStrip' )
+	bm = bmesh.new()
+	bmesh.ops.create_grid( bm, x_segments=2, y_segments=rows, size=1.0 )
+	bm.to_mesh( mesh )
+	bm.free()
+
+	obj = bpy.data.objects.new( 'ScalingStrip', mesh )
+	bpy.context.scene.collection.objects.link( obj )
+	bpy.context.view_layer.objects.active = obj
+	obj.select_set( True )
+	bpy.ops.object.mode_set( mode='EDIT' )
+
+	#the horizontal edges of the left column form a ring of rows + 1 edges
+	modal_replay.select( obj, 'EDGE', lambda e : abs( e.verts[ 0 ].co.y - e.verts[ 1 ].co.y ) < 1e-6 and min( e.verts[ 0 ].co.x, e.verts[ 1 ].co.x ) < 0.0 <= max( e.verts[ 0 ].co.x, e.verts[ 1 ].co.x ) )
+	return obj
+
+
+def measure( mod, rmlib, edge_count, repeat ):
+	build_strip( edge_count - 1 )
+	best = float( 'inf' )
+	polygons = 0
+	for i in range( repeat ):
+		rmmesh = rmlib.rmMesh.GetActive( bpy.context )
+		with rmmesh as rmmesh:
+			rmmesh.readonly = True
+			cem = mod.CEMesh( rmmesh.object )
+			start = time.perf_counter()
+			cem.BuildFromSelection( rmmesh.bmesh )
+			best = min( best, time.perf_counter() - start )
+			polygons = len( cem.polygons )
+			cem.Free()
+	return { 'edges' : edge_count, 'polygons' : polygons, 'build_ms' : best * 1000.0, 'us_per_edge' : best * 1e6 / edge_count }
+
+
+def parse_args():
+	argv = sys.argv[ sys.argv.index( '--' ) + 1 : ] if '--' in sys.argv else []
+	parser = argparse.ArgumentParser( description='Measure how the Connect Edges structure build scales with the selection.' )
+	parser.add_argument( '--edges', default='250,1000,4000,16000' )
+	parser.add_argument( '--repeat', type=int, default=3 )
+	parser.add_argument( '--json', default=None )
+	return parser.parse_args( argv )
+
+
+def main():
+	args = parse_args()
+	modal_replay.load_addon()
+	mod = importlib.import_module( modal_replay.ADDON_NAME + '.connect_edges' )
+	rmlib = importlib.import_module( 'rmlib' )
+
+	results = []
+	print( '{:>8} {:>8} {:>10} {:>10} {:>8}'.format( 'edges', 'polys', 'build ms', 'us/edge', 'growth' ) )
+	prev = None
+	for count in [ int( c ) for c in args.edges.split( ',' ) ]:
+		r = measure( mod, rmlib, count, args.repeat )
+		#time ratio against the previous count divided by the edge ratio, ~1.0 for linear scaling
+		r[ 'growth' ] = ( r[ 'build_ms' ] / prev[ 'build_ms' ] ) / ( count / prev[ 'edges' ] ) if prev else 1.0
+		results.append( r )
+		prev = r
+		print( '{:>8} {:>8} {:>10.2f} {:>10.2f} {:>8.2f}'.format( r[ 'edges' ], r[ 'polygons' ], r[ 'build_ms' ], r[ 'us_per_edge' ], r[ 'growth' ] ) )
+
+	if args.json:
+		with open( args.json, 'w' ) as f:
+			json.dump( results, f, indent=2 )
+
+
+if __name__ == '__main__':
+	main()
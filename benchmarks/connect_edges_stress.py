@@ -0,0 +1,372 @@
+"""
+Stress test and benchmark for Connect Edges on pathological topology.
+
+Procedurally builds meshes that have been slow or broken for Connect Edges, selects edges on them
+and runs the tool the way the operator does: CEMesh.BuildFromSelection walks the selection with
+AccumulateCEElem once, then CEMesh.ConnectEdges builds and commits the topology for every level.
+After each level the edit mesh is checked and then reverted for the next level.
+
+	ngons       grid of 8-gon cells with two crossing rings, one joint is an n-gon
+	poles       uv sphere, every spoke of the top pole plus a meridian ring from pole to pole
+	boundary    open grid, a half ring starting on the boundary, a full ring crossing it and a
+	            run of boundary edges
+	long_ring   two column strip with one ring down its whole length
+
+The checks on the result:
+	- every selected edge gained exactly level verts
+	- no edge has more than two faces and no wire edges were created
+	- the two faces of every inner edge are wound consistently
+	- no face is degenerate and the total area is unchanged
+	- the boundary grew by level edges for every selected boundary edge
+	- reverting gives back the original counts
+
+Timing covers BuildFromSelection once per mesh and ConnectEdges per level. Peak memory is the
+tracemalloc peak of the Python side of a second ConnectEdges run and the peak RSS of the process.
+Runs whose selection times level is over --max-subverts are skipped and listed as such. The exit
+code is 1 if any check failed.
+
+Usage:
+	blender --background --factory-startup --python benchmarks/connect_edges_stress.py -- [options]
+
+	--topologies ngons,poles,boundary,long_ring
+	--faces 1000,10000,100000,1000000    approximate face counts
+	--levels 1-4,8,16,32,64              levels to connect, ranges are inclusive
+	--max-subverts 1000000               skip runs that would create more verts than this
+	--no-memory                          skip the tracemalloc pass
+	--json out.json                      also write the results as json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import importlib
+import tracemalloc
+
+import bpy
+import bmesh
+
+sys.path.insert( 0, os.path.dirname( os.path.abspath( __file__ ) ) )
+import modal_replay
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+AREA_TOLERANCE = 1e-4
+
+
+def link_object( bm, name ):
+	#bm has its selection set, write it to a new object and enter edge select edit mode
+	if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+		bpy.ops.object.mode_set( mode='OBJECT' )
+	for obj in list( bpy.data.objects ):
+		bpy.data.objects.remove( obj, do_unlink=True )
+	for mesh in list( bpy.data.meshes ):
+		if mesh.users == 0:
+			bpy.data.meshes.remove( mesh )
+
+	bm.select_mode = { 'EDGE' }
+	bm.select_flush_mode()
+	mesh = bpy.data.meshes.new( name )
+	bm.to_mesh( mesh )
+	bm.free()
+
+	obj = bpy.data.objects.new( name, mesh )
+	bpy.context.scene.collection.objects.link( obj )
+	bpy.context.view_layer.objects.active = obj
+	obj.select_set( True )
+	bpy.context.tool_settings.mesh_select_mode = ( False, True, False )
+	bpy.ops.object.mode_set( mode='EDIT' )
+	return obj
+
+
+def is_horizontal( e ):
+	return abs( e.verts[ 0 ].co.y - e.verts[ 1 ].co.y ) < 1e-6
+
+
+def is_vertical( e ):
+	return abs( e.verts[ 0 ].co.x - e.verts[ 1 ].co.x ) < 1e-6
+
+
+def crosses_x( e, x ):
+	a, b = e.verts[ 0 ].co.x, e.verts[ 1 ].co.x
+	return min( a, b ) < x <= max( a, b )
+
+
+def crosses_y( e, y ):
+	a, b = e.verts[ 0 ].co.y, e.verts[ 1 ].co.y
+	return min( a, b ) < y <= max( a, b )
+
+
+def build_ngons( faces ):
+	#cells of three quads merged into 8-gons, a ring down the middle column crossing a ring along the middle row
+	cells = max( 3, int( math.sqrt( faces ) ) )
+	split = 3
+	bm = bmesh.new()
+	bmesh.ops.create_grid( bm, x_segments=cells * split, y_segments=cells, size=1.0 )
+	step_x = 2.0 / ( cells * split )
+	step_y = 2.0 / cells
+	inner = [ e for e in bm.edges if is_vertical( e ) and round( ( e.verts[ 0 ].co.x + 1.0 ) / step_x ) % split != 0 ]
+	bmesh.ops.dissolve_edges( bm, edges=inner, use_verts=False )
+
+	x = -1.0 + step_x * ( ( cells // 2 ) * split + 0.5 )
+	y = -1.0 + step_y * ( cells // 2 + 0.5 )
+	for e in bm.edges:
+		e.select = ( is_horizontal( e ) and crosses_x( e, x ) ) or ( is_vertical( e ) and crosses_y( e, y ) )
+	return link_object( bm, 'StressNgons' )
+
+
+def build_poles( faces ):
+	#the poles have one spoke per meridian, sqrt( faces ) of them
+	u_segments = max( 6, int( math.sqrt( faces ) ) )
+	v_segments = max( 3, faces // u_segments )
+	bm = bmesh.new()
+	bmesh.ops.create_uvsphere( bm, u_segments=u_segments, v_segments=v_segments, radius=1.0 )
+
+	top = max( v.co.z for v in bm.verts )
+	latitude = [ e for e in bm.edges if abs( e.verts[ 0 ].co.z - e.verts[ 1 ].co.z ) < 1e-6 ]
+	def azimuth( e ):
+		mid = ( e.verts[ 0 ].co + e.verts[ 1 ].co ) * 0.5
+		return math.atan2( mid.y, mid.x )
+	sector = azimuth( latitude[ 0 ] )
+	half_width = math.pi / u_segments
+	for e in latitude:
+		delta = ( azimuth( e ) - sector + math.pi ) % ( 2.0 * math.pi ) - math.pi
+		e.select = abs( delta ) < half_width
+	for e in bm.edges:
+		if any( v.co.z > top - 1e-6 for v in e.verts ):
+			e.select = True
+	return link_object( bm, 'StressPoles' )
+
+
+def build_boundary( faces ):
+	size = max( 4, int( math.sqrt( faces ) ) )
+	bm = bmesh.new()
+	bmesh.ops.create_grid( bm, x_segments=size, y_segments=size, size=1.0 )
+	step = 2.0 / size
+	x = -1.0 + step * ( size // 2 + 0.5 )
+	y = -1.0 + step * ( size // 4 + 0.5 )
+	for e in bm.edges:
+		half_ring = is_horizontal( e ) and crosses_x( e, x ) and e.verts[ 0 ].co.y < 0.0
+		full_ring = is_vertical( e ) and crosses_y( e, y )
+		border = is_vertical( e ) and e.verts[ 0 ].co.x < -1.0 + 1e-6 and e.verts[ 0 ].co.y > 0.0
+		e.select = half_ring or full_ring or border
+	return link_object( bm, 'StressBoundary' )
+
+
+def build_long_ring( faces ):
+	rows = max( 2, faces // 2 )
+	bm = bmesh.new()
+	bmesh.ops.create_grid( bm, x_segments=2, y_segments=rows, size=1.0 )
+	for e in bm.edges:
+		e.select = is_horizontal( e ) and crosses_x( e, 0.0 )
+	return link_object( bm, 'StressLongRing' )
+
+
+TOPOLOGIES = {
+	'ngons' : build_ngons,
+	'poles' : build_poles,
+	'boundary' : build_boundary,
+	'long_ring' : build_long_ring,
+}
+
+
+def peak_rss_mb():
+	if resource is None:
+		return None
+	rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+	#bytes on macos, kilobytes everywhere else
+	return rss / ( 1024.0 * 1024.0 ) if sys.platform == 'darwin' else rss / 1024.0
+
+
+def mesh_stats( bm ):
+	return {
+		'verts' : len( bm.verts ),
+		'edges' : len( bm.edges ),
+		'faces' : len( bm.faces ),
+		'boundary' : sum( 1 for e in bm.edges if e.is_boundary ),
+		'area' : sum( f.calc_area() for f in bm.faces ),
+		'selected' : sum( 1 for e in bm.edges if e.select ),
+		'selected_boundary' : sum( 1 for e in bm.edges if e.select and e.is_boundary ),
+	}
+
+
+def verify( bm, before, level ):
+	#returns a list of what is wrong with the connected edit mesh
+	errors = []
+	expected = before[ 'verts' ] + before[ 'selected' ] * level
+	if len( bm.verts ) != expected:
+		errors.append( 'verts {} expected {}'.format( len( bm.verts ), expected ) )
+
+	nonmanifold = 0
+	wire = 0
+	flipped = 0
+	boundary = 0
+	for e in bm.edges:
+		count = len( e.link_loops )
+		if count == 0:
+			wire += 1
+		elif count == 1:
+			boundary += 1
+		elif count > 2:
+			nonmanifold += 1
+		elif e.link_loops[ 0 ].vert == e.link_loops[ 1 ].vert:
+			flipped += 1
+	if nonmanifold:
+		errors.append( '{} edges with more than two faces'.format( nonmanifold ) )
+	if wire:
+		errors.append( '{} wire edges'.format( wire ) )
+	if flipped:
+		errors.append( '{} edges between faces of opposite winding'.format( flipped ) )
+	expected = before[ 'boundary' ] + before[ 'selected_boundary' ] * level
+	if boundary != expected:
+		errors.append( 'boundary edges {} expected {}'.format( boundary, expected ) )
+
+	degenerate = 0
+	area = 0.0
+	for f in bm.faces:
+		verts = f.verts
+		face_area = f.calc_area()
+		if len( verts ) < 3 or len( set( verts ) ) != len( verts ) or face_area <= 0.0:
+			degenerate += 1
+		area += face_area
+	if degenerate:
+		errors.append( '{} degenerate faces'.format( degenerate ) )
+	drift = abs( area - before[ 'area' ] ) / max( before[ 'area' ], 1e-12 )
+	if drift > AREA_TOLERANCE:
+		errors.append( 'area changed by {:.2e}'.format( drift ) )
+	return errors
+
+
+def verify_reverted( bm, before ):
+	after = ( len( bm.verts ), len( bm.edges ), len( bm.faces ) )
+	expected = ( before[ 'verts' ], before[ 'edges' ], before[ 'faces' ] )
+	if after != expected:
+		return [ 'revert left {} verts/edges/faces, expected {}'.format( after, expected ) ]
+	return []
+
+
+def run_topology( mod, rmlib, name, faces, levels, args ):
+	obj = TOPOLOGIES[ name ]( faces )
+	before = mesh_stats( bmesh.from_edit_mesh( obj.data ) )
+
+	rmmesh = rmlib.rmMesh.GetActive( bpy.context )
+	with rmmesh as rmmesh:
+		rmmesh.readonly = True
+		cem = mod.CEMesh( rmmesh.object )
+		start = time.perf_counter()
+		built = cem.BuildFromSelection( rmmesh.bmesh )
+		build_ms = ( time.perf_counter() - start ) * 1000.0
+
+	results = []
+	base = { 'topology' : name, 'faces' : before[ 'faces' ], 'selected' : before[ 'selected' ], 'polygons' : len( cem.polygons ), 'build_ms' : build_ms }
+	if not built:
+		results.append( dict( base, level=None, errors=[ 'nothing to connect' ] ) )
+		cem.Free()
+		return results
+
+	for level in levels:
+		r = dict( base, level=level )
+		if before[ 'selected' ] * level > args.max_subverts:
+			r[ 'skipped' ] = True
+			results.append( r )
+			continue
+
+		try:
+			start = time.perf_counter()
+			cem.ConnectEdges( level, 0.0, 1.0 )
+			r[ 'connect_ms' ] = ( time.perf_counter() - start ) * 1000.0
+
+			bm = bmesh.from_edit_mesh( obj.data )
+			r[ 'result_faces' ] = len( bm.faces )
+			r[ 'errors' ] = verify( bm, before, level )
+			cem.Revert()
+
+			if not args.no_memory:
+				tracemalloc.start()
+				cem.ConnectEdges( level, 0.0, 1.0 )
+				r[ 'py_peak_mb' ] = tracemalloc.get_traced_memory()[ 1 ] / ( 1024.0 * 1024.0 )
+				tracemalloc.stop()
+				cem.Revert()
+			r[ 'rss_peak_mb' ] = peak_rss_mb()
+
+			r[ 'errors' ] += verify_reverted( bmesh.from_edit_mesh( obj.data ), before )
+		except Exception as e:
+			if tracemalloc.is_tracing():
+				tracemalloc.stop()
+			r[ 'errors' ] = r.get( 'errors', [] ) + [ '{}: {}'.format( type( e ).__name__, e ) ]
+			results.append( r )
+			break
+		results.append( r )
+
+	cem.Free()
+	return results
+
+
+def parse_levels( text ):
+	levels = []
+	for part in text.split( ',' ):
+		if '-' in part:
+			first, last = part.split( '-' )
+			levels += range( int( first ), int( last ) + 1 )
+		else:
+			levels.append( int( part ) )
+	return levels
+
+
+def parse_args():
+	argv = sys.argv[ sys.argv.index( '--' ) + 1 : ] if '--' in sys.argv else []
+	parser = argparse.ArgumentParser( description='Run Connect Edges on pathological topology, check the results and time them.' )
+	parser.add_argument( '--topologies', default=','.join( TOPOLOGIES ) )
+	parser.add_argument( '--faces', default='1000,10000,100000,1000000' )
+	parser.add_argument( '--levels', default='1-4,8,16,32,64' )
+	parser.add_argument( '--max-subverts', type=int, default=1000000 )
+	parser.add_argument( '--no-memory', action='store_true' )
+	parser.add_argument( '--json', default=None )
+	return parser.parse_args( argv )
+
+
+def main():
+	args = parse_args()
+	modal_replay.load_addon()
+	mod = importlib.import_module( modal_replay.ADDON_NAME + '.connect_edges' )
+	rmlib = importlib.import_module( 'rmlib' )
+	levels = parse_levels( args.levels )
+
+	results = []
+	failed = 0
+	print( '{:<10} {:>8} {:>7} {:>6} {:>9} {:>11} {:>9} {:>9}  {}'.format( 'topology', 'faces', 'sel', 'level', 'build ms', 'connect ms', 'py mb', 'rss mb', 'result' ) )
+	for name in args.topologies.split( ',' ):
+		for faces in [ int( f ) for f in args.faces.split( ',' ) ]:
+			for r in run_topology( mod, rmlib, name, faces, levels, args ):
+				results.append( r )
+				if r.get( 'skipped' ):
+					status = 'skipped'
+				elif r[ 'errors' ]:
+					status = 'FAIL ' + '; '.join( r[ 'errors' ] )
+					failed += 1
+				else:
+					status = 'ok'
+				print( '{:<10} {:>8} {:>7} {:>6} {:>9.1f} {:>11} {:>9} {:>9}  {}'.format(
+					r[ 'topology' ], r[ 'faces' ], r[ 'selected' ], str( r[ 'level' ] ), r[ 'build_ms' ],
+					'{:.1f}'.format( r[ 'connect_ms' ] ) if 'connect_ms' in r else '-',
+					'{:.1f}'.format( r[ 'py_peak_mb' ] ) if 'py_peak_mb' in r else '-',
+					'{:.0f}'.format( r[ 'rss_peak_mb' ] ) if r.get( 'rss_peak_mb' ) is not None else '-',
+					status ) )
+
+	if args.json:
+		with open( args.json, 'w' ) as f:
+			json.dump( results, f, indent=2 )
+
+	if failed:
+		print( '{} runs failed'.format( failed ) )
+		sys.exit( 1 )
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,414 @@
+"""
+Headless replay benchmark for the rmKit modal tools.
+
+Builds a synthetic grid mesh, selects the elements each tool expects and drives the operator's
+invoke/modal with a scripted event stream through a stub context. Reports per event latency
+percentiles for every tool so regressions in the interactive hot paths show up without a human
+moving the mouse.
+
+Usage:
+	blender --background --factory-startup --python benchmarks/modal_replay.py -- [options]
+
+	--tools falloff,connect_edges,create_tube,thicken,arc_adjust
+	--size 64          grid segments per side (faces = size * size)
+	--moves 200        mouse moves per drag
+	--budget-hz 0      frame budget for the tools, 0 disables coalescing so every move updates
+	--event-hz 0       pace events at this rate, 0 sends them back to back
+	--json out.json    also write the results as json
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import argparse
+import importlib
+
+import bpy
+import bmesh
+import mathutils
+
+
+ADDON_DIR = os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) )
+ADDON_NAME = os.path.basename( ADDON_DIR )
+
+REGION_WIDTH = 1920
+REGION_HEIGHT = 1080
+
+
+def load_addon():
+	sys.path.insert( 0, os.path.dirname( ADDON_DIR ) )
+	addon = importlib.import_module( ADDON_NAME )
+	addon.register()
+	return addon
+
+
+class StubRegionView3D():
+	#perspective view looking at the origin from the front right
+	def __init__( self, eye=( 6.0, -8.0, 6.0 ), target=( 0.0, 0.0, 0.0 ), lens_fov=math.radians( 50.0 ) ):
+		eye = mathutils.Vector( eye )
+		target = mathutils.Vector( target )
+		self.view_rotation = ( target - eye ).to_track_quat( '-Z', 'Y' )
+		self.view_location = target
+		self.view_distance = ( target - eye ).length
+		self.view_matrix = ( mathutils.Matrix.Translation( eye ) @ self.view_rotation.to_matrix().to_4x4() ).inverted()
+		self.window_matrix = self.__projection( lens_fov, REGION_WIDTH / REGION_HEIGHT, 0.01, 1000.0 )
+		self.perspective_matrix = self.window_matrix @ self.view_matrix
+		self.is_perspective = True
+		self.view_perspective = 'PERSP'
+
+	@staticmethod
+	def __projection( fov, aspect, near, far ):
+		f = 1.0 / math.tan( fov * 0.5 )
+		return mathutils.Matrix( ( ( f / aspect, 0.0, 0.0, 0.0 ),
+								( 0.0, f, 0.0, 0.0 ),
+								( 0.0, 0.0, ( far + near ) / ( near - far ), ( 2.0 * far * near ) / ( near - far ) ),
+								( 0.0, 0.0, -1.0, 0.0 ) ) )
+
+
+class StubSpace():
+	def __init__( self, rv3d ):
+		self.type = 'VIEW_3D'
+		self.region_3d = rv3d
+
+
+class StubSpaces():
+	def __init__( self, space ):
+		self.active = space
+
+
+class StubArea():
+	def __init__( self, rv3d ):
+		self.type = 'VIEW_3D'
+		self.width = REGION_WIDTH
+		self.height = REGION_HEIGHT
+		self.spaces = StubSpaces( StubSpace( rv3d ) )
+
+	def tag_redraw( self ):
+		pass
+
+
+class StubRegion():
+	def __init__( self ):
+		self.type = 'WINDOW'
+		self.width = REGION_WIDTH
+		self.height = REGION_HEIGHT
+		self.x = 0
+		self.y = 0
+
+
+class StubWindowManager():
+	def modal_handler_add( self, op ):
+		return True
+
+	def event_timer_add( self, time_step, window=None ):
+		return object()
+
+	def event_timer_remove( self, timer ):
+		pass
+
+
+class StubWorkspace():
+	def status_text_set( self, text=None ):
+		pass
+
+
+class StubAddon():
+	def __init__( self, prefs ):
+		self.preferences = prefs
+
+
+class StubPreferences():
+	#the add-on is imported rather than enabled, so serve its preference defaults
+	def __init__( self ):
+		self.__addons = {}
+		prefs_cls = importlib.import_module( ADDON_NAME + '.preferences' ).RMKITPreferences
+		self.__addons[ ADDON_NAME ] = StubAddon( StubOperatorProps( prefs_cls ) )
+
+	@property
+	def addons( self ):
+		return self.__addons
+
+	def __getattr__( self, name ):
+		return getattr( bpy.context.preferences, name )
+
+
+class StubContext():
+	"""
+	Stands in for the bpy.context a modal operator sees inside a 3d viewport. View related members
+	are stubbed, everything else forwards to the real context.
+	"""
+	def __init__( self ):
+		self.region_data = StubRegionView3D()
+		self.area = StubArea( self.region_data )
+		self.region = StubRegion()
+		self.window = None
+		self.window_manager = StubWindowManager()
+		self.workspace = StubWorkspace()
+		self.preferences = StubPreferences()
+
+	def __getattr__( self, name ):
+		return getattr( bpy.context, name )
+
+
+class StubEvent():
+	def __init__( self, type, value='PRESS', x=0, y=0, press_x=0, press_y=0, shift=False, ctrl=False, alt=False ):
+		self.type = type
+		self.value = value
+		self.mouse_x = x
+		self.mouse_y = y
+		self.mouse_region_x = x
+		self.mouse_region_y = y
+		self.mouse_prev_press_x = press_x
+		self.mouse_prev_press_y = press_y
+		self.shift = shift
+		self.ctrl = ctrl
+		self.alt = alt
+		self.oskey = False
+
+
+def StubOperatorProps( cls ):
+	#plain object carrying the defaults of a bpy.props annotated class
+	props = type( 'Props', (), {} )()
+	for name, prop in getattr( cls, '__annotations__', {} ).items():
+		keywords = getattr( prop, 'keywords', {} )
+		setattr( props, name, keywords.get( 'default', None ) )
+	return props
+
+
+def make_operator( cls, **props ):
+	"""
+	Registered operator classes can't be instanced outside of Blender's operator system, so build a
+	plain class that carries the same methods and the bpy.props defaults as instance attributes.
+	"""
+	namespace = { k : v for k, v in cls.__dict__.items() if not k.startswith( '__' ) or k.startswith( '_' + cls.__name__ ) }
+	namespace[ 'report' ] = lambda self, level, msg : print( '  [{}] {}'.format( ', '.join( level ), msg ) )
+	replay_cls = type( 'Replay_' + cls.__name__, (), namespace )
+	op = replay_cls()
+	defaults = StubOperatorProps( cls )
+	for name, value in vars( defaults ).items():
+		setattr( op, name, value )
+	for name, value in props.items():
+		setattr( op, name, value )
+	return op
+
+
+def build_grid( size ):
+	if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+		bpy.ops.object.mode_set( mode='OBJECT' )
+	for obj in list( bpy.data.objects ):
+		bpy.data.objects.remove( obj, do_unlink=True )
+
+	mesh = bpy.data.meshes.new( 'ReplayGrid' )
+	bm = bmesh.new()
+	bmesh.ops.create_grid( bm, x_segments=size, y_segments=size, size=2.0 )
+	bm.to_mesh( mesh )
+	bm.free()
+
+	obj = bpy.data.objects.new( 'ReplayGrid', mesh )
+	bpy.context.scene.collection.objects.link( obj )
+	bpy.context.view_layer.objects.active = obj
+	obj.select_set( True )
+	bpy.ops.object.mode_set( mode='EDIT' )
+	return obj
+
+
+def select( obj, mode, predicate ):
+	#select elements of the edit mesh in the given mode. predicate gets the element.
+	tool_settings = bpy.context.tool_settings
+	tool_settings.mesh_select_mode = ( mode == 'VERT', mode == 'EDGE', mode == 'FACE' )
+	bm = bmesh.from_edit_mesh( obj.data )
+	for f in bm.faces:
+		f.select = False
+	for e in bm.edges:
+		e.select = False
+	for v in bm.verts:
+		v.select = False
+	elems = { 'VERT' : bm.verts, 'EDGE' : bm.edges, 'FACE' : bm.faces }[ mode ]
+	for elem in elems:
+		if predicate( elem ):
+			elem.select = True
+	bm.select_flush_mode()
+	bmesh.update_edit_mesh( obj.data )
+
+
+def drag( moves, start, end, **mods ):
+	#mouse moves from start to end in region space
+	events = []
+	for i in range( 1, moves + 1 ):
+		t = i / moves
+		x = int( start[ 0 ] + ( end[ 0 ] - start[ 0 ] ) * t )
+		y = int( start[ 1 ] + ( end[ 1 ] - start[ 1 ] ) * t )
+		events.append( StubEvent( 'MOUSEMOVE', 'NOTHING', x, y, start[ 0 ], start[ 1 ], **mods ) )
+	return events
+
+
+CENTER = ( REGION_WIDTH // 2, REGION_HEIGHT // 2 )
+
+
+def falloff_script( obj, moves ):
+	select( obj, 'VERT', lambda v : True )
+	mod = importlib.import_module( ADDON_NAME + '.linear_deformer' )
+	op = make_operator( mod.MESH_OT_Linear_Deformer, min_wld_pos=( -2.0, 0.0, 0.0 ), max_wld_pos=( 2.0, 0.0, 0.0 ) )
+
+	far = ( CENTER[ 0 ] + 300, CENTER[ 1 ] + 200 )
+	events = []
+	for key in ( 'G', 'S', 'R' ):
+		events.append( StubEvent( key, 'PRESS', CENTER[ 0 ] + 40, CENTER[ 1 ] + 40 ) )
+		events += drag( moves, ( CENTER[ 0 ] + 40, CENTER[ 1 ] + 40 ), far )
+		events.append( StubEvent( 'LEFTMOUSE', 'RELEASE', far[ 0 ], far[ 1 ] ) )
+	events.append( StubEvent( 'Z', 'PRESS', far[ 0 ], far[ 1 ], ctrl=True ) )
+	events.append( StubEvent( 'Z', 'PRESS', far[ 0 ], far[ 1 ], ctrl=True, shift=True ) )
+	events.append( StubEvent( 'ESC', 'PRESS', far[ 0 ], far[ 1 ] ) )
+	return op, StubEvent( 'NONE', 'NOTHING', CENTER[ 0 ], CENTER[ 1 ] ), events
+
+
+def connect_edges_script( obj, moves ):
+	#a ring of edges across the middle column of the grid
+	select( obj, 'EDGE', lambda e : abs( e.verts[ 0 ].co.y - e.verts[ 1 ].co.y ) < 1e-6 and min( e.verts[ 0 ].co.x, e.verts[ 1 ].co.x ) < 0.0 <= max( e.verts[ 0 ].co.x, e.verts[ 1 ].co.x ) )
+	mod = importlib.import_module( ADDON_NAME + '.connect_edges' )
+	op = make_operator( mod.MESH_OT_connect_edge )
+
+	events = drag( moves, CENTER, ( CENTER[ 0 ] + 400, CENTER[ 1 ] ), shift=True )
+	events += drag( moves, CENTER, ( CENTER[ 0 ] + 400, CENTER[ 1 ] + 200 ), ctrl=True )
+	events += [ StubEvent( 'WHEELUPMOUSE', 'PRESS', CENTER[ 0 ], CENTER[ 1 ] ) for i in range( 8 ) ]
+	events += [ StubEvent( 'WHEELDOWNMOUSE', 'PRESS', CENTER[ 0 ], CENTER[ 1 ] ) for i in range( 4 ) ]
+	events.append( StubEvent( 'LEFTMOUSE', 'PRESS', CENTER[ 0 ], CENTER[ 1 ] ) )
+	return op, StubEvent( 'NONE', 'NOTHING', CENTER[ 0 ], CENTER[ 1 ] ), events
+
+
+def edge_row( e ):
+	#an open chain of edges along the middle row of the grid
+	return abs( e.verts[ 0 ].co.y ) < 1e-6 and abs( e.verts[ 1 ].co.y ) < 1e-6
+
+
+def create_tube_script( obj, moves ):
+	select( obj, 'EDGE', edge_row )
+	mod = importlib.import_module( ADDON_NAME + '.createtube' )
+	op = make_operator( mod.MESH_OT_createtube )
+
+	events = drag( moves, CENTER, ( CENTER[ 0 ] + 300, CENTER[ 1 ] ) )
+	events.append( StubEvent( 'LEFTMOUSE', 'PRESS', CENTER[ 0 ] + 300, CENTER[ 1 ] ) )
+	return op, StubEvent( 'NONE', 'NOTHING', CENTER[ 0 ], CENTER[ 1 ] ), events
+
+
+def thicken_script( obj, moves ):
+	select( obj, 'FACE', lambda f : True )
+	mod = importlib.import_module( ADDON_NAME + '.thicken' )
+	op = make_operator( mod.MESH_OT_thicken )
+
+	events = drag( moves, CENTER, ( CENTER[ 0 ] + 300, CENTER[ 1 ] ) )
+	events.append( StubEvent( 'LEFTMOUSE', 'PRESS', CENTER[ 0 ] + 300, CENTER[ 1 ] ) )
+	return op, StubEvent( 'NONE', 'NOTHING', CENTER[ 0 ], CENTER[ 1 ] ), events
+
+
+def arc_adjust_script( obj, moves ):
+	#arc adjust needs a curved chain so bend the grid into a shallow arc first
+	bm = bmesh.from_edit_mesh( obj.data )
+	for v in bm.verts:
+		v.co.z = 0.5 * math.cos( v.co.x * math.pi * 0.25 )
+	bmesh.update_edit_mesh( obj.data )
+	select( obj, 'EDGE', edge_row )
+	mod = importlib.import_module( ADDON_NAME + '.arcadjust' )
+	op = make_operator( mod.MESH_OT_arcadjust )
+
+	events = drag( moves, CENTER, ( CENTER[ 0 ] + 300, CENTER[ 1 ] ) )
+	events.append( StubEvent( 'RIGHTMOUSE', 'RELEASE', CENTER[ 0 ] + 300, CENTER[ 1 ] ) )
+	events += drag( moves, ( CENTER[ 0 ] + 300, CENTER[ 1 ] ), CENTER )
+	events.append( StubEvent( 'LEFTMOUSE', 'PRESS', CENTER[ 0 ], CENTER[ 1 ] ) )
+	return op, StubEvent( 'NONE', 'NOTHING', CENTER[ 0 ], CENTER[ 1 ] ), events
+
+
+SCRIPTS = {
+	'falloff' : falloff_script,
+	'connect_edges' : connect_edges_script,
+	'create_tube' : create_tube_script,
+	'thicken' : thicken_script,
+	'arc_adjust' : arc_adjust_script,
+}
+
+
+def percentile( samples, p ):
+	if not samples:
+		return 0.0
+	ordered = sorted( samples )
+	k = ( len( ordered ) - 1 ) * p / 100.0
+	lo = int( math.floor( k ) )
+	hi = min( lo + 1, len( ordered ) - 1 )
+	return ordered[ lo ] + ( ordered[ hi ] - ordered[ lo ] ) * ( k - lo )
+
+
+def replay( name, size, moves, event_hz ):
+	obj = build_grid( size )
+	op, invoke_event, events = SCRIPTS[ name ]( obj, moves )
+	context = StubContext()
+
+	t = time.perf_counter()
+	result = op.invoke( context, invoke_event )
+	invoke_ms = ( time.perf_counter() - t ) * 1000.0
+	if 'RUNNING_MODAL' not in result:
+		return { 'tool' : name, 'faces' : len( obj.data.polygons ), 'error' : 'invoke returned {}'.format( result ) }
+
+	samples = []
+	interval = 1.0 / event_hz if event_hz > 0 else 0.0
+	for event in events:
+		if interval > 0.0:
+			time.sleep( interval )
+		t = time.perf_counter()
+		result = op.modal( context, event )
+		samples.append( ( time.perf_counter() - t ) * 1000.0 )
+		if 'RUNNING_MODAL' not in result and 'PASS_THROUGH' not in result:
+			break
+
+	bpy.ops.object.mode_set( mode='OBJECT' )
+	return {
+		'tool' : name,
+		'faces' : size * size,
+		'events' : len( samples ),
+		'invoke_ms' : invoke_ms,
+		'p50_ms' : percentile( samples, 50 ),
+		'p90_ms' : percentile( samples, 90 ),
+		'p99_ms' : percentile( samples, 99 ),
+		'max_ms' : max( samples ) if samples else 0.0,
+		'total_ms' : sum( samples ),
+	}
+
+
+def parse_args():
+	argv = sys.argv[ sys.argv.index( '--' ) + 1 : ] if '--' in sys.argv else []
+	parser = argparse.ArgumentParser( description='Replay scripted event streams through the rmKit modal tools.' )
+	parser.add_argument( '--tools', default=','.join( SCRIPTS.keys() ) )
+	parser.add_argument( '--size', type=int, default=64 )
+	parser.add_argument( '--moves', type=int, default=200 )
+	parser.add_argument( '--budget-hz', type=float, default=0.0 )
+	parser.add_argument( '--event-hz', type=float, default=0.0 )
+	parser.add_argument( '--json', default=None )
+	return parser.parse_args( argv )
+
+
+def main():
+	args = parse_args()
+	load_addon()
+
+	#0 disables coalescing so every scripted move runs the full update
+	modalutil = importlib.import_module( ADDON_NAME + '.modalutil' )
+	modalutil.FRAME_BUDGET_RATE = args.budget_hz if args.budget_hz > 0.0 else float( 'inf' )
+
+	results = []
+	print( '{:<14} {:>8} {:>7} {:>10} {:>9} {:>9} {:>9} {:>9}'.format( 'tool', 'faces', 'events', 'invoke ms', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms' ) )
+	for name in args.tools.split( ',' ):
+		r = replay( name.strip(), args.size, args.moves, args.event_hz )
+		results.append( r )
+		if 'error' in r:
+			print( '{:<14} {:>8} {}'.format( r[ 'tool' ], r[ 'faces' ], r[ 'error' ] ) )
+			continue
+		print( '{:<14} {:>8} {:>7} {:>10.2f} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}'.format( r[ 'tool' ], r[ 'faces' ], r[ 'events' ], r[ 'invoke_ms' ], r[ 'p50_ms' ], r[ 'p90_ms' ], r[ 'p99_ms' ], r[ 'max_ms' ] ) )
+
+	if args.json:
+		with open( args.json, 'w' ) as f:
+			json.dump( results, f, indent=2 )
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,156 @@
+"""
+Benchmark for the region extraction used by the modal mesh tools.
+
+Builds a large grid, selects a ring of edges across it and compares what one modal update of
+Connect Edges costs against what it cost when every update worked on a copy of the whole mesh.
+The whole mesh path is timed as a bm.copy() of the edit mesh plus the to_mesh() that wrote it
+back, a lower bound since the object/edit mode toggles around it are left out. The region path is
+the real operator: MeshRegion.Copy(), the connect, Splice() into the edit mesh and the edit mesh
+update. The bare edit mesh update is reported too, it is the floor of any edit mode tool.
+
+Usage:
+	blender --background --factory-startup --python benchmarks/region_splice.py -- [options]
+
+	--faces 2000000    approximate face count of the grid
+	--edges 100        length of the selected edge ring
+	--repeat 5         updates per path, the median is reported
+	--json out.json    also write the results as json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import importlib
+
+import bpy
+import bmesh
+
+sys.path.insert( 0, os.path.dirname( os.path.abspath( __file__ ) ) )
+import modal_replay
+
+
+def build_grid( faces, edges ):
+	if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+		bpy.ops.object.mode_set( mode='OBJECT' )
+	for obj in list( bpy.data.objects ):
+		bpy.data.objects.remove( obj, do_unlink=True )
+
+	size = max( edges + 1, int( math.sqrt( faces ) ) )
+	mesh = bpy.data.meshes.new( 'SpliceGrid' )
+	bm = bmesh.new()
+	bmesh.ops.create_grid( bm, x_segments=size, y_segments=size, size=1.0 )
+
+	#a ring of horizontal edges crossing the middle column, edges long, starting at the bottom row
+	step = 2.0 / size
+	bm.select_mode = { 'EDGE' }
+	for e in bm.edges:
+		a, b = e.verts[ 0 ].co, e.verts[ 1 ].co
+		if abs( a.y - b.y ) < step * 0.01 and min( a.x, b.x ) < 0.0 <= max( a.x, b.x ) and a.y < -1.0 + step * ( edges - 0.5 ):
+			e.select = True
+	bm.to_mesh( mesh )
+	bm.free()
+
+	obj = bpy.data.objects.new( 'SpliceGrid', mesh )
+	bpy.context.scene.collection.objects.link( obj )
+	bpy.context.view_layer.objects.active = obj
+	obj.select_set( True )
+	bpy.context.tool_settings.mesh_select_mode = ( False, True, False )
+	bpy.ops.object.mode_set( mode='EDIT' )
+	return obj
+
+
+def median( samples ):
+	ordered = sorted( samples )
+	return ordered[ len( ordered ) // 2 ]
+
+
+def measure_full( obj, repeat ):
+	#the old per update cost, a copy of the whole edit mesh written back with to_mesh
+	bm = bmesh.from_edit_mesh( obj.data )
+	scratch = bpy.data.meshes.new( 'SpliceScratch' )
+	samples = []
+	for i in range( repeat ):
+		t = time.perf_counter()
+		copy = bm.copy()
+		copy.to_mesh( scratch )
+		copy.free()
+		samples.append( time.perf_counter() - t )
+	bpy.data.meshes.remove( scratch )
+	return median( samples )
+
+
+def measure_edit_update( obj, repeat ):
+	samples = []
+	for i in range( repeat ):
+		t = time.perf_counter()
+		bmesh.update_edit_mesh( obj.data, loop_triangles=True, destructive=True )
+		samples.append( time.perf_counter() - t )
+	return median( samples )
+
+
+def measure_region( mod, repeat ):
+	context = modal_replay.StubContext()
+	op = modal_replay.make_operator( mod.MESH_OT_connect_edge, level=2 )
+
+	t = time.perf_counter()
+	result = op.invoke( context, modal_replay.StubEvent( 'NONE', 'NOTHING' ) )
+	invoke = time.perf_counter() - t
+	if 'RUNNING_MODAL' not in result:
+		raise RuntimeError( 'Connect Edges invoke returned {}'.format( result ) )
+	region_faces = len( op.ce_meshes[ 0 ].region )
+
+	samples = []
+	for i in range( repeat ):
+		t = time.perf_counter()
+		op.execute( context )
+		samples.append( time.perf_counter() - t )
+	op.modal( context, modal_replay.StubEvent( 'ESC' ) )
+	return invoke, median( samples ), region_faces
+
+
+def parse_args():
+	argv = sys.argv[ sys.argv.index( '--' ) + 1 : ] if '--' in sys.argv else []
+	parser = argparse.ArgumentParser( description='Compare whole mesh copies against region splicing for one modal update.' )
+	parser.add_argument( '--faces', type=int, default=2000000 )
+	parser.add_argument( '--edges', type=int, default=100 )
+	parser.add_argument( '--repeat', type=int, default=5 )
+	parser.add_argument( '--json', default=None )
+	return parser.parse_args( argv )
+
+
+def main():
+	args = parse_args()
+	modal_replay.load_addon()
+	mod = importlib.import_module( modal_replay.ADDON_NAME + '.connect_edges' )
+
+	obj = build_grid( args.faces, args.edges )
+	faces = len( obj.data.polygons )
+	selected = sum( e.select for e in bmesh.from_edit_mesh( obj.data ).edges )
+
+	full = measure_full( obj, args.repeat )
+	edit_update = measure_edit_update( obj, args.repeat )
+	invoke, region, region_faces = measure_region( mod, args.repeat )
+
+	result = {
+		'faces' : faces,
+		'selected_edges' : selected,
+		'region_faces' : region_faces,
+		'full_update_ms' : full * 1000.0,
+		'edit_update_ms' : edit_update * 1000.0,
+		'region_invoke_ms' : invoke * 1000.0,
+		'region_update_ms' : region * 1000.0,
+		'speedup' : full / region,
+	}
+	for key, value in result.items():
+		print( '{:<18} {}'.format( key, round( value, 2 ) if isinstance( value, float ) else value ) )
+
+	if args.json:
+		with open( args.json, 'w' ) as f:
+			json.dump( result, f, indent=2 )
+
+
+if __name__ == '__main__':
+	main()
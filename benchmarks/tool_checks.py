@@ -0,0 +1,322 @@
+"""
+Headless correctness checks for rmKit tool behavior that the benchmarks do not cover.
+
+Every check builds its own scene, runs the tool code the way the operator does and compares the
+result against a reference computed straight from the mesh. The exit code is 1 if any check failed.
+
+	falloff_pivot    bounding box pivot of the falloff transform on rotated objects, one object and
+	                 several, with and without numpy
+	vnorm_selset     VNorm selection set membership after Set, Set with Override, including CLEAR,
+	                 and Remove, and the migration of malformed legacy string layers
+	vnorm_live_off   switching VNorm live mode off while an update waits for the idle timer
+	redo             re-running a finished modal tool with new values after an undo, the way the
+	                 last operator panel does, twice in a row
+
+Usage:
+	blender --background --factory-startup --python benchmarks/tool_checks.py -- [options]
+
+	--checks falloff_pivot,vnorm_selset,vnorm_live_off,redo    checks to run
+"""
+
+import os
+import sys
+import argparse
+import importlib
+
+import bpy
+import bmesh
+import mathutils
+
+sys.path.insert( 0, os.path.dirname( os.path.abspath( __file__ ) ) )
+import modal_replay
+
+
+TOLERANCE = 1e-4
+
+
+def clear_scene():
+	if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+		bpy.ops.object.mode_set( mode='OBJECT' )
+	for obj in list( bpy.data.objects ):
+		bpy.data.objects.remove( obj, do_unlink=True )
+
+
+def build_rotated_spheres( count ):
+	#unevenly scaled spheres, each rotated differently. unlike a box the verts do not sit on the
+	#corners of their local bounds, so rotating the local bounds into world space gives a looser box
+	clear_scene()
+	objs = []
+	for k in range( count ):
+		mesh = bpy.data.meshes.new( 'CheckSphere{}'.format( k ) )
+		bm = bmesh.new()
+		bmesh.ops.create_icosphere( bm, subdivisions=2, radius=1.0, matrix=mathutils.Matrix.Diagonal( ( 2.0 + k, 0.5, 1.0 + k * 0.5, 1.0 ) ) )
+		bm.to_mesh( mesh )
+		bm.free()
+
+		obj = bpy.data.objects.new( 'CheckSphere{}'.format( k ), mesh )
+		obj.location = ( k * 3.0, k * -1.5, k * 0.5 )
+		obj.rotation_euler = ( 0.3 + k * 0.4, 0.7 - k * 0.2, 0.5 + k * 0.6 )
+		bpy.context.scene.collection.objects.link( obj )
+		obj.select_set( True )
+		objs.append( obj )
+
+	bpy.context.view_layer.objects.active = objs[ 0 ]
+	bpy.ops.object.mode_set( mode='EDIT' )
+	bpy.context.view_layer.update()
+	return objs
+
+
+def check_falloff_pivot( ld ):
+	errors = []
+	bpy.context.scene.tool_settings.transform_pivot_point = 'BOUNDING_BOX_CENTER'
+	luts = ld.FalloffLUTs()
+	axis = mathutils.Vector( ( 0.0, 0.0, -1.0 ) )
+	for count in ( 1, 3 ):
+		objs = build_rotated_spheres( count )
+		targets = []
+		for obj in objs:
+			bm = bmesh.from_edit_mesh( obj.data )
+			target = ld.FalloffTarget( obj, [ v.index for v in bm.verts ] )
+			targets.append( ( target, bm ) )
+
+		tool = ld.ToolState()
+		tool.start_point = mathutils.Vector( ( -20.0, 0.0, 0.0 ) )
+		tool.end_point = mathutils.Vector( ( 20.0, 0.0, 0.0 ) )
+		tool.UpdateMiddlePoint()
+		for target, bm in targets:
+			target.Evaluate( bm, tool, luts, axis )
+
+		#reference pivot from the loaded verts of every object
+		if count == 1:
+			target, bm = targets[ 0 ]
+			bm.verts.ensure_lookup_table()
+			cos = [ bm.verts[ i ].co for i in list( target.m_engine.m_rigid_ids ) + list( target.m_engine.m_ids ) ]
+			lmin = mathutils.Vector( [ min( co[ i ] for co in cos ) for i in range( 3 ) ] )
+			lmax = mathutils.Vector( [ max( co[ i ] for co in cos ) for i in range( 3 ) ] )
+			expected = target.m_matrix @ ( ( lmin + lmax ) * 0.5 )
+		else:
+			cos = []
+			for target, bm in targets:
+				bm.verts.ensure_lookup_table()
+				cos += [ target.m_matrix @ bm.verts[ i ].co for i in list( target.m_engine.m_rigid_ids ) + list( target.m_engine.m_ids ) ]
+			wmin = mathutils.Vector( [ min( co[ i ] for co in cos ) for i in range( 3 ) ] )
+			wmax = mathutils.Vector( [ max( co[ i ] for co in cos ) for i in range( 3 ) ] )
+			expected = ( wmin + wmax ) * 0.5
+
+		for use_numpy in ( True, False ):
+			if not use_numpy:
+				#reload the bands through the per vert fallback
+				saved = ld.np
+				ld.np = None
+				for target, bm in targets:
+					target.m_field.Clear()
+					target.Evaluate( bm, tool, luts, axis )
+			tool.ComputeTransformOrigin( bpy.context, [ target for target, bm in targets ] )
+			if not use_numpy:
+				ld.np = saved
+			error = ( tool.transform_origin - expected ).length
+			if error > TOLERANCE:
+				errors.append( '{} objects{}: pivot {} expected {}'.format( count, '' if use_numpy else ' no numpy', tuple( round( c, 4 ) for c in tool.transform_origin ), tuple( round( c, 4 ) for c in expected ) ) )
+	clear_scene()
+	return errors
+
+
+def check_vnorm_selset( vn ):
+	errors = []
+	obj = modal_replay.build_grid( 8 )
+	bpy.context.tool_settings.mesh_select_mode = ( False, False, True )
+	cases = [
+		#operator, props, expected mask of the selected faces, expected mask of the other faces
+		( vn.MESH_OT_setvnormselset, { 'selset' : 'SELSET2', 'override' : False }, 0b111, 0b101 ),
+		( vn.MESH_OT_setvnormselset, { 'selset' : 'SELSET2', 'override' : True }, 0b111, 0b101 ),
+		( vn.MESH_OT_setvnormselset, { 'selset' : 'SELSET1', 'override' : True }, 0b101, 0b100 ),
+		( vn.MESH_OT_setvnormselset, { 'selset' : 'CLEAR', 'override' : False }, 0b000, 0b101 ),
+		( vn.MESH_OT_setvnormselset, { 'selset' : 'CLEAR', 'override' : True }, 0b000, 0b101 ),
+		( vn.MESH_OT_removevnormselset, { 'selset' : 'SELSET3' }, 0b001, 0b101 ),
+	]
+	for cls, props, selected_mask, other_mask in cases:
+		#every face starts in SELSET1 and SELSET3, the left half of the grid is selected
+		modal_replay.select( obj, 'FACE', lambda f : f.calc_center_median().x < 0.0 )
+		bm = bmesh.from_edit_mesh( obj.data )
+		layer = vn.GetSelSetLayer( bm )
+		for f in bm.faces:
+			f[ layer ] = 0b101
+		bmesh.update_edit_mesh( obj.data )
+
+		name = '{}({})'.format( cls.bl_idname, ', '.join( '{}={}'.format( k, v ) for k, v in props.items() ) )
+		try:
+			result = modal_replay.make_operator( cls, **props ).execute( bpy.context )
+		except Exception as e:
+			errors.append( '{} raised {!r}'.format( name, e ) )
+			continue
+		if 'FINISHED' not in result:
+			errors.append( '{} returned {}'.format( name, result ) )
+			continue
+
+		bm = bmesh.from_edit_mesh( obj.data )
+		layer = vn.GetSelSetLayer( bm )
+		wrong = [ f.index for f in bm.faces if f[ layer ] != ( selected_mask if f.select else other_mask ) ]
+		if wrong:
+			errors.append( '{} left {} faces with the wrong sets'.format( name, len( wrong ) ) )
+
+	#legacy string layer with malformed and out of range tokens mixed in, those are dropped
+	obj = modal_replay.build_grid( 4 )
+	bm = bmesh.from_edit_mesh( obj.data )
+	legacy = bm.faces.layers.string.new( vn.CUSTOM_VNORM_LAYERNAME )
+	values = [
+		( b'SELSET1;SELSET;SELSETx;SELSET99;SELSET0;SELSET3;', 0b101 ),
+		( b'SELSET2;', 0b010 ),
+		( b'SELSET;', 0b000 ),
+		( b'', 0b000 ),
+	]
+	for f in bm.faces:
+		f[ legacy ] = values[ f.index % len( values ) ][ 0 ]
+	try:
+		layer = vn.GetSelSetLayer( bm )
+	except Exception as e:
+		errors.append( 'legacy migration raised {!r}'.format( e ) )
+	else:
+		wrong = [ f.index for f in bm.faces if f[ layer ] != values[ f.index % len( values ) ][ 1 ] ]
+		if wrong:
+			errors.append( 'legacy migration left {} faces with the wrong sets'.format( len( wrong ) ) )
+		if bm.faces.layers.string.get( vn.CUSTOM_VNORM_LAYERNAME ) is not None:
+			errors.append( 'legacy migration kept the string layer' )
+	clear_scene()
+	return errors
+
+
+def check_vnorm_live_off( vn ):
+	errors = []
+	props = bpy.context.scene.rmkit_props
+	obj = modal_replay.build_grid( 4 )
+	bm = bmesh.from_edit_mesh( obj.data )
+	layer = vn.GetSelSetLayer( bm )
+	for f in bm.faces:
+		f[ layer ] = 0b001
+	bmesh.update_edit_mesh( obj.data )
+	bpy.ops.object.mode_set( mode='OBJECT' )
+
+	solves = []
+	solve = vn.SolveVNorms
+	vn.SolveVNorms = lambda *args : solves.append( 1 ) or solve( *args )
+	try:
+		#switched off with an update waiting, the queued timer must neither apply nor keep it
+		for live in ( False, True ):
+			vn.live_vnorms.Clear()
+			props.vn_live = True
+			vn.live_vnorms.Touch( obj )
+			props.vn_live = live
+			vn.live_vnorms.last_update = 0.0
+			del solves[:]
+			result = vn.live_vnorms.Tick()
+			if live and not solves:
+				errors.append( 'live on did not apply' )
+			if not live and ( solves or result is not None or vn.live_vnorms.pending ):
+				errors.append( 'live off still applied {} times, returned {}, left {} pending'.format( len( solves ), result, len( vn.live_vnorms.pending ) ) )
+	finally:
+		vn.SolveVNorms = solve
+		vn.live_vnorms.Clear()
+		props.vn_live = False
+	clear_scene()
+	return errors
+
+
+def mesh_state( obj ):
+	#coordinates and face centers, rounded and sorted so element order does not matter
+	bm = bmesh.from_edit_mesh( obj.data )
+	verts = sorted( tuple( round( c, 4 ) for c in v.co ) for v in bm.verts )
+	faces = sorted( tuple( round( c, 4 ) for c in f.calc_center_median() ) for f in bm.faces )
+	return verts, faces
+
+
+REDO_CASES = [
+	#replay script, grid size, new property values. on the small grid the region holds the whole mesh.
+	( 'thicken', 8, { 'thickness' : 0.3 } ),
+	( 'create_tube', 8, { 'radius' : 0.25, 'level' : 6 } ),
+	( 'arc_adjust', 8, { 'scale' : 1.5, 'radial' : False } ),
+	( 'connect_edges', 8, { 'level' : 3, 'slide' : 0.2, 'pinch' : 0.8 } ),
+	( 'connect_edges', 2, { 'level' : 3, 'slide' : 0.2, 'pinch' : 0.8 } ),
+]
+
+
+def check_redo( meshutil ):
+	errors = []
+	context = modal_replay.StubContext()
+	for name, size, props in REDO_CASES:
+		obj = modal_replay.build_grid( size )
+		script = modal_replay.SCRIPTS[ name ]
+		op, invoke_event, events = script( obj, 10 )
+		ref_op, ref_event, ref_events = script( obj, 10 )
+		bpy.ops.ed.undo_push( message='before' )
+
+		#reference: a fresh run executed with the new values
+		ref_op.invoke( context, ref_event )
+		for key, value in props.items():
+			setattr( ref_op, key, value )
+		ref_op.execute( context )
+		expected = mesh_state( obj )
+		bpy.ops.ed.undo_push( message='reference' )
+		bpy.ops.ed.undo()
+
+		op.invoke( context, invoke_event )
+		for event in events:
+			if 'FINISHED' in op.modal( context, event ):
+				break
+		for key, value in props.items():
+			setattr( op, key, value )
+
+		#every redo undoes the previous result first, which replaces the edit bmesh. when the tool
+		#added a datablock the undo reloads the ids too, so obj is looked up again afterwards.
+		for attempt in ( 1, 2 ):
+			bpy.ops.ed.undo_push( message=name )
+			bpy.ops.ed.undo()
+			try:
+				result = op.execute( context )
+			except Exception as e:
+				errors.append( '{} redo {} raised {!r}'.format( name, attempt, e ) )
+				break
+			if 'FINISHED' not in result:
+				errors.append( '{} redo {} returned {}'.format( name, attempt, result ) )
+				break
+			if mesh_state( bpy.context.object ) != expected:
+				errors.append( '{} redo {} does not match a fresh run'.format( name, attempt ) )
+				break
+		op.cancel( context )
+		ref_op.cancel( context )
+	clear_scene()
+	return errors
+
+
+CHECKS = {
+	'falloff_pivot' : ( 'linear_deformer', check_falloff_pivot ),
+	'vnorm_selset' : ( 'vnormals', check_vnorm_selset ),
+	'vnorm_live_off' : ( 'vnormals', check_vnorm_live_off ),
+	'redo' : ( 'meshutil', check_redo ),
+}
+
+
+def parse_args():
+	argv = sys.argv[ sys.argv.index( '--' ) + 1 : ] if '--' in sys.argv else []
+	parser = argparse.ArgumentParser( description='Run headless correctness checks on the rmKit tools.' )
+	parser.add_argument( '--checks', default=','.join( CHECKS.keys() ) )
+	return parser.parse_args( argv )
+
+
+def main():
+	args = parse_args()
+	modal_replay.load_addon()
+
+	failed = 0
+	for name in args.checks.split( ',' ):
+		module, check = CHECKS[ name ]
+		errors = check( importlib.import_module( modal_replay.ADDON_NAME + '.' + module ) )
+		print( '{:<16} {}'.format( name, 'FAIL ' + '; '.join( errors ) if errors else 'ok' ) )
+		failed += 1 if errors else 0
+
+	if failed:
+		print( '{} checks failed'.format( failed ) )
+		sys.exit( 1 )
+
+
+if __name__ == '__main__':
+	main()
@@ -1,40 +1,63 @@
 import bpy, bmesh, mathutils
 import math
 import rmlib
+from .modalutil import FrameBudget
+from .meshutil import UpdateRegionNormals, UpdateEditMesh, MeshRegion
+
+
+def SubvertPositions( pos1, pos2, level, slide, pinch ):
+	"""
+	Positions of the level subverts placed on the edge pos1->pos2 for the given slide and pinch.
+	"""
+	d = min( 1.0, float( level - 1 ) / float( level + 1 ) * pinch )
+	e = ( 1.0 - d ) * 0.5
+	v_min = max( 0.0, e + slide )
+	v_max = min( 1.0, 1.0 - e + slide )
+	if v_min == 0.0:
+		v_max = d
+	if v_max == 1.0:
+		v_min = 1.0 - d
+	try:
+		v_step = d / float( level - 1 )
+	except ZeroDivisionError:
+		v_step = 0.0
+
+	vec = pos2 - pos1
+	p = pos1 + ( vec * v_min )
+	positions = [ p.copy() ]
+	for i in range( level - 1 ):
+		p += ( vec * v_step )
+		positions.append( p.copy() )
+	return positions
+
 
 class CEVert( object ):
+	__slots__ = ( 'vert', 'index', '__rootverts' )
+
 	def __init__( self, vert ):
 		self.vert = vert
 		self.index = vert.index
-		self.root_indexes = []
 		self.__rootverts = []
 
 	def __repr__( self ):
 		return 'CEVert :: {}'.format( self.vert.index )
 
-	def __getattr__( self, name ):
-		try:
-			return super( CEVert, self ).__getattribute__( name )
-		except AttributeError:
-			return getattr( self.vert, name )
-
 	def __len__( self ):
 		return len( self.__rootverts )
 
 	def AddRootVert( self, vert ):
 		self.__rootverts.append( vert )
-		self.root_indexes.append( vert.vert.index )
 
 	def GetEndVerts( self, p ):
-		vlist = list( p.verts )
-		idx = vlist.index( self.__rootverts[0].vert )
-		if vlist[idx-1] == self.__rootverts[1].vert:
+		vidx = p.vidx
+		idx = vidx.index( self.__rootverts[0].index )
+		if vidx[idx-1] == self.__rootverts[1].index:
 			return self.__rootverts[1], self.__rootverts[0]
 		return self.__rootverts[0], self.__rootverts[1]
 
 
 class CEEdge( object ):
-	BMesh = None
+	__slots__ = ( 'edge', 'index', 'active', 'slide_switch', 'ept1', 'ept2', '__subverts', 'source_poly' )
 
 	def __init__( self, e, ept1, ept2, active, source_poly ):
 		self.edge = e
@@ -46,26 +69,21 @@ class CEEdge( object ):
 		self.__subverts = []
 		self.source_poly = source_poly
 
-	def __getattr__( self, name ):
-		try:
-			return super( CEEdge, self ).__getattribute__( name )
-		except AttributeError:
-			return getattr( self.edge, name )
-
 	def __repr__( self ):
 		if self.active:
 			return 'CEEdge:{} ACTIVE'.format( self.index )
 		else:
 			return 'CEEdge:{} INACTIVE'.format( self.index )
 
-	def GetSubverts( self, p ):
-		vlist = list( p.verts )
-		idx = vlist.index( self.ept1.vert )
-		if vlist[idx-1].index == self.ept2.vert.index:
+	def GetSubverts( self, reverse ):
+		if reverse:
 			return self.__subverts[::-1]
 		return self.__subverts
 
-	def CreateSubverts( self, level, slide, pinch ):
+	def GetInnerSubverts( self ):
+		return self.__subverts[1:-1]
+
+	def CreateSubverts( self, bm, level, slide, pinch ):
 		if not self.active:
 			self.__subverts = [ self.ept1, self.ept2 ]
 			return
@@ -73,91 +91,53 @@ class CEEdge( object ):
 		if self.slide_switch:
 			slide *= -1.0
 		
-		pos1 = self.ept1.vert.co
-		pos2 = self.ept2.vert.co
-			
-		d = min( 1.0, float( level - 1 ) / float( level + 1 ) * pinch )
-		e = ( 1.0 - d ) * 0.5
-		v_min = max( 0.0, e + slide )
-		v_max = min( 1.0, 1.0 - e + slide )
-		if v_min == 0.0:
-			v_max = d
-		if v_max == 1.0:
-			v_min = 1.0 - d
-		try:
-			v_step = d / float( level - 1 )
-		except ZeroDivisionError:
-			v_step = 0.0
-			
 		self.__subverts = [ self.ept1 ]
-		vec = pos2 - pos1
-		p = pos1 + ( vec * v_min )
-		sv = CEEdge.BMesh.verts.new( p, self.ept1.vert )
-		self.__subverts.append( CEVert( sv ) )
-		for i in range( level - 1 ):
-			p += ( vec * v_step )
-			sv = CEEdge.BMesh.verts.new( p, self.ept1.vert )
+		for p in SubvertPositions( self.ept1.vert.co, self.ept2.vert.co, level, slide, pinch ):
+			sv = bm.verts.new( p, self.ept1.vert )
 			self.__subverts.append( CEVert( sv ) )
 		self.__subverts.append( self.ept2 )
 
 		for i in range( 1, len( self.__subverts ) - 1 ):
-			CEPoly.ALLCEVerts.add( self.__subverts[i] )
 			self.__subverts[i].AddRootVert( self.ept1 )
 			self.__subverts[i].AddRootVert( self.ept2 )
 		
 
 class CEPoly( object ):
-	BMesh = None
-	level = 0
-	ALLCEVerts = set()
-	AllCEEdges = set()
-	AllCEPolygons = set()
+	__slots__ = ( 'mesh', 'polygon', 'index', 'vidx', 'ceVerts', 'eidx_list', 'ceEdges', 'flip', 'corners', 'steps' )
 
-	def __init__( self, p ):
+	def __init__( self, mesh, p ):
 		"""
 		CEPoly constructor
 		"""
+		verts = list( p.verts )
+		self.mesh = mesh
 		self.polygon = p
+		self.index = p.index
+		self.vidx = [ v.index for v in verts ] #vert indexes in winding order, they survive LocalizeNewBMesh
 		self.ceVerts = []
 		self.eidx_list = []
 		self.ceEdges = []
-		self.seed_polygons = []
-		self.index = p.index
+		self.flip = []
+		self.corners = []
+		self.steps = []
 
 		#add to static list
-		CEPoly.AllCEPolygons.add( self )
+		mesh.polygons[ self.index ] = self
 
-		#create first ConnectEdgeVert and add to static list
-		prev_vert = CEVert( self.verts[-1] )
-		prev_vert.AddRootVert( prev_vert )
-		CEPoly.ALLCEVerts.add( prev_vert )
+		#fetch or create first ConnectEdgeVert
+		prev_vert = mesh.GetCEVert( verts[-1] )
 
 		#iterate through all verts of polygon and create ConnectEdge elems
-		vcount = len( self.verts )
+		vcount = len( verts )
 		for i in range( vcount ):
 			#the nth edge of poly has the same starting vert as the nth vert in said poly
-			v1 = self.verts[i]
-			v2 = self.verts[(i+1)%vcount]
+			v1 = verts[i]
+			v2 = verts[(i+1)%vcount]
 			e = rmlib.rmEdgeSet.from_endpoints( v1, v2 )
 
 			#create new ConnectEdgeVerts if they dont already exist in static list.
-			cev1 = None
-			cev2 = None
-			for cev in CEPoly.ALLCEVerts:
-				if cev.index == v1.index:
-					cev1 = cev
-				elif cev.index == v2.index:
-					cev2 = cev
-				if cev1 is not None and cev2 is not None:
-					break
-			if cev1 is None:
-				cev1 = CEVert( v1 )
-				cev1.AddRootVert( cev1 )
-				CEPoly.ALLCEVerts.add( cev1 )
-			if cev2 is None:
-				cev2 = CEVert( v2 )
-				cev2.AddRootVert( cev2 )
-				CEPoly.ALLCEVerts.add( cev2 )
+			cev1 = mesh.GetCEVert( v1 )
+			cev2 = mesh.GetCEVert( v2 )
 			self.ceVerts.append( cev1 )
 			prev_vert.AddRootVert( cev1 )
 			prev_vert = cev1			
@@ -167,21 +147,281 @@ class CEPoly( object ):
 				self.eidx_list.append( i )
 				
 			#create new ConnectEdgeEdges if they dont already exist in static list.
-			ceeAlreadyExists = False
-			for cee in CEPoly.AllCEEdges:
-				if cee.index == e.index:
-					self.ceEdges.append( cee )
-					ceeAlreadyExists = True
-					break
-			if not ceeAlreadyExists:
+			cee = mesh.edges.get( e.index, None )
+			if cee is None:
 				cee = CEEdge( e, cev1, cev2, e.select, self )
-				self.ceEdges.append( cee )
-				CEPoly.AllCEEdges.add( cee )
+				mesh.edges[ e.index ] = cee
+			self.ceEdges.append( cee )
 
-	@classmethod
-	def AccumulateCEElem( cls, seed_poly, seed_edge=None ):
+	def __repr__( self ):
+		s = 'CEPoly {}\n'.format( self.index )
+		for i, e in enumerate( self.ceEdges ):			
+			s += '\tvidx:{} -> {}\n'.format( self.vidx[i], e )
+		return s
+
+
+	def Plan( self ):
 		"""
-		Recursive function that builds CE data structure.
+		Caches the part of the new topology that does not depend on the level: the direction each
+		edge runs in the winding of this poly, a corner record for every original vert and the order
+		in which ConnectEdges walks the edges. Built once per invoke, after the walk that sets
+		eidx_list and the root verts.
+		"""
+		vcount = len( self.vidx )
+		self.flip = [ cee.ept1.index != self.vidx[i] for i, cee in enumerate( self.ceEdges ) ]
+
+		#( vert, start loop idx, end loop idx, end vert ) of the original verts, end vert drives the edge data transfer
+		self.corners = []
+		for i, cev in enumerate( self.ceVerts ):
+			self.corners.append( ( cev, i, i, cev.GetEndVerts( self )[1] ) )
+
+		#( edge idx, active, next active edge idx ) in walk order, starting after the first active edge
+		self.steps = []
+		if len( self.eidx_list ) == 1:
+			return
+		active_set = set( self.eidx_list )
+		previous_idx = self.eidx_list[0]
+		for i in range( 1, vcount + 1 ):
+			current_idx = ( previous_idx + i ) % vcount
+			next_idx = None
+			if current_idx in active_set:
+				next_idx = ( current_idx + 1 ) % vcount
+				while next_idx not in active_set:
+					next_idx = ( next_idx + 1 ) % vcount
+			self.steps.append( ( current_idx, current_idx in active_set, next_idx ) )
+
+	def EdgeCorners( self ):
+		"""
+		Corner records along every edge of this poly in winding order for the current level. The
+		endpoints are the original vert records, subverts start and end at them.
+		"""
+		vcount = len( self.vidx )
+		rows = []
+		for i, cee in enumerate( self.ceEdges ):
+			j = ( i + 1 ) % vcount
+			end = self.ceVerts[j]
+			row = [ self.corners[i] ]
+			row += [ ( sv, i, j, end ) for sv in cee.GetSubverts( self.flip[i] )[1:-1] ]
+			row.append( self.corners[j] )
+			rows.append( row )
+		return rows
+
+	def TransferLayerData( self, faces ):
+		"""
+		Sets the uv coords, colors and edge data of the new faces built from this poly. Subverts get
+		values interpolated between the endpoints of the edge on which they reside, all other verts
+		copy the loop of this poly they came from. Source loops and weights come from the corner
+		records and every layer is then written in one pass over all new faces.
+		"""
+		loops = list( self.polygon.loops )
+
+		bm = self.mesh.bmesh
+		if bpy.app.version < (4,0,0) and bm.edges.layers.crease is not None:
+			crease_layers = list( bm.edges.layers.crease.values() )
+		else:
+			clyr = bm.edges.layers.float.get( 'crease_edge', None )
+			crease_layers = [] if clyr is None else [ clyr ]
+
+		#( new loop, source loop idx, end loop idx, weight ) for every corner, weight is None for non subverts.
+		#new_poly was built from the corner verts so its nth loop is on the nth corner.
+		corners = []
+		subvert_corners = []
+		for row, new_poly in faces:
+			new_loops = list( new_poly.loops )
+			count = len( row )
+			for i, ( vert, ka, kb, end_vert ) in enumerate( row ):
+				subvert_loop = new_loops[i]
+
+				if ka == kb:
+					#if vert is not subvert, then just copy existing loop
+					corners.append( ( subvert_loop, ka, ka, None ) )
+				else:
+					#if vert is a subvert, then interpolate between the loops at the ends of its edge
+					start_vert = self.ceVerts[ka]
+					start_3d = start_vert.vert.co
+					length_3d = ( end_vert.vert.co - start_3d ).length
+					weight = ( vert.vert.co - start_3d ).length / length_3d
+					corners.append( ( subvert_loop, ka, kb, weight ) )
+					subvert_corners.append( ( new_poly, i, vert, start_vert, end_vert, ka, kb ) )
+
+				#assign edge layer data
+				if subvert_loop.edge.tag:
+					continue
+
+				#edge data processing
+				next_vert, _, _, next_end = row[ ( i + 1 ) % count ]
+				if next_end == end_vert or end_vert == next_vert:
+					loop = loops[ka]
+
+					#transfer crease weight
+					for layer in crease_layers:
+						subvert_loop.edge[layer] = loop.edge[layer]
+
+					#transfer sharp and seam
+					subvert_loop.edge.smooth = loop.edge.smooth
+					subvert_loop.edge.seam = loop.edge.seam
+					subvert_loop.edge.tag = True
+
+		#asigne uv data
+		uv_sources = []
+		for uvlayer in bm.loops.layers.uv.values():
+			src = [ l[uvlayer].uv.copy() for l in loops ]
+			uv_sources.append( ( uvlayer.name, src ) )
+			for subvert_loop, ka, kb, weight in corners:
+				if weight is None:
+					subvert_loop[uvlayer].uv = src[ka]
+				else:
+					subvert_loop[uvlayer].uv = src[ka] + ( ( src[kb] - src[ka] ) * weight )
+
+		#asigne color data
+		color_sources = []
+		for colorlayer in bm.loops.layers.color.values():
+			src = [ l[colorlayer].copy() for l in loops ]
+			color_sources.append( ( colorlayer.name, src ) )
+			for subvert_loop, ka, kb, weight in corners:
+				if weight is None:
+					subvert_loop[colorlayer] = src[ka]
+				else:
+					subvert_loop[colorlayer] = src[ka] + ( ( src[kb] - src[ka] ) * weight )
+
+		#keep what the live preview needs to re-interpolate subvert loops when only the subverts move
+		for new_poly, corner, vert, start_vert, end_vert, ka, kb in subvert_corners:
+			self.mesh.subvert_loops.append( ( new_poly, corner, vert, start_vert, end_vert, ka, kb, uv_sources, color_sources ) )
+
+	def __createPolygon( self, row, faces ):
+		new_poly = self.mesh.bmesh.faces.new( [ c[0].vert for c in row ], self.polygon )
+		faces.append( ( row, new_poly ) )
+
+	def __createOuterPolygon( self, row, faces ):
+		"""
+		Case for all faces that link the outermost subverts to the inactive edges.
+		"""
+		if len( { c[0] for c in row } ) < 3:
+			return None
+		self.__createPolygon( row, faces )
+
+	def __createInnerPolygons( self, row1, row2, faces ):
+		"""
+		Case for all faces that connect subverts of one active edge to that of the next.
+		"""
+		level = self.mesh.level
+		row1 = row1[1:-1][ int( level / 2 ): ][::-1]
+		row2 = row2[1:-1][ :int( level / 2 ) + int( level % 2 ) ]
+		for i in range( 1, len( row1 ) ):
+			self.__createPolygon( ( row1[i], row1[i-1], row2[i-1], row2[i] ), faces )
+
+	def __createCenterPolygon( self, row, faces ):
+		"""
+		Case for when face at center of joint CEPoly.
+		"""
+		if len( row ) >= 3:
+			self.__createPolygon( row, faces )
+
+	def __createCapPolygon( self, rows, faces ):
+		"""
+		Case for when exactly one active edge in CEPoly.
+		"""
+		row = []
+		for i in range( len( self.ceEdges ) ):
+			if i in self.eidx_list:
+				row += rows[i][:-1]
+			else:
+				row.append( self.corners[i] )
+		self.__createPolygon( row, faces )
+
+	def ConnectEdges( self ):
+		"""
+		Use subverts to create the new topology for this face, following the plan cached by Plan.
+		"""
+		rows = self.EdgeCorners()
+		faces = []
+		if len( self.eidx_list ) == 1:
+			self.__createCapPolygon( rows, faces )
+			self.TransferLayerData( faces )
+			return
+
+		level = self.mesh.level
+		center_row = []
+		outer_row = [ rows[ self.eidx_list[0] ][-2] ]
+		for current_idx, active, next_idx in self.steps:
+			row = rows[current_idx]
+
+			#handles outer polygons
+			if active:
+				self.__createOuterPolygon( outer_row + row[:2], faces )
+				outer_row = [ row[-2] ]
+			else:
+				outer_row.append( row[0] )
+
+			if active:
+				#handles inner polygons
+				if level > 1:
+					self.__createInnerPolygons( row, rows[next_idx], faces )
+
+				#handles center polygom
+				if level % 2 == 0:
+					center_row.append( row[ int( len( row ) / 2 ) - 1 ] )
+				center_row.append( row[ int( len( row ) / 2 ) ] )
+
+		self.__createCenterPolygon( center_row, faces )
+		self.TransferLayerData( faces )
+
+
+class CEMesh( object ):
+	"""
+	Connect Edges state of one mesh. Holds the CE elements built from its selection in registries
+	keyed by the index of the bmesh element they wrap, the region of the edit mesh around the
+	selection and the preview of the last build.
+	"""
+	def __init__( self, obj ):
+		self.object_name = obj.name #an undo before a redo can reload the object, so look it up by name
+		self.bmesh = None #bmesh the CE elements currently point into
+		self.region = None #faces around the selection, the CE elements index its source bmesh
+		self.level = 0
+		self.verts = {}
+		self.edges = {}
+		self.polygons = {}
+
+		#( new_poly, corner, subvert, start_vert, end_vert, start loop idx, end loop idx, uv_sources, color_sources )
+		#for every loop on a subvert. The sources are ( layer name, values of the source poly loops ) per layer.
+		self.subvert_loops = []
+
+		self.preview = None
+
+	@property
+	def object( self ):
+		return bpy.data.objects[ self.object_name ]
+
+	def GetCEVert( self, v ):
+		"""
+		Returns the CEVert of v, creating and registering it on first use.
+		"""
+		cev = self.verts.get( v.index, None )
+		if cev is None:
+			cev = CEVert( v )
+			cev.AddRootVert( cev )
+			self.verts[ v.index ] = cev
+		return cev
+
+	def AccumulateCEElem( self, seed_poly, seed_edge=None ):
+		"""
+		Builds CE data structure by walking the polys connected to seed_poly through selected edges.
+		The walk is depth first like the recursion it replaced, but each poly is a generator on an
+		explicit stack so rings of any length run in constant stack space.
+		"""
+		stack = [ self.__visit( seed_poly, seed_edge ) ]
+		while stack:
+			try:
+				p, cee = next( stack[-1] )
+			except StopIteration:
+				stack.pop()
+				continue
+			stack.append( self.__visit( p, cee ) )
+
+	def __visit( self, seed_poly, seed_edge ):
+		"""
+		Adds seed_poly to the CE data structure and yields ( poly, edge ) for every neighbor that
+		has to be visited next, in the order the recursion used to visit them.
 		"""
 
 		#ensure we only visit seed_poly once
@@ -190,27 +430,27 @@ class CEPoly( object ):
 		seed_poly.tag = True
 
 		#create ConnectEdgePolygon
-		cep = cls( seed_poly )
+		cep = CEPoly( self, seed_poly )
 
 		#build list of ceEdges where the first edge is the seed_edge.
 		#If seed_edge arg is None, then settle for first active edge encountered.
 		ceEdges = cep.ceEdges
 		prev_active_edge_idx = 0
 		if seed_edge is None:
-			#if seed_edge is None, it means that this is the start of a AccumulateCEElem recusion.
+			#if seed_edge is None, it means that this is the start of a AccumulateCEElem walk.
 			for i, cee in enumerate( ceEdges ):
-				if cee.select:
+				if cee.active:
 					cee.edge.tag = True #avoids tricky bug where start of recursion is dependant on prev edge whose swich value is the default (and not dictated by topo).
 					prev_active_edge_idx = i
 					break
 			if len( cep.eidx_list ) == 1:
-				#if there's only one active edge on this poly, just kickoff a recursive call and return early.
+				#if there's only one active edge on this poly, just visit the next poly and return early.
 				#there's nothing we more need from this poly.
 				cee.edge.tag = True
 				for p in cee.edge.link_faces:
 					if p.tag:
 						continue
-					cls.AccumulateCEElem( p, cee )
+					yield p, cee
 					return
 		else:
 			for i, cee in enumerate( ceEdges ):
@@ -223,12 +463,12 @@ class CEPoly( object ):
 		cur_active_edge_idx = 0
 		for i in range( prev_active_edge_idx, len( ceEdges ) ):
 			idx = ( i + i ) % len( ceEdges )
-			if ceEdges[idx].select:
+			if ceEdges[idx].active:
 				cur_active_edge_idx = idx
 				break
 		ceEdges = ceEdges[cur_active_edge_idx:] + ceEdges[:cur_active_edge_idx]
 		
-		#iterate through active edges in poly and dispatch recursive calls
+		#iterate through active edges in poly and dispatch visits
 		for i in range( len( ceEdges ) ):
 			cee = ceEdges[i]
 
@@ -249,228 +489,191 @@ class CEPoly( object ):
 				for p in cee.edge.link_faces:
 					if p.tag:
 						continue
-					cls.AccumulateCEElem( p, cee )
+					yield p, cee
 
-	def __getattr__( self, name ):
-		try:
-			return super( CEPoly, self ).__getattribute__( name )
-		except AttributeError:
-			return getattr( self.polygon, name )
-
-	def __repr__( self ):
-		s = 'CEPoly {}\n'.format( self.index )
-		for i, e in enumerate( self.ceEdges ):			
-			s += '\tvidx:{} -> {}\n'.format( self.verts[i].index, e )
-		return s
-
-
-	def TransferLayerData( self, verts, new_poly ):
+	def BuildFromSelection( self, bm ):
 		"""
-		Sets the uv corrd of a vert on a poly. This is done by interpolating
-		between the endpoints of the edge on which the subvert resides.
+		Builds the CE data structure from the selected edges of the edit bmesh bm. Only the faces
+		around the selection are copied out of bm and the CE elements point into that copy. Returns
+		False if there was nothing to connect.
 		"""
-		for i, vert in enumerate( verts ):
-			start_vert, end_vert = vert.GetEndVerts( self.polygon )
-
-			if vert.index != -1:
-				#if vert is not subvert, then just copy existing loop uv coord
-				for loop in self.loops:
-					if loop.vert == vert.vert:
-						break
-
-				for subvert_loop in new_poly.loops:
-					if subvert_loop.vert == vert.vert:
-						break
-
-				if CEPoly.BMesh.loops.layers.uv is not None:
-					for uvlayer in CEPoly.BMesh.loops.layers.uv.values():
-						subvert_loop[uvlayer].uv = loop[uvlayer].uv.copy()
-
-				if CEPoly.BMesh.loops.layers.color is not None:
-					for colorlayer in CEPoly.BMesh.loops.layers.color:
-						subvert_loop[colorlayer] = loop[colorlayer]
-						
-			else:
-				#if vert is a subvert, then coompute interpolated uvcoord				
-				start_3d = start_vert.co
-				end_3d = end_vert.co
-				length_3d = ( end_3d - start_3d ).length
-				weight = ( vert.co - start_3d ).length / length_3d
-
-				loop = self.loops[-1]
-				for end_loop in self.loops:
-					if end_loop.vert == end_vert.vert:
-						break
-					loop = end_loop
-
-				for subvert_loop in new_poly.loops:
-					if subvert_loop.vert == vert.vert:
-						break
-					
-				#asigne uv data
-				if CEPoly.BMesh.loops.layers.uv is not None:
-					#generate interpolated uv coord
-					for uvlayer in CEPoly.BMesh.loops.layers.uv.values():
-						start_uv = loop[uvlayer].uv
-						end_uv = end_loop[uvlayer].uv
-						vec_uv = end_uv - start_uv
-						interp_uv = start_uv + ( vec_uv * weight )
-						subvert_loop[uvlayer].uv = interp_uv
-
-				#asigne color data
-				if CEPoly.BMesh.loops.layers.color is not None:
-					#generate interpolated color coord
-					for colorlayer in CEPoly.BMesh.loops.layers.color:
-						start_color = loop[colorlayer]
-						end_color = end_loop[colorlayer]
-						vec_color = end_color - start_color
-						interp_color = start_color + ( vec_color * weight )
-						subvert_loop[colorlayer] = interp_color
+		faces = { p for e in bm.edges if e.select for p in e.link_faces }
+		if len( faces ) < 1:
+			return False
+		self.region = MeshRegion( bm, faces )
+		bm = self.region.source
+		self.bmesh = bm
+
+		for e in bm.edges:
+			e.tag = False
+		for p in bm.faces:
+			p.tag = False
 			
-			#assign edge layer data
-			if subvert_loop.edge.tag:
-				continue
-
-			#edge data processing
-			next_vert = verts[ ( i + 1 ) % len( verts ) ]
-			if next_vert.GetEndVerts( self.polygon )[1] == end_vert or end_vert == next_vert:
-				#transfer crease weight
-				if bpy.app.version < (4,0,0) and CEPoly.BMesh.edges.layers.crease is not None:
-					for layer in CEPoly.BMesh.edges.layers.crease.values():
-						subvert_loop.edge[layer] = loop.edge[layer]
-						subvert_loop.edge.tag = True
-				else:
-					clyr = CEPoly.BMesh.edges.layers.float.get( 'crease_edge', None )
-					if clyr is None:
-						clyr = CEPoly.BMesh.edges.layers.float.get( 'crease_edge' )
-					if clyr is not None:
-						subvert_loop.edge[clyr] = loop.edge[clyr]
-					subvert_loop.edge.tag = True
-
-				#transfer sharp and seam
-				subvert_loop.edge.smooth = loop.edge.smooth
-				subvert_loop.edge.seam = loop.edge.seam
-				subvert_loop.edge.tag = True
+		selected_edges = rmlib.rmEdgeSet( e for e in bm.edges if e.select )
+		if len( selected_edges ) < 1:
+			return False
+
+		#build list of active polygons. These are polys that neighbor selected edges. A poly with more than
+		#two selected edges is considered a joint polygons. These need to be operated on first to allow for
+		#slide feature.
+		active_polygons = rmlib.rmPolygonSet()
+		for p in selected_edges.polygons:
+			count = 0
+			for i in range( len( p.verts ) ):
+				v1 = p.verts[i-1]
+				v2 = p.verts[i]
+				e = rmlib.rmEdgeSet.from_endpoints( v1, v2 )
+				if e.select:
+					count += 1
+			if count > 2:
+				active_polygons.insert( 0, p )
+			else:
+				active_polygons.append( p )
 			
+		#build the CE data structure.
+		for p in active_polygons:
+			self.AccumulateCEElem( p )
 
+		#the root verts are only complete once every poly is in, so plan afterwards
+		for cep in self.polygons.values():
+			cep.Plan()
+		return len( self.polygons ) > 0
 
-	def __createOuterPolygon( self, vlist ):
+	def Localize( self, level ):
 		"""
-		Case for all faces that link the outermost subverts to the inactive edges.
+		Copy the region, and transfer all stale cached verts/edges/faces to use active ones of the 
+		copy bmesh.
 		"""
-		if len( set( vlist ) ) < 3:
-			return None
-					
-		new_poly = CEPoly.BMesh.faces.new( [ v.vert for v in vlist ], self.polygon )
-		self.TransferLayerData( vlist, new_poly )
+		bm = self.region.Copy()
+		bm.verts.ensure_lookup_table()
+		bm.edges.ensure_lookup_table()
+		bm.faces.ensure_lookup_table()
+		self.bmesh = bm
+		self.level = level
+		for p in self.polygons.values():
+			p.polygon = bm.faces[p.index]
+		for e in self.edges.values():
+			e.edge = bm.edges[e.index]
+		for v in self.verts.values():
+			v.vert = bm.verts[v.index]
+		return bm
 
-	def __createInnerPolygons( self, ceedge1_idx, ceedge2_idx ):
+	def ConnectEdges( self, level, slide, pinch ):
 		"""
-		Case for all faces that connect subverts of one active edge to that of the next.
+		Builds the connected topology for level on a fresh copy of the region, commits it into the
+		edit mesh and records the preview for it.
 		"""
-		vlist1 = self.ceEdges[ceedge1_idx].GetSubverts( self )[1:-1]
-		vlist1 = vlist1[ int( CEPoly.level / 2 ): ][::-1]
+		#update the cached data structure to use non-stale data
+		sub = self.Localize( level )
 
-		vlist2 = self.ceEdges[ceedge2_idx].GetSubverts( self )[1:-1]
-		vlist2 = vlist2[ :int( CEPoly.level / 2 ) + int( CEPoly.level % 2 ) ]
-	
-		for i in range( 1, len( vlist1 ) ):
-			quad = ( vlist1[i], vlist1[i-1], vlist2[i-1], vlist2[i] )
-			new_poly = CEPoly.BMesh.faces.new( [ v.vert for v in quad ], self.polygon )			
-			self.TransferLayerData( quad, new_poly )
+		#add new verts
+		self.subvert_loops.clear()
+		for cee in self.edges.values():
+			cee.CreateSubverts( sub, level, slide, pinch )
 
-	def __createCenterPolygon( self, vlist ):
-		"""
-		Case for when face at center of joint CEPoly.
-		"""
-		if len( vlist ) >= 3:
-			new_poly = CEPoly.BMesh.faces.new( [ v.vert for v in vlist ], self.polygon )			
-			self.TransferLayerData( vlist, new_poly )
+		#create new topology that adds edges between all new verts
+		for cep in self.polygons.values():
+			cep.ConnectEdges()
 
-	def __createCapPolygon( self ):
-		"""
-		Case for when exactly one active edge in CEPoly.
-		"""
-		
-		vlist = rmlib.rmVertexSet()
-		for i, e in enumerate( self.edges ):
-			if i in self.eidx_list:
-				subverts = self.ceEdges[i].GetSubverts( self )
-				vlist += subverts[:-1]
-			else:
-				vlist.append( self.ceVerts[i] )
+		#delete old geo
+		self.Cleanup()
 
-		new_poly = CEPoly.BMesh.faces.new( [ v.vert for v in vlist ], self.polygon )		
-		self.TransferLayerData( vlist, new_poly )
+		#stitch the new topology into the edit mesh and record where the subverts landed for the live preview
+		vmap, fmap = self.region.Commit( self.object.data, sub )
+		self.preview = CEPreview( self, vmap, fmap )
+		self.bmesh = None
+		sub.free()
 
-	def ConnectEdges( self ):
+	def Cleanup( self ):
 		"""
-		Use subverts to create the new topology for this face.
+		Delete old topology and clear tags.
 		"""
+		for cep in self.polygons.values():
+			self.bmesh.faces.remove( cep.polygon )
+		for cee in self.edges.values():
+			if cee.active:
+				self.bmesh.edges.remove( cee.edge )
+		for e in self.bmesh.edges:
+			e.tag = False
 
-		if len( self.eidx_list ) == 1:
-			return self.__createCapPolygon()
-
-		#init previous_idx such that it is on an active edge
-		vcount = len( self.verts )
-		for previous_idx in range( vcount ):
-			if previous_idx in self.eidx_list:          
-				break
-		current_idx = ( previous_idx + 1 ) % vcount
-
-		centerPoly_verts = rmlib.rmVertexSet()
-		outerPoly_verts = [ self.ceEdges[previous_idx].GetSubverts( self )[-2] ]
-		for i in range( vcount ):
-			active = current_idx in self.eidx_list
-			subverts = self.ceEdges[current_idx].GetSubverts( self )			
-
-			#handles outer polygons
-			if active:
-				self.__createOuterPolygon( outerPoly_verts + subverts[:2] )
-				outerPoly_verts = [ subverts[-2] ]
-			else:
-				outerPoly_verts.append( subverts[0] )
-
-			#handles inner polygons
-			if active and CEPoly.level > 1:
-				next_idx = ( current_idx + 1 ) % vcount		
-				while( next_idx not in self.eidx_list ):
-					next_idx = ( next_idx + 1 ) % vcount
-				self.__createInnerPolygons( current_idx, next_idx )
-
-			#handles center polygom
-			if active:
-				if CEPoly.level % 2 == 0:
-					centerPoly_verts.append( subverts[ int( len( subverts ) / 2 ) - 1 ] )
-				centerPoly_verts.append( subverts[ int( len( subverts ) / 2 ) ] )
-
-			#increment
-			current_idx = ( current_idx + 1 ) % vcount
-			
-		self.__createCenterPolygon( centerPoly_verts )
-
+	def Revert( self ):
+		"""
+		Puts the faces around the selection back into the edit mesh the way they were at invoke.
+		"""
+		if self.region is not None:
+			self.region.Revert( self.object.data )
+		self.preview = None
 
-	@staticmethod
-	def Cleanup():
+	def Free( self ):
 		"""
-		Delete old topology and clear tags.
+		Clear the registries and free the region.
 		"""
-		for cep in CEPoly.AllCEPolygons:
-			CEPoly.BMesh.faces.remove( cep.polygon )
-		for cee in CEPoly.AllCEEdges:
+		self.polygons.clear()
+		self.edges.clear()
+		self.verts.clear()
+		self.subvert_loops.clear()
+		self.preview = None
+		self.bmesh = None
+		if self.region is not None:
+			self.region.Free()
+			self.region = None
+
+
+class CEPreview( object ):
+	"""
+	Subverts and subvert loops of the topology generated for one level, held as elements of the edit
+	mesh. Slide and pinch only move subverts along their edges, so the live preview rewrites
+	coordinates and interpolated loop data instead of rebuilding the topology. vmap and fmap take the
+	elements of the spliced region to the edit mesh, the region keeps that bmesh and its elements alive.
+	"""
+	def __init__( self, mesh, vmap, fmap ):
+		self.level = mesh.level
+
+		#rest positions of the original verts, copied once however many subverts hang off them
+		positions = {}
+		def Position( cev ):
+			co = positions.get( cev, None )
+			if co is None:
+				co = cev.vert.co.copy()
+				positions[ cev ] = co
+			return co
+
+		#( subverts, ept1 pos, ept2 pos, slide_switch ) for every active edge
+		self.edges = []
+		for cee in mesh.edges.values():
 			if cee.active:
-				CEPoly.BMesh.edges.remove( cee.edge )
-		for e in CEPoly.BMesh.edges:
-			e.tag = False
-				
-	@staticmethod
-	def ClearStaticMembers():
+				subverts = [ vmap[ v.vert ] for v in cee.GetInnerSubverts() ]
+				self.edges.append( ( subverts, Position( cee.ept1 ), Position( cee.ept2 ), cee.slide_switch ) )
+
+		#( face, corner, subvert, start pos, end pos, start loop idx, end loop idx, uv_sources, color_sources )
+		#for every subvert loop
+		self.loops = []
+		for new_poly, corner, vert, start_vert, end_vert, ka, kb, uv_sources, color_sources in mesh.subvert_loops:
+			self.loops.append( ( fmap[ new_poly ], corner, vmap[ vert.vert ], Position( start_vert ), Position( end_vert ), ka, kb, uv_sources, color_sources ) )
+
+	def Apply( self, bm, slide, pinch ):
 		"""
-		ClearStaticMembers
+		Moves the subverts of bm to the given slide and pinch and re-interpolates their loop data.
+		Returns the moved verts.
 		"""
-		CEPoly.AllCEPolygons.clear()
-		CEPoly.AllCEEdges.clear()
-		CEPoly.ALLCEVerts.clear()
+		moved = []
+		for subverts, pos1, pos2, slide_switch in self.edges:
+			edge_slide = -slide if slide_switch else slide
+			for v, p in zip( subverts, SubvertPositions( pos1, pos2, self.level, edge_slide, pinch ) ):
+				v.co = p
+				moved.append( v )
+
+		uvlayers = { layer.name : layer for layer in bm.loops.layers.uv.values() }
+		colorlayers = { layer.name : layer for layer in bm.loops.layers.color.values() }
+		for face, corner, vert, start_3d, end_3d, ka, kb, uv_sources, color_sources in self.loops:
+			weight = ( vert.co - start_3d ).length / ( end_3d - start_3d ).length
+			loop = face.loops[corner]
+			for name, src in uv_sources:
+				loop[uvlayers[name]].uv = src[ka] + ( ( src[kb] - src[ka] ) * weight )
+			for name, src in color_sources:
+				loop[colorlayers[name]] = src[ka] + ( ( src[kb] - src[ka] ) * weight )
+
+		return moved
 
 
 class MESH_OT_connect_edge( bpy.types.Operator ):
@@ -505,73 +708,49 @@ class MESH_OT_connect_edge( bpy.types.Operator ):
 				context.active_object.type == 'MESH' and
 				context.object.data.is_editmode )
 
-	def LocalizeNewBMesh( self ):
+	def cleanup( self ):
 		"""
-		Copy the cached bmesh, and transfer all stale cached verts/edges/faces to use active ones of the 
-		copy bmesh.
+		Clear the CE data structures and free memory of the regions
 		"""
-		bm = self.bmesh.copy()
-		bm.verts.ensure_lookup_table()
-		bm.edges.ensure_lookup_table()
-		bm.faces.ensure_lookup_table()
-		CEEdge.BMesh = bm
-		CEPoly.BMesh = bm
-		CEPoly.level = self.level
-		for p in CEPoly.AllCEPolygons:
-			p.polygon = bm.faces[p.index]
-		for e in CEPoly.AllCEEdges:
-			e.edge = bm.edges[e.index]
-		for v in CEPoly.ALLCEVerts:
-			v.vert = bm.verts[v.index]
-		return bm
+		if hasattr( self, "ce_meshes" ):
+			for cem in self.ce_meshes:
+				cem.Free()
+			self.ce_meshes.clear()
 
 	def cancel( self, context ):
-		"""
-		Clear static members and free memory of cached bmesh
-		"""
-		CEPoly.ClearStaticMembers()
-		if hasattr(self, "bmesh"):
-			self.bmesh.free()
+		self.cleanup()
 		
 	def execute( self, context ):
 		"""
-		Actually modifies the geometry and connects edges using the cached data structure.
-		Also manages undo bmesh process.
+		Actually modifies the geometry and connects edges using the cached data structures of every
+		mesh. The result is spliced into the edit mesh in place of the faces around the selection.
 
 		Args:
 			context (bpy.types.context): Blender context for operation
 		"""
 
-		if self.bmesh is None:
+		if not getattr( self, "ce_meshes", None ):
 			return { 'CANCELLED' }
 
-		#bmesh undo funcs only work in object mode
-		bpy.ops.object.mode_set( mode='OBJECT', toggle=False )
-
-		#update the cached data structure to use non-stale data
-		bm = self.LocalizeNewBMesh()
-
-		#add new verts
-		for cee in CEPoly.AllCEEdges:
-			cee.CreateSubverts( self.level, self.slide, self.pinch )
-
-		#create new topology that adds edges between all new verts
-		for cep in CEPoly.AllCEPolygons:
-			cep.ConnectEdges()
+		for cem in self.ce_meshes:
+			cem.ConnectEdges( self.level, self.slide, self.pinch )
 
-		#delete old geo
-		CEPoly.Cleanup()
-
-		#merge cached bmesh into scene mesh
-		targetMesh = context.active_object.data
-		bm.to_mesh( targetMesh )
-		bm.calc_loop_triangles()
-		targetMesh.update()
-		bm.free()
-		
-		#switch back to edit mode
-		bpy.ops.object.mode_set( mode='EDIT', toggle=False )
+		return { 'FINISHED' }
 
+	def UpdatePreview( self, context ):
+		"""
+		Live update for slide and pinch. Reuses the topology built by the last execute and only moves
+		the subverts. Falls back to execute when that topology was built for a different level.
+		"""
+		if any( cem.preview is None or cem.preview.level != self.level for cem in self.ce_meshes ):
+			return self.execute( context )
+
+		for cem in self.ce_meshes:
+			mesh = cem.object.data
+			bm = bmesh.from_edit_mesh( mesh )
+			moved = cem.preview.Apply( bm, self.slide, self.pinch )
+			UpdateRegionNormals( bm, moved )
+			UpdateEditMesh( mesh, topology=False )
 		return { 'FINISHED' }
 
 	def modal( self, context, event ):
@@ -585,6 +764,9 @@ class MESH_OT_connect_edge( bpy.types.Operator ):
 		"""
 
 		if event.type == 'LEFTMOUSE':
+			if self._budget.pending:
+				self.UpdatePreview( context )
+			self._budget.Stop( context )
 			return { 'FINISHED' }
 
 		elif event.type == 'MOUSEMOVE':
@@ -599,7 +781,13 @@ class MESH_OT_connect_edge( bpy.types.Operator ):
 				self.slide = delta_x * 2.0
 			else:
 				return { 'RUNNING_MODAL' }
-			self.execute( context )
+			#slide and pinch are absolute so intermediate moves can be dropped
+			if self._budget.Poll( event ):
+				self.UpdatePreview( context )
+
+		elif event.type == 'TIMER':
+			if self._budget.Poll( event ):
+				self.UpdatePreview( context )
 
 		elif event.type == 'WHEELUPMOUSE':
 			self.level = min( self.level + 1, 64 )
@@ -610,6 +798,10 @@ class MESH_OT_connect_edge( bpy.types.Operator ):
 			self.execute( context )
 
 		elif event.type == 'ESC':
+			self._budget.Stop( context )
+			for cem in self.ce_meshes:
+				cem.Revert()
+			self.cleanup()
 			return { 'CANCELLED' }
 
 		return { 'RUNNING_MODAL' }
@@ -617,14 +809,17 @@ class MESH_OT_connect_edge( bpy.types.Operator ):
 	def invoke( self, context, event ):
 		"""
 		First function called when op is run. It ensures blender is in correct state and clears data from preveious
-		op evaluation. Then it builds the CE data structure, and caches the bmesh for the execute function.
+		op evaluation. Then it builds the CE data structure of every mesh in edit mode from the region around
+		its selection for the execute function.
 
 		Args:
 			context (bpy.types.context): Blender context for operation
 			event (bpy.types.event): Event input for operation
 		"""
 
-		self.bmesh = None
+		#clear members from previous time op was run
+		self.cleanup()
+		self.ce_meshes = []
 
 		#ensure correct state
 		if context.object is None or context.mode == 'OBJECT':
@@ -634,56 +829,23 @@ class MESH_OT_connect_edge( bpy.types.Operator ):
 		sel_mode = context.tool_settings.mesh_select_mode[:]
 		if not sel_mode[1]:
 			return { 'CANCELLED' }
-		
-		#clear members from previous time op was run
-		CEPoly.ClearStaticMembers()
-		if self.bmesh is not None:
-			self.bmesh.free()
 
-		rmmesh = rmlib.rmMesh.GetActive( context )
-		if rmmesh is not None:
+		for rmmesh in rmlib.iter_edit_meshes( context, mode_filter=True ):
 			#localize a readonly bmesh
 			with rmmesh as rmmesh:
 				rmmesh.readonly = True
 
-				CEEdge.BMesh = rmmesh.bmesh
-				CEPoly.BMesh = rmmesh.bmesh
-				
-				for e in rmmesh.bmesh.edges:
-					e.tag = False
-				for p in rmmesh.bmesh.faces:
-					p.tag = False
-					
-				selected_edges = rmlib.rmEdgeSet.from_selection( rmmesh )
-				if len( selected_edges ) < 1:
-					return { 'CANCELLED' }
-
-				#build list of active polygons. These are polys that neighbor selected edges. A poly with more than
-				#two selected edges is considered a joint polygons. These need to be operated on first to allow for
-				#slide feature.
-				active_polygons = rmlib.rmPolygonSet()
-				for p in selected_edges.polygons:
-					count = 0
-					for i in range( len( p.verts ) ):
-						v1 = p.verts[i-1]
-						v2 = p.verts[i]
-						e = rmlib.rmEdgeSet.from_endpoints( v1, v2 )
-						if e.select:
-							count += 1
-					if count > 2:
-						active_polygons.insert( 0, p )
-					else:
-						active_polygons.append( p )
-					
-				#build the CE data structure.
-				for p in active_polygons:
-					CEPoly.AccumulateCEElem( p )
-				if len( CEPoly.AllCEPolygons ) < 1:
-					return { 'CANCELLED' }
-
-				#cache a copy of the current bmesh
-				self.bmesh = rmmesh.bmesh.copy()
+				cem = CEMesh( rmmesh.object )
+				if not cem.BuildFromSelection( rmmesh.bmesh ):
+					cem.Free()
+					continue
+				self.ce_meshes.append( cem )
+
+		if len( self.ce_meshes ) < 1:
+			return { 'CANCELLED' }
 				
+		self._budget = FrameBudget()
+		self._budget.Start( context )
 		context.window_manager.modal_handler_add( self ) #required for modal to run
 		self.execute( context )
 		return { 'RUNNING_MODAL' }
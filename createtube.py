@@ -1,6 +1,8 @@
 import bpy, bmesh, mathutils
 import rmlib
 import math
+from .modalutil import FrameBudget
+from .meshutil import MeshRegion
 
 class Tube():
 	index = -1
@@ -49,14 +51,16 @@ class MESH_OT_createtube( bpy.types.Operator ):
 		max=180.0
 	)
 
-	def cancel( self, context ):
-		if hasattr( self, 'bmesh' ):
-			if self.bmesh is not None:
-				self.bmesh.free()
-				self.bmesh = None
+	def cleanup( self ):
+		if getattr( self, 'region', None ) is not None:
+			self.region.Free()
+			self.region = None
 
 		if hasattr( self, '_tubes' ):
 			self._tubes.clear()
+
+	def cancel( self, context ):
+		self.cleanup()
 	
 	@classmethod
 	def poll( cls, context ):
@@ -68,7 +72,8 @@ class MESH_OT_createtube( bpy.types.Operator ):
 				 not context.tool_settings.mesh_select_mode[:][0] )
 
 	def LocalizeNewBMesh( self ):
-		bm = self.bmesh.copy()
+		#the region starts out empty, so every execute replaces the tubes of the previous one
+		bm = self.region.Copy()
 		bm.verts.ensure_lookup_table()
 		bm.edges.ensure_lookup_table()
 		bm.faces.ensure_lookup_table()
@@ -79,13 +84,18 @@ class MESH_OT_createtube( bpy.types.Operator ):
 		return bm
 		
 	def execute( self, context ):
-		bpy.ops.object.mode_set( mode='OBJECT', toggle=False )
+		if getattr( self, 'region', None ) is None:
+			return { 'CANCELLED' }
 
 		#localize writable mesh
 		bm = self.LocalizeNewBMesh()
 
 		#get/create uv layer
-		uv_layer = bm.loops.layers.uv.verify()
+		uv_layer = None
+		if self.uv_name is not None:
+			uv_layer = bm.loops.layers.uv.get( self.uv_name )
+		if uv_layer is None:
+			uv_layer = bm.loops.layers.uv.verify()
 
 		#create tubes
 		for tube in self._tubes:
@@ -142,18 +152,17 @@ class MESH_OT_createtube( bpy.types.Operator ):
 					face.loops[3][uv_layer].uv = ( u_step * j, next_length / tube.length )
 				current_length = next_length
 				
-		targetMesh = context.active_object.data
-		bm.to_mesh( targetMesh )
-		bm.calc_loop_triangles()
-		targetMesh.update()
+		#stitch the tubes into the edit mesh
+		self.region.Commit( context.active_object.data, bm )
 		bm.free()
 		
-		bpy.ops.object.mode_set( mode='EDIT', toggle=False )
-		
 		return { 'FINISHED' }
 
 	def modal( self, context, event ):
 		if event.type == 'LEFTMOUSE':
+			if self._budget.pending:
+				self.execute( context )
+			self._budget.Stop( context )
 			return { 'FINISHED' }
 		elif event.type == 'MOUSEMOVE':
 			mouse_current_2d = mathutils.Vector( ( event.mouse_region_x, event.mouse_region_y ) )
@@ -173,18 +182,28 @@ class MESH_OT_createtube( bpy.types.Operator ):
 			self.mouse_prev_2d = mouse_current_2d
 			self.radius += fDelta
 			self.radius = max( 0.001, self.radius )
-			self.execute( context )
+			if self._budget.Poll( event ):
+				self.execute( context )
+		elif event.type == 'TIMER':
+			if self._budget.Poll( event ):
+				self.execute( context )
 		elif event.type == 'WHEELUPMOUSE':
 			self.level = min( self.level + 1, 128 )
 		elif event.type == 'WHEELDOWNMOUSE':
 			self.level = max( self.level - 1, 3 )	
 		elif event.type == 'ESC':
+			self._budget.Stop( context )
+			self.region.Revert( context.active_object.data )
+			self.cleanup()
 			return { 'CANCELLED' }
 
 		return { 'RUNNING_MODAL' }
 	
 	def invoke( self, context, event ):
-		self.bmesh = None
+		#the region of the previous run is kept for redo until now
+		self.cleanup()
+		self.region = None
+		self.uv_name = None
 		self._tubes = []
 
 		self.radius = 0.001
@@ -197,14 +216,18 @@ class MESH_OT_createtube( bpy.types.Operator ):
 		rmmesh = rmlib.rmMesh.GetActive( context )
 		if rmmesh is not None:
 			with rmmesh as rmmesh:
-				rmmesh.readme = True
+				rmmesh.readonly = True
 
 				for v in rmmesh.bmesh.verts:
 					v.tag = False
 				for p in rmmesh.bmesh.faces:
 					p.tag = False
 
-				self.bmesh = rmmesh.bmesh.copy()
+				#tubes are new geometry, so the region holds no faces of the edit mesh
+				self.region = MeshRegion( rmmesh.bmesh, [] )
+				uv_layer = rmmesh.bmesh.loops.layers.uv.active
+				if uv_layer is not None:
+					self.uv_name = uv_layer.name
 
 				vAvg = mathutils.Vector()
 				nSelCount = 0
@@ -336,8 +359,11 @@ class MESH_OT_createtube( bpy.types.Operator ):
 		if len( self._tubes ) < 1:
 			if sel_mode[2]:
 				self.report( { 'ERROR' }, 'Did not meet requirements for rebuilding selected tube(s). Topology must be all quads and no caps!!!' )
+			self.cleanup()
 			return { 'CANCELLED' }
-			
+
+		self._budget = FrameBudget()
+		self._budget.Start( context )
 		context.window_manager.modal_handler_add( self )
 		return { 'RUNNING_MODAL' }
 
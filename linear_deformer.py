@@ -5,8 +5,15 @@
 import bpy, bmesh, mathutils, bpy_extras, gpu
 from gpu_extras.batch import batch_for_shader
 import rmlib
+from .modalutil import FrameBudget, ViewCache
+from .meshutil import NormalRegion
 
-import math, string, random
+import math, string, random, itertools, array
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
 
 pass_keys = { 'NUMPAD_0', 'NUMPAD_1', 'NUMPAD_3', 'NUMPAD_4', 
 			 'NUMPAD_5', 'NUMPAD_6', 'NUMPAD_7', 'NUMPAD_8', 
@@ -15,10 +22,6 @@ pass_keys = { 'NUMPAD_0', 'NUMPAD_1', 'NUMPAD_3', 'NUMPAD_4',
 
 EPSILON = 0.00001
 
-APPLY_VERT_ID = 0
-APPLY_VERT_WEIGHT = 1
-APPLY_VERT_POSITION = 2
-
 ENDPOINT_HANDLE_SIZE = 6.0
 LINE_WIDTH_SIZE = 1.0
 
@@ -33,7 +36,87 @@ CONSTRAIN_AXIS_VERTICAL = 1
 QUADRATIC_EASING_LIN = 0
 QUADRATIC_EASING_IN = 1
 QUADRATIC_EASING_OUT = 2
-QUADRATIC_EASING_COUNT = 3
+QUADRATIC_EASING_CURVE = 3
+QUADRATIC_EASING_COUNT = 4
+
+FALLOFF_SHAPE_LINEAR = 0
+FALLOFF_SHAPE_RADIAL = 1
+FALLOFF_SHAPE_SPHERICAL = 2
+FALLOFF_SHAPE_CYLINDRICAL = 3
+FALLOFF_SHAPE_COUNT = 4
+FALLOFF_SHAPE_NAMES = ( 'LINEAR', 'RADIAL', 'SPHERICAL', 'CYLINDRICAL' )
+
+FALLOFF_LUT_SIZE = 256
+FALLOFF_CURVE_NODEGROUP = 'rmKit_FalloffCurve'
+FALLOFF_CURVE_NODE = 'FalloffCurve'
+
+HISTORY_BUDGET_DEFAULT = 64 * 1024 * 1024
+
+
+def GetFalloffCurveNode( create=False ):
+	"""
+	Returns the float curve node holding the user falloff curve. The node lives in a fake user
+	node group so the curve is saved with the blend file.
+	"""
+	ng = bpy.data.node_groups.get( FALLOFF_CURVE_NODEGROUP, None )
+	if ng is None:
+		if not create:
+			return None
+		ng = bpy.data.node_groups.new( FALLOFF_CURVE_NODEGROUP, 'ShaderNodeTree' )
+		ng.use_fake_user = True
+
+	node = ng.nodes.get( FALLOFF_CURVE_NODE, None )
+	if node is None:
+		if not create:
+			return None
+		node = ng.nodes.new( 'ShaderNodeFloatCurve' )
+		node.name = FALLOFF_CURVE_NODE
+	return node
+
+
+def BuildFalloffLUT( easing ):
+	samples = [ float( i ) / float( FALLOFF_LUT_SIZE - 1 ) for i in range( FALLOFF_LUT_SIZE ) ]
+	if easing == QUADRATIC_EASING_IN:
+		samples = [ rmlib.util.EaseInCircular( t ) for t in samples ]
+	elif easing == QUADRATIC_EASING_OUT:
+		samples = [ rmlib.util.EaseOutCircular( t ) for t in samples ]
+	elif easing == QUADRATIC_EASING_CURVE:
+		node = GetFalloffCurveNode()
+		if node is not None:
+			node.mapping.initialize()
+			curve = node.mapping.curves[ 0 ]
+			samples = [ min( max( node.mapping.evaluate( curve, t ), 0.0 ), 1.0 ) for t in samples ]
+
+	if np is None:
+		return samples
+	return np.array( samples, dtype=np.float32 )
+
+
+def SampleFalloffLUT( lut, t ):
+	f = min( max( t, 0.0 ), 1.0 ) * ( FALLOFF_LUT_SIZE - 1 )
+	i = min( int( f ), FALLOFF_LUT_SIZE - 2 )
+	return lut[ i ] + ( lut[ i + 1 ] - lut[ i ] ) * ( f - i )
+
+
+class FalloffLUTs():
+	"""
+	One fixed resolution lookup table per easing mode. Every falloff profile, including the user
+	curve, costs the same to evaluate since vertex weights and the on screen preview are both
+	looked up from these tables. Built once per invoke.
+	"""
+	def __init__( self ):
+		self.m_luts = [ BuildFalloffLUT( easing ) for easing in range( QUADRATIC_EASING_COUNT ) ]
+		self.m_domain = None
+		if np is not None:
+			self.m_domain = np.linspace( 0.0, 1.0, FALLOFF_LUT_SIZE, dtype=np.float32 )
+
+	def Sample( self, easing, t ):
+		return SampleFalloffLUT( self.m_luts[ easing ], t )
+
+	def Lookup( self, easing, values ):
+		if np is None:
+			return [ SampleFalloffLUT( self.m_luts[ easing ], t ) for t in values ]
+		return np.interp( values, self.m_domain, self.m_luts[ easing ] ).astype( np.float32 )
 
 
 class MouseState():
@@ -41,6 +124,8 @@ class MouseState():
 		self.__context = context
 
 		self.m_mouse_current_3d = None
+		self.m_mouse_current_vp = None
+		self.m_mouse_current_key = None
 
 		self.m_mouse_current_2d = None
 		self.m_mmb_start_2d = None
@@ -49,9 +134,16 @@ class MouseState():
 		self.m_mouse_rotate_start_vec_2d = None
 		self.m_mouse_scale_start_2d = None
 
-	def UpdateCurrentMouse( self, event, start_point ):
+	def UpdateCurrentMouse( self, event, rm_vp, start_point ):
+		#rm_vp comes from the ViewCache and is only rebuilt when the view changes, so the mouse only
+		#gets projected again when it moved, the view changed or the plane point moved
+		key = ( event.mouse_region_x, event.mouse_region_y, start_point.to_tuple() )
+		if rm_vp is self.m_mouse_current_vp and key == self.m_mouse_current_key:
+			return
+		self.m_mouse_current_vp = rm_vp
+		self.m_mouse_current_key = key
 		self.m_mouse_current_2d = mathutils.Vector( ( event.mouse_region_x, event.mouse_region_y ) )
-		self.m_mouse_current_3d = rmlib.rmViewport( self.__context ).get_mouse_on_plane( self.__context, start_point, None, self.m_mouse_current_2d )
+		self.m_mouse_current_3d = rm_vp.get_mouse_on_plane( self.__context, start_point, None, self.m_mouse_current_2d )
 
 
 class ToolState():
@@ -61,26 +153,43 @@ class ToolState():
 		self.middle_point = None
 		self.end_point = None
 		self.quadratic_easing = QUADRATIC_EASING_LIN
+		self.falloff_shape = FALLOFF_SHAPE_LINEAR
+		self.influence_cutoff = 0.0
 		self.constrain_axis_idx = -1
 		self.contrain_axis_2d = CONSTRAIN_AXIS_HORIZONTAL
 		self.transform_origin = None
 
-	def ComputeTransformOrigin( self, context, bm, apply_tool_verts ):
+	@classmethod
+	def from_scene( cls, context ):
+		state = cls()
+		state.falloff_shape = FALLOFF_SHAPE_NAMES.index( context.scene.rmkit_props.falloff_shape )
+		state.influence_cutoff = context.scene.rmkit_props.falloff_cutoff
+		return state
+
+	def ComputeTransformOrigin( self, context, targets ):
 		#set transform_origin
 		self.transform_origin = self.start_point
 		transform_pivot = context.scene.tool_settings.transform_pivot_point
 		if transform_pivot == 'BOUNDING_BOX_CENTER':
-			if len( apply_tool_verts ) > 0:
-				bbmin = apply_tool_verts[ 0 ][ 2 ].copy()
-				bbmax = apply_tool_verts[ 0 ][ 2 ].copy()
-				for vert_data in apply_tool_verts:
-					bbmin[ 0 ] = min( vert_data[ 2 ][ 0 ], bbmin[ 0 ] )
-					bbmax[ 0 ] = max( vert_data[ 2 ][ 0 ], bbmax[ 0 ] )
-					bbmin[ 1 ] = min( vert_data[ 2 ][ 1 ], bbmin[ 1 ] )
-					bbmax[ 1 ] = max( vert_data[ 2 ][ 1 ], bbmax[ 1 ] )
-					bbmin[ 2 ] = min( vert_data[ 2 ][ 2 ], bbmin[ 2 ] )
-					bbmax[ 2 ] = max( vert_data[ 2 ][ 2 ], bbmax[ 2 ] )
-				self.transform_origin = context.active_object.matrix_world @ ( ( bbmax + bbmin ) * 0.5 )
+			loaded = [ target for target in targets if len( target.m_engine ) > 0 ]
+			if len( loaded ) == 1:
+				#a single object keeps its local bounds center
+				bbmin, bbmax = loaded[ 0 ].m_engine.Bounds()
+				self.transform_origin = loaded[ 0 ].m_matrix @ ( ( bbmax + bbmin ) * 0.5 )
+			elif len( loaded ) > 1:
+				#across objects the bounds are taken around the world space verts
+				bbmin = None
+				bbmax = None
+				for target in loaded:
+					wmin, wmax = target.m_engine.Bounds( target.m_matrix )
+					if bbmin is None:
+						bbmin = wmin
+						bbmax = wmax
+						continue
+					for i in range( 3 ):
+						bbmin[ i ] = min( wmin[ i ], bbmin[ i ] )
+						bbmax[ i ] = max( wmax[ i ], bbmax[ i ] )
+				self.transform_origin = ( bbmax + bbmin ) * 0.5
 		elif transform_pivot == 'CURSOR':
 			self.transform_origin = context.scene.cursor.location
 		elif transform_pivot == 'INDIVIDUAL_ORIGINS':
@@ -88,20 +197,27 @@ class ToolState():
 		elif transform_pivot == 'MEDIAN_POINT':
 			self.transform_origin = self.start_point
 		elif transform_pivot == 'ACTIVE_ELEMENT':
-			active_elem = bm.select_history.active
+			active_target = None
+			for target in targets:
+				if target.m_object == context.active_object:
+					active_target = target
+					break
+			if active_target is None:
+				return
+			active_elem = active_target.BMesh().select_history.active
 			if active_elem is not None and isinstance( active_elem, bmesh.types.BMVert ):
-				self.transform_origin = context.active_object.matrix_world @ active_elem.co
+				self.transform_origin = active_target.m_matrix @ active_elem.co
 			elif active_elem is not None and isinstance( active_elem, bmesh.types.BMEdge ):
 				active_verts = list( active_elem.verts )
 				self.transform_origin = ( active_verts[ 0 ].co + active_verts[ 1 ].co ) * 0.5
-				self.transform_origin = context.active_object.matrix_world @ self.transform_origin
+				self.transform_origin = active_target.m_matrix @ self.transform_origin
 			elif active_elem is not None and isinstance( active_elem, bmesh.types.BMFace ):
 				active_verts = list( active_elem.verts )
 				self.transform_origin = mathutils.Vector( ( 0.0, 0.0, 0.0 ) )
 				for v in active_verts:
 					self.transform_origin += v.co
 				self.transform_origin *= 1.0 / len( active_verts )
-				self.transform_origin = context.active_object.matrix_world @ self.transform_origin
+				self.transform_origin = active_target.m_matrix @ self.transform_origin
 
 	def Invert( self ):
 		temp = self.start_point
@@ -131,74 +247,479 @@ class ToolState():
 		return -1
 
 
-class ToolHistory():
+class DeformEngine():
+	"""
+	Batched transform of the tool verts. The verts come in two bands: the fully affected band moves
+	with a single rigid composite matrix and only the partially affected band gets a per vert
+	weighted transform. Positions and weights are packed into contiguous float32 arrays so the
+	composite matrices only get built once per event and each band is transformed in a single
+	vectorized pass. Falls back to a per vert loop when numpy is missing.
+	"""
 	def __init__( self ):
-		self.m_undo = []
-		self.m_redo = []
-		self.m_initial_vert_positions = []
+		self.m_rigid_ids = []
+		self.m_rigid_positions = []
+		self.m_ids = []
+		self.m_weights = []
+		self.m_positions = []
+		self.m_region = None
+
+	def __len__( self ):
+		return len( self.m_rigid_ids ) + len( self.m_ids )
+
+	def Load( self, rigid_ids, rigid_positions, ids, weights, positions ):
+		self.m_rigid_ids = rigid_ids
+		self.m_rigid_positions = rigid_positions
+		self.m_ids = ids
+		self.m_weights = weights
+		self.m_positions = positions
+		self.m_region = None
+
+	def Bounds( self, matrix=None ):
+		#local space bounds, or the world space bounds of the verts when a matrix is given
+		if np is None:
+			all_positions = list( self.m_rigid_positions ) + list( self.m_positions )
+			if matrix is not None:
+				all_positions = [ matrix @ pos for pos in all_positions ]
+			bbmin = all_positions[ 0 ].copy()
+			bbmax = all_positions[ 0 ].copy()
+			for pos in all_positions:
+				for i in range( 3 ):
+					bbmin[ i ] = min( pos[ i ], bbmin[ i ] )
+					bbmax[ i ] = max( pos[ i ], bbmax[ i ] )
+			return bbmin, bbmax
+		all_positions = np.concatenate( ( self.m_rigid_positions, self.m_positions ) )
+		if matrix is not None:
+			rot, pos = self.__to_affine( matrix )
+			all_positions = all_positions @ rot.T + pos
+		return mathutils.Vector( all_positions.min( axis=0 ) ), mathutils.Vector( all_positions.max( axis=0 ) )
+
+	def Clear( self ):
+		self.__init__()
+
+	def UpdateNormals( self, bm ):
+		#only the faces around the loaded verts can change while they are being transformed
+		if self.m_region is None:
+			bm.verts.ensure_lookup_table()
+			self.m_region = NormalRegion( bm, [ bm.verts[ i ] for i in itertools.chain( self.m_rigid_ids, self.m_ids ) ] )
+		self.m_region.Update( bm )
+
+	@staticmethod
+	def __write( bm, ids, positions ):
+		#bmesh has no foreach_set so the bulk write is a single tight loop over the packed result
+		bm.verts.ensure_lookup_table()
+		bm_verts = bm.verts
+		if np is not None:
+			positions = positions.tolist()
+		for vert_id, co in zip( ids, positions ):
+			bm_verts[ vert_id ].co = co
+
+	def Write( self, bm, positions ):
+		self.__write( bm, self.m_ids, positions )
+
+	def Reset( self, bm ):
+		self.__write( bm, self.m_rigid_ids, self.m_rigid_positions )
+		self.__write( bm, self.m_ids, self.m_positions )
+
+	def __transform_rigid( self, bm, mat ):
+		#the fully affected band shares one composite matrix
+		if len( self.m_rigid_ids ) < 1:
+			return
+		if np is None:
+			self.__write( bm, self.m_rigid_ids, [ mat @ pos for pos in self.m_rigid_positions ] )
+			return
+		rot, pos = self.__to_affine( mat )
+		self.__write( bm, self.m_rigid_ids, self.m_rigid_positions @ rot.T + pos )
+
+	@staticmethod
+	def __to_affine( mat ):
+		#split a 4x4 mathutils.Matrix into a 3x3 linear part and a translation
+		return np.array( mat.to_3x3(), dtype=np.float64 ), np.array( mat.translation, dtype=np.float64 )
+
+	def Scale( self, bm, pre_mat, post_mat, axis_mask, apply_value ):
+		"""
+		Per vert transform is pre_mat @ S(w) @ post_mat where S(w) scales the axes in axis_mask by
+		( apply_value - 1.0 ) * w + 1.0 and leaves the rest untouched.
+		"""
+		sclMat = mathutils.Matrix.Identity( 4 )
+		for j in range( 3 ):
+			sclMat[ j ][ j ] = apply_value if axis_mask[ j ] else 1.0
+		self.__transform_rigid( bm, pre_mat @ sclMat @ post_mat )
+
+		if np is None:
+			sclMat = mathutils.Matrix.Identity( 4 )
+			new_positions = []
+			for i in range( len( self.m_ids ) ):
+				lerp_scale = ( apply_value - 1.0 ) * self.m_weights[ i ] + 1.0
+				for j in range( 3 ):
+					sclMat[ j ][ j ] = lerp_scale if axis_mask[ j ] else 1.0
+				new_positions.append( ( pre_mat @ sclMat @ post_mat ) @ self.m_positions[ i ] )
+			self.Write( bm, new_positions )
+			return
+
+		pre_rot, pre_pos = self.__to_affine( pre_mat )
+		post_rot, post_pos = self.__to_affine( post_mat )
+
+		lerp_scale = ( apply_value - 1.0 ) * self.m_weights + 1.0
+		scale = np.where( np.array( axis_mask, dtype=bool ), lerp_scale[ :, None ], 1.0 )
+
+		positions = self.m_positions @ post_rot.T + post_pos
+		positions *= scale
+		self.Write( bm, positions @ pre_rot.T + pre_pos )
+
+	def Rotate( self, bm, pre_mat, post_mat, axis, angle ):
+		"""
+		Per vert transform is pre_mat @ R(angle * w, axis) @ post_mat.
+		"""
+		self.__transform_rigid( bm, pre_mat @ mathutils.Matrix.Rotation( angle, 4, axis ) @ post_mat )
+
+		if np is None:
+			new_positions = []
+			for i in range( len( self.m_ids ) ):
+				rotMat = mathutils.Matrix.Rotation( angle * self.m_weights[ i ], 4, axis )
+				new_positions.append( ( pre_mat @ rotMat @ post_mat ) @ self.m_positions[ i ] )
+			self.Write( bm, new_positions )
+			return
+
+		pre_rot, pre_pos = self.__to_affine( pre_mat )
+		post_rot, post_pos = self.__to_affine( post_mat )
+
+		k = np.array( axis.normalized(), dtype=np.float64 )
+		theta = angle * self.m_weights.astype( np.float64 )
+		cos_t = np.cos( theta )[ :, None ]
+		sin_t = np.sin( theta )[ :, None ]
+
+		#rodrigues rotation about k with a per vert angle
+		positions = self.m_positions @ post_rot.T + post_pos
+		k_dot = ( positions @ k )[ :, None ]
+		positions = positions * cos_t + np.cross( k, positions ) * sin_t + k * k_dot * ( 1.0 - cos_t )
+		self.Write( bm, positions @ pre_rot.T + pre_pos )
+
+	def Move( self, bm, xfrm, move_vec ):
+		"""
+		Per vert transform is a world space offset of move_vec * w.
+		"""
+		xfrm_inv = xfrm.inverted()
+		self.__transform_rigid( bm, mathutils.Matrix.Translation( xfrm_inv.to_3x3() @ move_vec ) )
+
+		if np is None:
+			new_positions = []
+			for i in range( len( self.m_ids ) ):
+				vpos_wld = xfrm @ self.m_positions[ i ]
+				new_positions.append( xfrm_inv @ ( vpos_wld + ( move_vec * self.m_weights[ i ] ) ) )
+			self.Write( bm, new_positions )
+			return
+
+		#the offset is linear in w so it can be taken to object space once for all verts
+		local_vec = np.array( xfrm_inv.to_3x3() @ move_vec, dtype=np.float64 )
+		self.Write( bm, self.m_positions + self.m_weights[ :, None ] * local_vec )
+
+
+class WeightField():
+	"""
+	Cache of the falloff weights of the work verts. The raw normalized falloff distances are stored
+	separately from the eased weights. Moving a handle only re-projects the cached world positions
+	and changing the easing only re-maps the cached distances through the LUT. The work vert
+	positions are re-read only after Invalidate() is called, i.e. when the verts moved.
+
+	For FALLOFF_SHAPE_LINEAR the distance is measured along the handle, 0.0 at start_point and 1.0
+	at end_point. For the other shapes start_point is the center and end_point sets the radius.
+	The distance is 1.0 at the center and 0.0 at the radius. SPHERICAL measures the 3d distance to
+	the center, RADIAL and CYLINDRICAL measure the distance to an axis through the center.
+
+	The work verts are split into bands once per gizmo change. Verts weighted 1.0 are fully
+	affected, verts weighted at or below the influence cutoff are left out entirely and only the
+	ones in between are partially affected.
+	"""
+	def __init__( self ):
+		self.m_ids = []
+		self.m_positions = None
+		self.m_world_positions = None
+		self.m_matrix = None
+		self.m_plane = None
+		self.m_distances = None
+		self.m_easing = None
+		self.m_weights = None
+		self.m_cutoff = None
+		self.m_bands = None
+
+	def Invalidate( self ):
+		self.m_positions = None
+
+	def Clear( self ):
+		self.__init__()
+
+	def __read_positions( self, bm, vert_ids ):
+		bm.verts.ensure_lookup_table()
+		bm_verts = bm.verts
+		if np is None:
+			self.m_ids = list( vert_ids )
+			self.m_positions = [ bm_verts[ i ].co.copy() for i in vert_ids ]
+			return
+		self.m_ids = np.array( vert_ids, dtype=np.int32 )
+		self.m_positions = np.fromiter( itertools.chain.from_iterable( bm_verts[ i ].co for i in vert_ids ), dtype=np.float32, count=len( vert_ids ) * 3 ).reshape( -1, 3 )
 
-	def CacheInitialVertPositions( self, bm ):
-		self.m_initial_vert_positions = [ v.co.copy() for v in bm.verts ]
+	def __project( self, start_point, end_point, shape, axis ):
+		final_dir = end_point - start_point
+		max_dist = final_dir.length
+		if np is None:
+			self.m_distances = []
+			for v_pos in self.m_world_positions:
+				rel = v_pos - start_point
+				if shape == FALLOFF_SHAPE_LINEAR:
+					self.m_distances.append( final_dir.dot( rel ) / ( max_dist * max_dist ) )
+				elif shape == FALLOFF_SHAPE_SPHERICAL:
+					self.m_distances.append( 1.0 - rel.length / max_dist )
+				else:
+					self.m_distances.append( 1.0 - ( rel - rmlib.util.ProjectVector( rel, axis ) ).length / max_dist )
+			return
+
+		rel = self.m_world_positions - np.array( start_point, dtype=np.float32 )
+		if shape == FALLOFF_SHAPE_LINEAR:
+			self.m_distances = rel @ ( np.array( final_dir, dtype=np.float32 ) / ( max_dist * max_dist ) )
+		else:
+			if shape != FALLOFF_SHAPE_SPHERICAL:
+				k = np.array( axis.normalized(), dtype=np.float32 )
+				rel -= ( rel @ k )[ :, None ] * k
+			self.m_distances = 1.0 - np.sqrt( np.einsum( 'ij,ij->i', rel, rel ) ) / max_dist
+
+	def __split_bands( self, cutoff ):
+		if np is None:
+			rigid = []
+			partial = []
+			for i, value in enumerate( self.m_distances ):
+				if value <= 0.0:
+					continue
+				if self.m_weights[ i ] >= 1.0:
+					rigid.append( i )
+				elif self.m_weights[ i ] > cutoff:
+					partial.append( i )
+			return ( [ self.m_ids[ i ] for i in rigid ], [ self.m_positions[ i ].copy() for i in rigid ],
+					[ self.m_ids[ i ] for i in partial ], [ self.m_weights[ i ] for i in partial ], [ self.m_positions[ i ].copy() for i in partial ] )
+
+		valid = self.m_distances > 0.0
+		rigid = valid & ( self.m_weights >= 1.0 )
+		partial = valid & ~rigid & ( self.m_weights > cutoff )
+		return ( self.m_ids[ rigid ], self.m_positions[ rigid ],
+				self.m_ids[ partial ], self.m_weights[ partial ], self.m_positions[ partial ] )
+
+	def Evaluate( self, bm, xfrm, vert_ids, tool_state, luts, axis ):
+		"""
+		Returns ( rigid_ids, rigid_positions, ids, weights, positions ). The first two are the fully
+		affected band and the rest the partially affected band. axis is only used by the RADIAL and
+		CYLINDRICAL shapes.
+		"""
+		if self.m_positions is None:
+			self.__read_positions( bm, vert_ids )
+			self.m_matrix = None
+
+		if self.m_matrix is None or self.m_matrix != xfrm:
+			if np is None:
+				self.m_world_positions = [ xfrm @ pos for pos in self.m_positions ]
+			else:
+				self.m_world_positions = self.m_positions @ np.array( xfrm.to_3x3(), dtype=np.float32 ).T + np.array( xfrm.translation, dtype=np.float32 )
+			self.m_matrix = xfrm.copy()
+			self.m_plane = None
+
+		shape = tool_state.falloff_shape
+		if shape == FALLOFF_SHAPE_LINEAR or shape == FALLOFF_SHAPE_SPHERICAL:
+			axis = None
+		plane = ( tool_state.start_point.copy(), tool_state.end_point.copy(), shape, None if axis is None else axis.copy() )
+		if self.m_plane is None or self.m_plane != plane:
+			self.__project( tool_state.start_point, tool_state.end_point, shape, axis )
+			self.m_plane = plane
+			self.m_easing = None
+
+		if self.m_easing != tool_state.quadratic_easing:
+			self.m_weights = luts.Lookup( tool_state.quadratic_easing, self.m_distances )
+			self.m_easing = tool_state.quadratic_easing
+			self.m_bands = None
 
-	def ResetToInitialVertPositions( self, bm ):
-		for i in range( len( self.m_initial_vert_positions ) ):
-			bm.verts[ i ].co = self.m_initial_vert_positions[ i ]
+		if self.m_bands is None or self.m_cutoff != tool_state.influence_cutoff:
+			self.m_bands = self.__split_bands( tool_state.influence_cutoff )
+			self.m_cutoff = tool_state.influence_cutoff
 
-	def AddHistory( self, verts ):
-		history = []
-		for vert in verts:
-			history.append( ( vert.index, vert.co.copy() ) )
+		return self.m_bands
 
-		self.m_undo.append( history )
 
-	def UndoHistory( self, bm, active_obj ):
+class ToolHistory():
+	"""
+	Undo/Redo for the falloff tool. Only the work verts are tracked, one track per edited mesh: a
+	shared index array and the float32 positions they had on invoke. Each history step stores, per
+	track, just the rows that differ from those initial positions along with their float32 deltas,
+	so all meshes always undo and redo together. Oldest steps get evicted once the packed steps
+	exceed the memory budget.
+	"""
+	def __init__( self, budget=HISTORY_BUDGET_DEFAULT ):
+		self.m_undo = []
+		self.m_redo = []
+		self.m_indices = []
+		self.m_initial_vert_positions = []
+		self.m_regions = []
+		self.m_budget = budget
+		self.m_size = 0
+
+	def SetBudget( self, budget ):
+		self.m_budget = budget
+		self.__enforce_budget()
+
+	def __read_positions( self, bm, track ):
+		bm.verts.ensure_lookup_table()
+		bm_verts = bm.verts
+		indices = self.m_indices[ track ]
+		flat_positions = itertools.chain.from_iterable( bm_verts[ i ].co for i in indices )
+		if np is None:
+			return array.array( 'f', flat_positions )
+		return np.fromiter( flat_positions, dtype=np.float32, count=len( indices ) * 3 ).reshape( -1, 3 )
+
+	def __write_positions( self, bm, track, positions ):
+		bm.verts.ensure_lookup_table()
+		bm_verts = bm.verts
+		indices = self.m_indices[ track ]
+		if np is None:
+			for i, vert_id in enumerate( indices ):
+				bm_verts[ vert_id ].co = positions[ i * 3 : i * 3 + 3 ]
+			return
+		for vert_id, co in zip( indices, positions.tolist() ):
+			bm_verts[ vert_id ].co = co
+
+	def __pack_track( self, track, positions ):
+		base = self.m_initial_vert_positions[ track ]
+		if np is None:
+			rows = array.array( 'i' )
+			deltas = array.array( 'f' )
+			for i in range( len( self.m_indices[ track ] ) ):
+				d = [ positions[ i * 3 + j ] - base[ i * 3 + j ] for j in range( 3 ) ]
+				if d[ 0 ] != 0.0 or d[ 1 ] != 0.0 or d[ 2 ] != 0.0:
+					rows.append( i )
+					deltas.extend( d )
+			return ( rows, deltas )
+
+		deltas = positions - base
+		rows = np.flatnonzero( np.any( deltas != 0.0, axis=1 ) ).astype( np.int32 )
+		return ( rows, deltas[ rows ] )
+
+	def __unpack_track( self, track, packed ):
+		rows, deltas = packed
+		if np is None:
+			positions = array.array( 'f', self.m_initial_vert_positions[ track ] )
+			for k, i in enumerate( rows ):
+				for j in range( 3 ):
+					positions[ i * 3 + j ] += deltas[ k * 3 + j ]
+			return positions
+
+		positions = self.m_initial_vert_positions[ track ].copy()
+		positions[ rows ] += deltas
+		return positions
+
+	@staticmethod
+	def __step_size( step ):
+		return sum( memoryview( rows ).nbytes + memoryview( deltas ).nbytes for rows, deltas in step )
+
+	def __enforce_budget( self ):
+		while self.m_size > self.m_budget:
+			if len( self.m_undo ) > 2: # 0 index is always original verts and -1 is the current state
+				self.m_size -= self.__step_size( self.m_undo.pop( 1 ) )
+			elif self.m_redo:
+				self.m_size -= self.__step_size( self.m_redo.pop( 0 ) )
+			else:
+				break
+
+	def __apply_step( self, bms, meshes, step ):
+		for track, bm in enumerate( bms ):
+			self.__write_positions( bm, track, self.__unpack_track( track, step[ track ] ) )
+			self.m_regions[ track ].Update( bm )
+			bmesh.update_edit_mesh( meshes[ track ] )
+
+	def CacheInitialVertPositions( self, bms, vert_ids ):
+		self.m_indices = [ array.array( 'i', ids ) if np is None else np.array( ids, dtype=np.int32 ) for ids in vert_ids ]
+		self.m_initial_vert_positions = [ self.__read_positions( bm, track ) for track, bm in enumerate( bms ) ]
+		self.m_regions = [ NormalRegion( bm, [ bm.verts[ i ] for i in ids ] ) for bm, ids in zip( bms, vert_ids ) ]
+
+	def UpdateNormals( self, bms ):
+		for track, bm in enumerate( bms ):
+			self.m_regions[ track ].Update( bm )
+
+	def ResetToInitialVertPositions( self, bms ):
+		for track, bm in enumerate( bms ):
+			self.__write_positions( bm, track, self.m_initial_vert_positions[ track ] )
+
+	def AddHistory( self, bms ):
+		step = tuple( self.__pack_track( track, self.__read_positions( bm, track ) ) for track, bm in enumerate( bms ) )
+		self.m_undo.append( step )
+		self.m_size += self.__step_size( step )
+		self.__enforce_budget()
+
+	def UndoHistory( self, bms, meshes ):
 		if self.m_undo:
-			pre_history = self.m_undo[ -1 ]
 			if len( self.m_undo ) > 1:  # 0 index is always original verts
-				self.m_undo.remove( pre_history )
-				self.m_redo.append( pre_history )
-
-			history = self.m_undo[ -1 ]
-			for h_vert in history:
-				bm.verts[ h_vert[ 0 ] ].co = h_vert[ 1 ].copy()
+				self.m_redo.append( self.m_undo.pop() )
 
-			bm.normal_update()
-			bmesh.update_edit_mesh( active_obj.data )
+			self.__apply_step( bms, meshes, self.m_undo[ -1 ] )
 
-	def RedoHistory( self, bm, active_obj ):
+	def RedoHistory( self, bms, meshes ):
 		if self.m_redo:
-			history = self.m_redo[ -1 ]
-			for h_vert in history:
-				bm.verts[ h_vert[ 0 ] ].co = h_vert[ 1 ].copy()
-
-			self.m_redo.remove( history )
+			history = self.m_redo.pop()
 			self.m_undo.append( history )
 
-			bm.normal_update()
-			bmesh.update_edit_mesh( active_obj.data )
+			self.__apply_step( bms, meshes, history )
 
 	def ClearUndo( self ):
+		for step in self.m_undo:
+			self.m_size -= self.__step_size( step )
 		self.m_undo.clear()
 
 	def ClearRedo( self ):
+		for step in self.m_redo:
+			self.m_size -= self.__step_size( step )
 		self.m_redo.clear()
 
 	def ClearAll( self ):
 		self.ClearUndo()
 		self.ClearRedo()
+		self.m_regions = []
+
+
+class FalloffTarget():
+	"""
+	Per object state of the falloff tool. Each edited mesh keeps its own work verts, weight field
+	and deform engine along with the world matrix cached on invoke, so every object gets evaluated
+	against the same world space gizmo in one batched pass of its own.
+	"""
+	def __init__( self, obj, vert_ids ):
+		self.m_object = obj
+		self.m_mesh = obj.data
+		self.m_matrix = obj.matrix_world.copy()
+		self.m_matrix_inv = self.m_matrix.inverted()
+		self.m_work_verts = vert_ids
+		self.m_engine = DeformEngine()
+		self.m_field = WeightField()
+
+	def BMesh( self ):
+		return bmesh.from_edit_mesh( self.m_mesh )
+
+	def Evaluate( self, bm, tool_state, luts, axis ):
+		self.m_engine.Load( *self.m_field.Evaluate( bm, self.m_matrix, self.m_work_verts, tool_state, luts, axis ) )
+
+	def Update( self, bm ):
+		self.m_engine.UpdateNormals( bm )
+		bmesh.update_edit_mesh( self.m_mesh )
 
 
 class DrawHandler():
-	def __init__( self, context ):
+	def __init__( self, context, luts ):
 		self.m_context = context
 		self.m_region = context.region
 		self.m_rv3d = context.region_data
-		self.m_shader3d = gpu.shader.from_builtin( 'UNIFORM_COLOR' )
-		self.m_shader2d = gpu.shader.from_builtin( 'UNIFORM_COLOR' )
+		self.m_shader3d = None
+		self.m_shader2d = None
+		if not bpy.app.background: #no gpu in background mode, headless runs never draw
+			self.m_shader3d = gpu.shader.from_builtin( 'UNIFORM_COLOR' )
+			self.m_shader2d = gpu.shader.from_builtin( 'UNIFORM_COLOR' )
 		self.m_lin_deform_handle_2d = None
 		self.m_axis_constraints_mousehelper = None
 		self.m_axis_constraints_3d = None
 		self.m_toolState = ToolState()
+		self.m_luts = luts
 
 	def UpdateFromToolState( self, state ):
 		if not state:
@@ -207,6 +728,7 @@ class DrawHandler():
 		self.m_toolState.middle_point = state.middle_point
 		self.m_toolState.end_point = state.end_point
 		self.m_toolState.quadratic_easing = state.quadratic_easing
+		self.m_toolState.falloff_shape = state.falloff_shape
 		self.m_toolState.constrain_axis_idx = state.constrain_axis_idx
 
 	def RegisterDrawCallbacks( self ):
@@ -300,45 +822,57 @@ class DrawHandler():
 			self.m_shader2d.uniform_float( 'color', ( 0.99, 0.5, 0.99, 1.0 ) )
 			batch.draw( self.m_shader2d )
 
+			#plot the falloff profile along the handle using the same LUT the vertex weights are looked up in
+			shape = self.m_toolState.falloff_shape
+			cross = ( end_p2 - end_p1 ) * 0.5
+			vec = end_2d - start_2d
+			n = 32
 			coords = []
-			if self.m_toolState.quadratic_easing == QUADRATIC_EASING_LIN:
-				coords.append( ( start_2d[ 0 ], start_2d[ 1 ] ) )
-				coords.append( ( end_p1[ 0 ], end_p1[ 1 ] ) )
-				coords.append( ( end_p2[ 0 ], end_p2[ 1 ] ) )
-				
-			elif self.m_toolState.quadratic_easing == QUADRATIC_EASING_IN:
-				cross = ( end_p2 - end_p1 ) * 0.5
-				vec = end_2d - start_2d
-				n = 12
-				for i in range( n + 1 ):
-					t = float( i ) / float( n )
-					coords.append( start_2d + ( vec * rmlib.util.EaseOutCircular( t ) + cross * t ) )
-				for i in range( n + 1 ):
-					t = float( n - i ) / float( n )
-					coords.append( start_2d + ( vec * rmlib.util.EaseOutCircular( t ) - cross * t ) )
-
-			elif self.m_toolState.quadratic_easing == QUADRATIC_EASING_OUT:
-				cross = ( end_p2 - end_p1 ) * 0.5
-				vec = end_2d - start_2d
-				n = 12
-				for i in range( n + 1 ):
-					t = float( i ) / float( n )
-					coords.append( start_2d + ( vec * rmlib.util.EaseInCircular( t ) + cross * t ) )
-				for i in range( n + 1 ):
-					t = float( n - i ) / float( n )
-					coords.append( start_2d + ( vec * rmlib.util.EaseInCircular( t ) - cross * t ) )
+			for i in range( n + 1 ):
+				t = float( i ) / float( n )
+				w = self.m_luts.Sample( self.m_toolState.quadratic_easing, t if shape == FALLOFF_SHAPE_LINEAR else 1.0 - t )
+				coords.append( start_2d + ( vec * t + cross * w ) )
+			for i in range( n + 1 ):
+				t = float( n - i ) / float( n )
+				w = self.m_luts.Sample( self.m_toolState.quadratic_easing, t if shape == FALLOFF_SHAPE_LINEAR else 1.0 - t )
+				coords.append( start_2d + ( vec * t - cross * w ) )
 
 			batch = batch_for_shader( self.m_shader2d, 'LINE_LOOP', { 'pos': coords } )
 			self.m_shader2d.bind()
 			self.m_shader2d.uniform_float( 'color', ( 0.0, 0.5, 0.99, 1.0 ) )
 			batch.draw( self.m_shader2d )
 
+			if shape != FALLOFF_SHAPE_LINEAR:
+				self.__drawFalloffRadius( cam_view )
+
 			coords = ( ( start_2d[0], start_2d[1] ), ( middle_2d[0], middle_2d[1] ), ( end_2d[0], end_2d[1] ) )
 			batch = batch_for_shader( self.m_shader2d, 'POINTS', { 'pos': coords } )
 			self.m_shader2d.bind()
 			self.m_shader2d.uniform_float( 'color', ( 0.99, 0.8, 0.0, 1.0 ) )
 			batch.draw( self.m_shader2d )
 
+	def __drawFalloffRadius( self, cam_view ):
+		#circle around start_point at the falloff radius in the plane the distance is measured in
+		axis = cam_view
+		if self.m_toolState.falloff_shape == FALLOFF_SHAPE_CYLINDRICAL:
+			axis = rmlib.rmCustomOrientation.from_selection( self.m_context ).matrix.col[ 2 ].normalized()
+		radius = ( self.m_toolState.end_point - self.m_toolState.start_point ).length
+		tangent = axis.orthogonal().normalized() * radius
+
+		coords = []
+		n = 48
+		for i in range( n ):
+			rotMat = mathutils.Matrix.Rotation( math.pi * 2.0 * float( i ) / float( n ), 3, axis )
+			p = bpy_extras.view3d_utils.location_3d_to_region_2d( self.m_region, self.m_rv3d, self.m_toolState.start_point + rotMat @ tangent )
+			if p is None:
+				return
+			coords.append( ( p[ 0 ], p[ 1 ] ) )
+
+		batch = batch_for_shader( self.m_shader2d, 'LINE_LOOP', { 'pos': coords } )
+		self.m_shader2d.bind()
+		self.m_shader2d.uniform_float( 'color', ( 0.0, 0.5, 0.99, 0.5 ) )
+		batch.draw( self.m_shader2d )
+
 
 class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 	"""Modo Style Falloff Transform Tool"""
@@ -367,41 +901,16 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 	mmb_plane_axis = False
 
 	start_work_center = None
-	work_verts = None
-	apply_tool_verts = None
 
 	s_history = ToolHistory()
+	s_targets = []
+	s_luts = None
+	s_budget = FrameBudget()
+	s_view = ViewCache()
 	s_draw = None
 	s_mouse = None
 	s_tool = None
 
-	def __get_tool_verts( self, verts_ids, bm, obj ):
-		if self.s_tool is None:
-			return
-
-		apply_tool_verts = []
-		final_dir = ( self.s_tool.end_point - self.s_tool.start_point )
-		max_dist = final_dir.length
-		for vert_id in verts_ids:
-			v_pos = obj.matrix_world @ bm.verts[ vert_id ].co
-			value = mathutils.geometry.distance_point_to_plane( v_pos, self.s_tool.start_point, final_dir )
-			if value > 0:
-				if value > max_dist:
-					value = 1.0
-				else:
-					value /= max_dist
-
-				if self.s_tool.quadratic_easing == QUADRATIC_EASING_IN:
-					value = rmlib.util.EaseInCircular( value )
-				elif self.s_tool.quadratic_easing == QUADRATIC_EASING_OUT:
-					value = rmlib.util.EaseOutCircular( value )
-
-				pos_final = bm.verts[ vert_id ].co.copy()
-
-				apply_tool_verts.append( ( vert_id, value, pos_final ) )
-
-		return apply_tool_verts
-	
 	@classmethod
 	def poll( cls, context ):
 		return ( context.area.type == 'VIEW_3D' and
@@ -414,84 +923,93 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 	def invoke( self, context, event ):
 		self.reset_params()
 
-		self.s_draw = DrawHandler( context )
+		self.s_luts = FalloffLUTs()
+		self.s_draw = DrawHandler( context, self.s_luts )
 		self.s_mouse = MouseState( context )
 
 		if ( mathutils.Vector( list( self.min_wld_pos ) ) - mathutils.Vector( list( self.max_wld_pos ) ) ).length > EPSILON:
-			self.s_tool = ToolState()
+			self.s_tool = ToolState.from_scene( context )
 			self.s_tool.start_point = mathutils.Vector( list( self.min_wld_pos ) )
 			self.s_tool.end_point = mathutils.Vector( list( self.max_wld_pos ) )
 			self.s_tool.middle_point = mathutils.Vector( ( 0.0, 0.0, 0.0 ) )
 			self.s_tool.UpdateMiddlePoint()
 			
-		# the arguments we pass the the callbackection
-		args = ( self, context )
-		active_obj = context.active_object
-		bm = bmesh.from_edit_mesh( active_obj.data )
-		
-		self.s_history.CacheInitialVertPositions( bm )
+		self.s_history.SetBudget( context.preferences.addons[ __package__ ].preferences.falloff_history_budget * 1024 * 1024 )
 
-		if bm.verts:
-			pre_work_verts = [ v for v in bm.verts if v.select ]
+		#gather work verts across every mesh in edit mode. selected verts win, otherwise all visible verts are used.
+		candidates = []
+		any_selected = False
+		for rmmesh in rmlib.iter_edit_meshes( context ):
+			bm = bmesh.from_edit_mesh( rmmesh.mesh )
+			selected = [ v for v in bm.verts if v.select ]
+			any_selected = any_selected or len( selected ) > 0
+			candidates.append( ( rmmesh.object, bm, selected ) )
+
+		bms = []
+		self.s_targets = []
+		work_center = mathutils.Vector( ( 0.0, 0.0, 0.0 ) )
+		work_count = 0
+		for obj, bm, selected in candidates:
+			pre_work_verts = selected if any_selected else [ v for v in bm.verts if v.hide is False ]
 			if not pre_work_verts:
-				pre_work_verts = [ v for v in bm.verts if v.hide is False ]
-
-			if pre_work_verts:
-				if self.s_tool is None:
-					self.start_work_center = mathutils.Vector( ( 0.0, 0.0, 0.0 ) )
-					for vert in pre_work_verts:
-						self.start_work_center += vert.co
-					self.start_work_center *= 1.0 / len( pre_work_verts )
-					self.start_work_center = active_obj.matrix_world @ self.start_work_center
-				else:
-					self.start_work_center = self.s_tool.middle_point.copy()
+				continue
 
-				self.work_verts = [ vert.index for vert in pre_work_verts ]
+			target = FalloffTarget( obj, [ vert.index for vert in pre_work_verts ] )
+			for vert in pre_work_verts:
+				work_center += target.m_matrix @ vert.co
+			work_count += len( pre_work_verts )
 
-				# add original vert to history
-				self.s_history.AddHistory( pre_work_verts )
+			self.s_targets.append( target )
+			bms.append( bm )
 
-				# Add the region OpenGL drawing callback
-				self.s_draw.RegisterDrawCallbacks()
-				
-				context.window_manager.modal_handler_add( self )
+		if not self.s_targets:
+			self.report( { 'WARNING' }, 'No verts!!' )
+			return { 'CANCELLED' }
 
-				return { 'RUNNING_MODAL' }
+		if self.s_tool is None:
+			self.start_work_center = work_center * ( 1.0 / work_count )
+		else:
+			self.start_work_center = self.s_tool.middle_point.copy()
 
-			else:
-				self.report( { 'WARNING' }, 'No verts!!' )
-				return { 'CANCELLED' }
+		# add original vert to history
+		self.s_history.CacheInitialVertPositions( bms, [ target.m_work_verts for target in self.s_targets ] )
+		self.s_history.AddHistory( bms )
 
-		else:
-			self.report( { 'WARNING' }, 'No verts!!' )
-			return { 'CANCELLED' }
+		# Add the region OpenGL drawing callback
+		self.s_draw.RegisterDrawCallbacks()
+
+		# tooltip
+		tooltip_text = 'I:Invert, Z:Z-Constraint, X:X-Constraint, V:Invert, S:Scale, G:Move, R:Rotate, C:NextEasingMode, F:NextFalloffShape, Ctrl+Z:Undo, Ctrl+Shift+Z:Redo'
+		context.workspace.status_text_set( text=tooltip_text )
+
+		self.s_view.Invalidate()
+		self.s_budget.Start( context )
+		context.window_manager.modal_handler_add( self )
+
+		return { 'RUNNING_MODAL' }
 
 
 	def modal( self, context, event ):
-		context.area.tag_redraw()
+		#drop stale intermediate moves and cap mesh updates to the frame budget
+		if event.type == 'INBETWEEN_MOUSEMOVE':
+			return { 'RUNNING_MODAL' }
+		self.do_update = self.s_budget.Poll( event )
+		if self.do_update:
+			context.area.tag_redraw()
 
 		lin_def_settings = False
 
 		region = context.region
 		rv3d = context.region_data
-		active_obj = context.active_object
-		bm = bmesh.from_edit_mesh( active_obj.data )
-
-		if self.s_tool and self.s_tool.start_point:
-			self.s_mouse.UpdateCurrentMouse( event, self.s_tool.start_point )
-
-		self.do_update = True
+		bms = [ target.BMesh() for target in self.s_targets ]
 
-		# tooltip
-		tooltip_text = 'I:Invert, Z:Z-Constraint, X:X-Constraint, V:Invert, S:Scale, G:Move, R:Rotate, C:NextEasingMode, Ctrl+Z:Undo, Ctrl+Shift+Z:Redo'
+		rm_vp, rm_wp = self.s_view.Update( context )
 
-		context.workspace.status_text_set( text=tooltip_text )
+		if self.s_tool and self.s_tool.start_point:
+			self.s_mouse.UpdateCurrentMouse( event, rm_vp, self.s_tool.start_point )
 
 		keys_pass = event.type in pass_keys
 
-		rm_vp = rmlib.rmViewport( context )
-		rm_wp = rmlib.rmCustomOrientation.from_selection( context )
-		
 		# axis constraints
 		if self.tool_mode != 'IDLE' and event.type == 'MIDDLEMOUSE':
 			if event.value == 'PRESS':
@@ -508,19 +1026,20 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 			self.s_tool.contrain_axis_2d = CONSTRAIN_AXIS_HORIZONTAL if xdelta > ydelta else CONSTRAIN_AXIS_VERTICAL
 			self.mmb_plane_axis = event.shift
 
-		if event.value == 'RELEASE' and event.type in { 'V', 'C', 'RIGHTMOUSE' }:
+		if event.value == 'RELEASE' and event.type in { 'V', 'C', 'F', 'RIGHTMOUSE' } and self.s_tool is not None:
 			self.s_tool.constrain_axis_idx = -1
 			if event.type == 'C':
 				self.s_tool.quadratic_easing = ( self.s_tool.quadratic_easing + 1 ) % QUADRATIC_EASING_COUNT
+			elif event.type == 'F':
+				self.s_tool.falloff_shape = ( self.s_tool.falloff_shape + 1 ) % FALLOFF_SHAPE_COUNT
+				context.scene.rmkit_props.falloff_shape = FALLOFF_SHAPE_NAMES[ self.s_tool.falloff_shape ]
 			elif event.type == 'V':
 				self.s_tool.Invert()
 
-			if self.apply_tool_verts is not None:
-				for h_vert in self.apply_tool_verts:
-					bm.verts[ h_vert[ 0 ] ].co = h_vert[ 2 ].copy()
-
-				bm.normal_update()
-				bmesh.update_edit_mesh( active_obj.data )
+			for target, bm in zip( self.s_targets, bms ):
+				if len( target.m_engine ) > 0:
+					target.m_engine.Reset( bm )
+					target.Update( bm )
 
 			self.do_update = False
 			self.tool_mode = 'IDLE'
@@ -536,6 +1055,7 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 					if picked_point_id == POINT_HANDLE_INVALID:
 						context.workspace.status_text_set( text=None )
 						self.s_draw.UnregisterDrawCallbacks()
+						self.s_budget.Stop( context )
 						return { 'FINISHED' }
 					else:
 						self.active_lw_point_id = picked_point_id
@@ -544,7 +1064,7 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 					mouse_pos = mathutils.Vector( ( event.mouse_region_x, event.mouse_region_y ) )
 					picked_point = rm_vp.get_mouse_on_plane( context, self.start_work_center, None, mouse_pos )
 					if picked_point:
-						self.s_tool = ToolState()
+						self.s_tool = ToolState.from_scene( context )
 
 						self.s_tool.start_point = picked_point.copy()
 						self.s_tool.middle_point = picked_point.copy()
@@ -552,15 +1072,20 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 
 						self.active_lw_point_id = POINT_HANDLE_END
 
-						self.s_mouse.UpdateCurrentMouse( event, self.s_tool.start_point )
+						self.s_mouse.UpdateCurrentMouse( event, rm_vp, self.s_tool.start_point )
 
 						self.tool_mode = 'MOVE_POINT'
 
-			elif event.type in { 'S', 'G', 'R' }:
+			elif event.type in { 'S', 'G', 'R' } and self.s_tool is not None:
 				# get tool verts
-				self.apply_tool_verts = self.__get_tool_verts( self.work_verts, bm, active_obj )
+				if self.s_tool.falloff_shape == FALLOFF_SHAPE_CYLINDRICAL:
+					axis = rm_wp.matrix.col[ 2 ]
+				else:
+					axis = rv3d.view_rotation @ mathutils.Vector( ( 0.0, 0.0, -1.0 ) )
+				for target, bm in zip( self.s_targets, bms ):
+					target.Evaluate( bm, self.s_tool, self.s_luts, axis )
 
-				self.s_tool.ComputeTransformOrigin( context, bm, self.apply_tool_verts )
+				self.s_tool.ComputeTransformOrigin( context, self.s_targets )
 
 				# set tool type
 				if event.type == 'S':
@@ -582,19 +1107,18 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 					self.s_mouse.m_mouse_rotate_start_vec_2d = ( self.s_mouse.m_mouse_current_2d - start_point_2d ).normalized()
 
 			elif event.type == 'Z' and event.ctrl:
+				meshes = [ target.m_mesh for target in self.s_targets ]
 				if event.shift:
-					self.s_history.RedoHistory( bm, active_obj )
+					self.s_history.RedoHistory( bms, meshes )
 				else:
-					self.s_history.UndoHistory( bm, active_obj )
+					self.s_history.UndoHistory( bms, meshes )
+				for target in self.s_targets:
+					target.m_field.Invalidate()
 				
 
 		# TOOL WORK!
 		if self.tool_mode == 'MOVE_POINT':
-			if event.value == 'RELEASE':
-				self.tool_mode = 'IDLE'
-				self.s_draw.UpdateFromToolState( self.s_tool )
-				return { 'RUNNING_MODAL' }
-			else:
+			if self.do_update:
 				# move points
 				if self.active_lw_point_id == POINT_HANDLE_START:
 					self.s_tool.start_point = rm_vp.get_mouse_on_plane( context, self.s_tool.start_point, None, self.s_mouse.m_mouse_current_2d )
@@ -608,23 +1132,14 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 					self.s_tool.end_point += new_point_pos - self.s_tool.middle_point
 					self.s_tool.middle_point = new_point_pos
 
-				self.s_draw.UpdateFromToolState( self.s_tool )
-				return { 'RUNNING_MODAL' }
-
-		elif self.tool_mode == 'SCALE_ALL':
-			if event.value == 'RELEASE' and event.type in { 'LEFTMOUSE', 'SELECTMOUSE' }:
-				bm.normal_update()
-
-				self.s_tool.constrain_axis_idx = -1
-
-				# add to undo history
-				self.s_history.ClearRedo()
-				pre_work_verts = [ bm.verts[ v_id ] for v_id in self.work_verts ]
-				self.s_history.AddHistory( pre_work_verts )
-
+			if event.value == 'RELEASE':
 				self.tool_mode = 'IDLE'
 
-			elif self.do_update:
+			self.s_draw.UpdateFromToolState( self.s_tool )
+			return { 'RUNNING_MODAL' }
+
+		elif self.tool_mode == 'SCALE_ALL':
+			if self.do_update:
 				# move points
 				start_point_2d = bpy_extras.view3d_utils.location_3d_to_region_2d( region, rv3d, self.s_tool.start_point )
 				if start_point_2d:
@@ -645,92 +1160,77 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 						apply_value *= -1.0
 
 					if apply_value != 0.0:
-						xfrm = active_obj.matrix_world
-						xfrm_inv = xfrm.inverted()
-						for vert_data in self.apply_tool_verts:
-							lerp_scale = ( apply_value - 1.0 ) * vert_data[ APPLY_VERT_WEIGHT ] + 1.0
-							sclMat = mathutils.Matrix.Scale( lerp_scale, 4 )
-							if self.s_tool.constrain_axis_idx >= 0:
-								if self.mmb_plane_axis:
-									vScaleAxis = mathutils.Vector( ( self.s_tool.constrain_axis_idx != 0, self.s_tool.constrain_axis_idx != 1, self.s_tool.constrain_axis_idx != 2 ) )
-								else:
-									vScaleAxis = mathutils.Vector( ( self.s_tool.constrain_axis_idx == 0, self.s_tool.constrain_axis_idx == 1, self.s_tool.constrain_axis_idx == 2 ) )
-								sclMat[ 0 ].x = vScaleAxis.x * lerp_scale if vScaleAxis.x else 1.0
-								sclMat[ 1 ].y = vScaleAxis.y * lerp_scale if vScaleAxis.y else 1.0
-								sclMat[ 2 ].z = vScaleAxis.z * lerp_scale if vScaleAxis.z else 1.0
-
-							rotMat = rm_wp.matrix
-							rotMat.resize_4x4()
-
-							rotMat_inv = rm_wp.matrix.transposed()
-							rotMat_inv.resize_4x4()
-
-							offsetMat = mathutils.Matrix.Translation( self.s_tool.transform_origin )
-							offsetMat_inv = mathutils.Matrix.Translation( self.s_tool.transform_origin * -1.0 )
-
-							bm.verts[ vert_data[ APPLY_VERT_ID ] ].co = ( xfrm_inv @ offsetMat @ rotMat @ sclMat @ rotMat_inv @ offsetMat_inv @ xfrm ) @ vert_data[ APPLY_VERT_POSITION ]
-
-						bm.normal_update()
-						bmesh.update_edit_mesh( active_obj.data )
+						vScaleAxis = ( True, True, True )
+						if self.s_tool.constrain_axis_idx >= 0:
+							if self.mmb_plane_axis:
+								vScaleAxis = ( self.s_tool.constrain_axis_idx != 0, self.s_tool.constrain_axis_idx != 1, self.s_tool.constrain_axis_idx != 2 )
+							else:
+								vScaleAxis = ( self.s_tool.constrain_axis_idx == 0, self.s_tool.constrain_axis_idx == 1, self.s_tool.constrain_axis_idx == 2 )
 
-			self.do_update = False
-			self.s_draw.UpdateFromToolState( self.s_tool )
-			return { 'RUNNING_MODAL' }
+						rotMat = rm_wp.matrix
+						rotMat.resize_4x4()
 
-		elif self.tool_mode == 'MOVE_ALL':
-			if event.value == 'RELEASE' and event.type in { 'LEFTMOUSE', 'SELECTMOUSE' }:
-				bm.normal_update()
+						rotMat_inv = rm_wp.matrix.transposed()
+						rotMat_inv.resize_4x4()
+
+						offsetMat = mathutils.Matrix.Translation( self.s_tool.transform_origin )
+						offsetMat_inv = mathutils.Matrix.Translation( self.s_tool.transform_origin * -1.0 )
+
+						pre_mat = offsetMat @ rotMat
+						post_mat = rotMat_inv @ offsetMat_inv
+						for target, bm in zip( self.s_targets, bms ):
+							target.m_engine.Scale( bm, target.m_matrix_inv @ pre_mat, post_mat @ target.m_matrix, vScaleAxis, apply_value )
+							target.Update( bm )
 
+			if event.value == 'RELEASE' and event.type in { 'LEFTMOUSE', 'SELECTMOUSE' }:
 				self.s_tool.constrain_axis_idx = -1
 
 				# add to undo history
 				self.s_history.ClearRedo()
-				pre_work_verts = [ bm.verts[ v_id ] for v_id in self.work_verts ]
-				self.s_history.AddHistory( pre_work_verts )
+				self.s_history.AddHistory( bms )
+				for target in self.s_targets:
+					target.m_field.Invalidate()
 
 				self.tool_mode = 'IDLE'
 
-			elif self.do_update:
+			self.s_draw.UpdateFromToolState( self.s_tool )
+			return { 'RUNNING_MODAL' }
+
+		elif self.tool_mode == 'MOVE_ALL':
+			if self.do_update:
 				mouse_pos_3d = self.s_mouse.m_mouse_current_3d
 				start_pos = self.s_tool.start_point
 				orig_pos = self.s_mouse.m_mouse_move_start_3d
 				orig_vec = orig_pos - start_pos
 				move_vec = ( mouse_pos_3d - start_pos ) - orig_vec
 
-				xfrm = active_obj.matrix_world
-				xfrm_inv = xfrm.inverted()
-				for vert_data in self.apply_tool_verts:
-					move_value = vert_data[ APPLY_VERT_WEIGHT ]
-					new_vec = ( move_vec * move_value )
-					if self.s_tool.constrain_axis_idx >= 0:
-						if self.mmb_plane_axis:
-							new_vec = new_vec - rmlib.util.ProjectVector( new_vec, rm_wp.matrix.transposed()[ self.s_tool.constrain_axis_idx ] )
-						else:
-							new_vec = rmlib.util.ProjectVector( new_vec, rm_wp.matrix.transposed()[ self.s_tool.constrain_axis_idx ] )
-					vpos_wld = xfrm @ vert_data[ APPLY_VERT_POSITION ]
-					bm.verts[ vert_data[ APPLY_VERT_ID ] ].co = xfrm_inv @ ( vpos_wld + new_vec )
-
-				bm.normal_update()
-				bmesh.update_edit_mesh( active_obj.data )
-				self.do_update = False
+				#projection is linear so constrain the full offset once and let the engine weight it per vert
+				if self.s_tool.constrain_axis_idx >= 0:
+					if self.mmb_plane_axis:
+						move_vec = move_vec - rmlib.util.ProjectVector( move_vec, rm_wp.matrix.transposed()[ self.s_tool.constrain_axis_idx ] )
+					else:
+						move_vec = rmlib.util.ProjectVector( move_vec, rm_wp.matrix.transposed()[ self.s_tool.constrain_axis_idx ] )
 
-			self.s_draw.UpdateFromToolState( self.s_tool )
-			return { 'RUNNING_MODAL' }
+				for target, bm in zip( self.s_targets, bms ):
+					target.m_engine.Move( bm, target.m_matrix, move_vec )
+					target.Update( bm )
 
-		elif self.tool_mode == 'ROTATE_ALL':
 			if event.value == 'RELEASE' and event.type in { 'LEFTMOUSE', 'SELECTMOUSE' }:
-				bm.normal_update()
-
 				self.s_tool.constrain_axis_idx = -1
 
 				# add to undo history
 				self.s_history.ClearRedo()
-				pre_work_verts = [ bm.verts[ v_id ] for v_id in self.work_verts ]
-				self.s_history.AddHistory( pre_work_verts )
+				self.s_history.AddHistory( bms )
+				for target in self.s_targets:
+					target.m_field.Invalidate()
 
 				self.tool_mode = 'IDLE'
 
-			elif self.do_update:
+			self.s_draw.UpdateFromToolState( self.s_tool )
+			return { 'RUNNING_MODAL' }
+
+		elif self.tool_mode == 'ROTATE_ALL':
+			if self.do_update:
 				# move points
 				start_point_2d = bpy_extras.view3d_utils.location_3d_to_region_2d( region, rv3d, self.s_tool.start_point )
 				if start_point_2d:
@@ -743,31 +1243,35 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 						if new_vec_dir_ortho.dot( self.s_mouse.m_mouse_rotate_start_vec_2d ) > 0.0:
 							rot_angle *= -1.0
 						
-						xfrm = active_obj.matrix_world
-						xfrm_inv = xfrm.inverted()
-						for vert_data in self.apply_tool_verts:
-							lerp_rot = rot_angle * vert_data[ APPLY_VERT_WEIGHT ]
-							look_dir = ( rv3d.view_rotation @ mathutils.Vector( ( 0.0, 0.0, -1.0 ) ) ).normalized()
-							rotMat = mathutils.Matrix.Rotation( lerp_rot, 4, look_dir )
-							if self.s_tool.constrain_axis_idx >= 0:
-								vRotAxis = mathutils.Vector( ( self.s_tool.constrain_axis_idx == 0, self.s_tool.constrain_axis_idx == 1, self.s_tool.constrain_axis_idx == 2 ) )
-								rotMat = mathutils.Matrix.Rotation( lerp_rot, 4, vRotAxis )
+						vRotAxis = ( rv3d.view_rotation @ mathutils.Vector( ( 0.0, 0.0, -1.0 ) ) ).normalized()
+						if self.s_tool.constrain_axis_idx >= 0:
+							vRotAxis = mathutils.Vector( ( self.s_tool.constrain_axis_idx == 0, self.s_tool.constrain_axis_idx == 1, self.s_tool.constrain_axis_idx == 2 ) )
+
+						offsetMat = mathutils.Matrix.Translation( self.s_tool.transform_origin )
+						offsetMat_inv = mathutils.Matrix.Translation( self.s_tool.transform_origin * -1.0 )
 
-							offsetMat = mathutils.Matrix.Translation( self.s_tool.transform_origin )
-							offsetMat_inv = mathutils.Matrix.Translation( self.s_tool.transform_origin * -1.0 )
+						wpMat = rm_wp.matrix
+						wpMat.resize_4x4()
 
-							wpMat = rm_wp.matrix
-							wpMat.resize_4x4()
+						wpMat_inv = rm_wp.matrix.transposed()
+						wpMat_inv.resize_4x4()
 
-							wpMat_inv = rm_wp.matrix.transposed()
-							wpMat_inv.resize_4x4()
+						pre_mat = offsetMat @ wpMat
+						post_mat = wpMat_inv @ offsetMat_inv
+						for target, bm in zip( self.s_targets, bms ):
+							target.m_engine.Rotate( bm, target.m_matrix_inv @ pre_mat, post_mat @ target.m_matrix, vRotAxis, rot_angle )
+							target.Update( bm )
 
-							bm.verts[ vert_data[ APPLY_VERT_ID ] ].co = ( xfrm_inv @ offsetMat @ wpMat @ rotMat @ wpMat_inv @ offsetMat_inv @ xfrm ) @ vert_data[ APPLY_VERT_POSITION ]
+			if event.value == 'RELEASE' and event.type in { 'LEFTMOUSE', 'SELECTMOUSE' }:
+				self.s_tool.constrain_axis_idx = -1
 
-						bm.normal_update()
-						bmesh.update_edit_mesh( active_obj.data )
+				# add to undo history
+				self.s_history.ClearRedo()
+				self.s_history.AddHistory( bms )
+				for target in self.s_targets:
+					target.m_field.Invalidate()
 
-				self.do_update = False
+				self.tool_mode = 'IDLE'
 
 			self.s_draw.UpdateFromToolState( self.s_tool )
 			return { 'RUNNING_MODAL' }
@@ -785,11 +1289,13 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 			return { 'PASS_THROUGH' }
 
 		elif event.type in { 'RIGHTMOUSE', 'ESC' }:
-			self.s_history.ResetToInitialVertPositions( bm )
-			bm.normal_update()
-			bmesh.update_edit_mesh( active_obj.data )
+			self.s_history.ResetToInitialVertPositions( bms )
+			self.s_history.UpdateNormals( bms )
+			for target in self.s_targets:
+				bmesh.update_edit_mesh( target.m_mesh )
 			context.workspace.status_text_set( text=None )
 			self.s_draw.UnregisterDrawCallbacks()
+			self.s_budget.Stop( context )
 			return { 'CANCELLED' }					
 
 		self.s_draw.UpdateFromToolState( self.s_tool )
@@ -804,9 +1310,8 @@ class MESH_OT_Linear_Deformer( bpy.types.Operator ):
 		self.active_lw_point_id = POINT_HANDLE_INVALID
 
 		self.start_work_center = None
-		self.work_verts = None
-		self.apply_tool_verts = None
 
+		self.s_targets = []
 		self.s_history.ClearAll()
 				
 				
@@ -842,33 +1347,36 @@ class MESH_OT_quicklineardeform( bpy.types.Operator ):
 		bbox_min = None
 		bbox_max = None
 		for rmmesh, g in elems.items():
-			xfrm = rmmesh.world_transform
-			group_bbox_min = bbox_transform_inv @ xfrm @ g[ 0 ].co
-			group_bbox_max = bbox_transform_inv @ xfrm @ g[ 0 ].co
-			max_dot = dir_vec.dot( group_bbox_min )
-			min_dot = dir_vec.dot( group_bbox_max )
-			for i in range( 1, len( g ) ):
-				vpos = bbox_transform_inv @ xfrm @ g[ i ].co
-				group_bbox_min.x = min( vpos.x, group_bbox_min.x )
-				group_bbox_min.y = min( vpos.y, group_bbox_min.y )
-				group_bbox_min.z = min( vpos.z, group_bbox_min.z )
-				group_bbox_max.x = max( vpos.x, group_bbox_max.x )
-				group_bbox_max.y = max( vpos.y, group_bbox_max.y )
-				group_bbox_max.z = max( vpos.z, group_bbox_max.z )
+			if len( g ) < 1:
+				continue
+
+			#one composite matrix per object, then a bulk transform and reduce over all its verts
+			mat = bbox_transform_inv @ rmmesh.world_transform
+			if np is None:
+				group_bbox_min = mat @ g[ 0 ].co
+				group_bbox_max = group_bbox_min.copy()
+				for i in range( 1, len( g ) ):
+					vpos = mat @ g[ i ].co
+					for j in range( 3 ):
+						group_bbox_min[ j ] = min( vpos[ j ], group_bbox_min[ j ] )
+						group_bbox_max[ j ] = max( vpos[ j ], group_bbox_max[ j ] )
+			else:
+				positions = np.fromiter( itertools.chain.from_iterable( v.co for v in g ), dtype=np.float64, count=len( g ) * 3 ).reshape( -1, 3 )
+				affine = np.array( mat, dtype=np.float64 )
+				positions = positions @ affine[ :3, :3 ].T + affine[ :3, 3 ]
+				group_bbox_min = mathutils.Vector( positions.min( axis=0 ) )
+				group_bbox_max = mathutils.Vector( positions.max( axis=0 ) )
 
 			if bbox_min is None:
 				bbox_min = group_bbox_min.copy()
-			else:
-				bbox_min.x = min( vpos.x, group_bbox_min.x )
-				bbox_min.y = min( vpos.y, group_bbox_min.y )
-				bbox_min.z = min( vpos.z, group_bbox_min.z )
-
-			if bbox_max is None:
 				bbox_max = group_bbox_max.copy()
 			else:
-				bbox_max.x = max( vpos.x, group_bbox_max.x )
-				bbox_max.y = max( vpos.y, group_bbox_max.y )
-				bbox_max.z = max( vpos.z, group_bbox_max.z )
+				for j in range( 3 ):
+					bbox_min[ j ] = min( bbox_min[ j ], group_bbox_min[ j ] )
+					bbox_max[ j ] = max( bbox_max[ j ], group_bbox_max[ j ] )
+
+		if bbox_min is None:
+			return None, None
 
 		bbox_min.x = ( bbox_min.x + bbox_max.x ) / 2.0
 		bbox_min.y = ( bbox_min.y + bbox_max.y ) / 2.0
@@ -922,6 +1430,17 @@ class MESH_OT_quicklineardeform( bpy.types.Operator ):
 		return { 'FINISHED' }
 
 
+class MESH_OT_falloffcurve( bpy.types.Operator ):
+	"""Create the user editable curve sampled by the Curve easing mode of the Falloff Transform."""
+	bl_idname = 'mesh.rm_falloffcurve'
+	bl_label = 'Add Falloff Curve'
+	bl_options = { 'UNDO' }
+
+	def execute( self, context ):
+		GetFalloffCurveNode( create=True )
+		return { 'FINISHED' }
+
+
 class VIEW3D_MT_PIE_quicklineardeform( bpy.types.Menu ):
 	"""Set the FalloffTransform Tool based on camera space direction."""
 	bl_idname = 'VIEW3D_MT_PIE_quicklineardeform'
@@ -955,10 +1474,12 @@ class VIEW3D_MT_PIE_quicklineardeform( bpy.types.Menu ):
 def register():
 	bpy.utils.register_class( MESH_OT_Linear_Deformer )
 	bpy.utils.register_class( MESH_OT_quicklineardeform )
+	bpy.utils.register_class( MESH_OT_falloffcurve )
 	bpy.utils.register_class( VIEW3D_MT_PIE_quicklineardeform )
 	
 
 def unregister():
 	bpy.utils.unregister_class( MESH_OT_Linear_Deformer )
 	bpy.utils.unregister_class( MESH_OT_quicklineardeform )
+	bpy.utils.unregister_class( MESH_OT_falloffcurve )
 	bpy.utils.unregister_class( VIEW3D_MT_PIE_quicklineardeform )
\ No newline at end of file
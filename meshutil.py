@@ -0,0 +1,429 @@
+import bpy
+import bmesh
+
+#past this fraction of the mesh the per element python calls cost more than one bulk bm.normal_update()
+REGION_FULL_UPDATE_RATIO = 0.5
+
+
+class NormalRegion():
+	"""
+	The faces touching a set of moved verts plus every vert of those faces. Those are the only
+	normals a deform of the moved verts can change, so recomputing just them gives the same result
+	as bm.normal_update(). The faces of the one-ring are read but left untouched. Element refs are
+	cached, so build a new region whenever the topology changes.
+	"""
+	def __init__( self, bm, verts ):
+		faces = set()
+		for v in verts:
+			faces.update( v.link_faces )
+
+		region_verts = set()
+		for f in faces:
+			region_verts.update( f.verts )
+
+		self.m_full = len( faces ) > len( bm.faces ) * REGION_FULL_UPDATE_RATIO
+		self.m_faces = list( faces )
+		self.m_verts = list( region_verts )
+
+	def __len__( self ):
+		return len( self.m_faces )
+
+	def Update( self, bm ):
+		if self.m_full:
+			bm.normal_update()
+			return
+		for f in self.m_faces:
+			f.normal_update()
+		for v in self.m_verts:
+			v.normal_update()
+
+
+def UpdateRegionNormals( bm, verts ):
+	"""
+	Recompute face and vertex normals around verts instead of across the whole mesh.
+	"""
+	NormalRegion( bm, verts ).Update( bm )
+
+
+def UpdateEditMesh( mesh, topology=True ):
+	"""
+	Pushes the edits made to the edit bmesh of mesh to the viewport. Modal tools commit every update
+	this way instead of going through object mode and to_mesh, and Blender records a single undo
+	step for the whole modal when the operator finishes. Pass topology=False when only coordinates
+	and loop data changed.
+	"""
+	bmesh.update_edit_mesh( mesh, loop_triangles=True, destructive=topology )
+
+
+class LayerCopy():
+	"""
+	Copies custom data between elements of two different bmeshes. copy_from only works inside one
+	bmesh, so the layers are matched by type and name, missing ones are added to dst, and values are
+	copied one layer at a time.
+	"""
+	def __init__( self, src, dst ):
+		self.m_layers = {}
+		for domain in ( 'verts', 'edges', 'faces', 'loops' ):
+			src_access = getattr( src, domain ).layers
+			dst_access = getattr( dst, domain ).layers
+			pairs = []
+			for kind in dir( src_access ):
+				src_layers = getattr( src_access, kind )
+				if kind.startswith( '_' ) or not isinstance( src_layers, bmesh.types.BMLayerCollection ):
+					continue
+				dst_layers = getattr( dst_access, kind )
+				for name, src_layer in src_layers.items():
+					#internal layers like the uv pin flags travel with the layer that owns them
+					if name.startswith( '.' ):
+						continue
+					dst_layer = dst_layers.get( name )
+					if dst_layer is None:
+						dst_layer = dst_layers.new( name )
+					pairs.append( ( kind, src_layer, dst_layer ) )
+			self.m_layers[ domain ] = pairs
+
+	def Copy( self, domain, src_elem, dst_elem ):
+		for kind, src_layer, dst_layer in self.m_layers[ domain ]:
+			if kind == 'uv':
+				s = src_elem[ src_layer ]
+				d = dst_elem[ dst_layer ]
+				d.uv = s.uv
+				d.pin_uv = s.pin_uv
+			elif kind == 'deform':
+				d = dst_elem[ dst_layer ]
+				d.clear()
+				for group, weight in src_elem[ src_layer ].items():
+					d[ group ] = weight
+			elif kind == 'skin':
+				s = src_elem[ src_layer ]
+				d = dst_elem[ dst_layer ]
+				d.radius = s.radius
+				d.use_root = s.use_root
+				d.use_loose = s.use_loose
+			else:
+				dst_elem[ dst_layer ] = src_elem[ src_layer ]
+
+
+def CopyVert( layers, src, dst ):
+	dst.normal = src.normal
+	if src.select:
+		dst.select = True
+	if src.hide:
+		dst.hide = True
+	layers.Copy( 'verts', src, dst )
+
+
+def CopyEdge( layers, src, dst ):
+	dst.seam = src.seam
+	dst.smooth = src.smooth
+	if src.select:
+		dst.select = True
+	if src.hide:
+		dst.hide = True
+	layers.Copy( 'edges', src, dst )
+
+
+def CopyFace( layers, src, dst ):
+	#only raise select and hide flags, clearing them on a face would also clear its verts and edges
+	dst.material_index = src.material_index
+	dst.smooth = src.smooth
+	dst.normal = src.normal
+	if src.select:
+		dst.select = True
+	if src.hide:
+		dst.hide = True
+	layers.Copy( 'faces', src, dst )
+	for src_loop, dst_loop in zip( src.loops, dst.loops ):
+		layers.Copy( 'loops', src_loop, dst_loop )
+
+
+class IndexMap():
+	"""
+	Maps the elements of one bmesh to the elements with the same index in seq.
+	"""
+	def __init__( self, seq ):
+		self.m_seq = seq
+
+	def __getitem__( self, elem ):
+		return self.m_seq[ elem.index ]
+
+
+class MeshRegion():
+	"""
+	A patch of an edit bmesh that a tool edits through a small bmesh of its own: the given faces
+	and edges plus a one-ring of faces around them. Verts on the outline of the patch stay shared
+	with the rest of the mesh, so an edited copy of the patch is stitched back in by replacing the
+	patch and reconnecting to the outline. Copy and Splice then cost as much as the patch, not the
+	whole mesh. Edits to the outline verts themselves are copied back onto the shared verts.
+
+	Splice appends the rebuilt patch to the element sequences, Restore puts the patch back at its
+	original indices so a cancelled tool leaves the element order as it found it.
+
+	An undo replaces the edit bmesh with the mesh as it was before the tool ran, the patch is back at
+	its original indices then. Commit and Revert find the patch there again, so a redo from the last
+	operator panel can keep using the region of the modal it redoes.
+
+	When the patch would cover most of the mesh the region holds the whole mesh and Splice swaps
+	all of it, which is done in C and beats stitching it element by element.
+	"""
+	def __init__( self, bm, faces, edges=() ):
+		seed_verts = { v for f in faces for v in f.verts }
+		seed_verts.update( v for e in edges for v in e.verts )
+		region = set()
+		for v in seed_verts:
+			region.update( v.link_faces )
+
+		#element refs die with the python bmesh that handed them out, keep it alive with the region
+		self.m_bmesh = bm
+		self.m_totals = ( len( bm.verts ), len( bm.edges ), len( bm.faces ) )
+		self.m_copies = {}
+
+		#shape keys live outside the mesh data that the whole mesh swap goes through
+		self.m_full = len( region ) > len( bm.faces ) * REGION_FULL_UPDATE_RATIO and len( bm.verts.layers.shape ) == 0
+		if self.m_full:
+			self.m_source = bm.copy()
+			self.m_outline = []
+			self.m_order = None
+			self.m_kept_edges = set()
+			self.m_faces = []
+			self.m_edges = []
+			return
+
+		#keep the order of the edit mesh so tools walk the patch the way they walk the full mesh
+		bm.verts.index_update()
+		bm.edges.index_update()
+		bm.faces.index_update()
+		region_faces = sorted( region, key=lambda f : f.index )
+		region_verts = { v for f in region_faces for v in f.verts }
+		region_verts.update( seed_verts )
+		region_verts = sorted( region_verts, key=lambda v : v.index )
+		region_edges = { e for f in region_faces for e in f.edges }
+		region_edges.update( edges )
+		region_edges = sorted( region_edges, key=lambda e : e.index )
+
+		self.m_source = bmesh.new()
+		layers = LayerCopy( bm, self.m_source )
+		vmap = {}
+		for v in region_verts:
+			nv = self.m_source.verts.new( v.co )
+			CopyVert( layers, v, nv )
+			vmap[ v ] = nv
+		emap = {}
+		for e in region_edges:
+			ne = self.m_source.edges.new( [ vmap[ v ] for v in e.verts ] )
+			CopyEdge( layers, e, ne )
+			emap[ e ] = ne
+		fmap = {}
+		for f in region_faces:
+			nf = self.m_source.faces.new( [ vmap[ v ] for v in f.verts ] )
+			CopyFace( layers, f, nf )
+			fmap[ f ] = nf
+		for elem in bm.select_history:
+			mapped = vmap.get( elem, emap.get( elem, fmap.get( elem ) ) )
+			if mapped is not None:
+				self.m_source.select_history.add( mapped )
+		self.m_source.verts.index_update()
+		self.m_source.edges.index_update()
+		self.m_source.faces.index_update()
+
+		#outline verts are also used by faces or edges outside of the patch and survive its removal
+		edge_set = set( region_edges )
+		self.m_outline = []
+		for i, v in enumerate( region_verts ):
+			if any( f not in region for f in v.link_faces ) or any( e not in edge_set for e in v.link_edges ):
+				self.m_outline.append( ( i, v ) )
+
+		#original index of every source element for Restore. edges with a face outside of the patch
+		#survive its removal like the outline verts do.
+		self.m_order = ( [ v.index for v in region_verts ], [ e.index for e in region_edges ], [ f.index for f in region_faces ] )
+		self.m_kept_edges = { i for i, e in enumerate( region_edges ) if any( f not in region for f in e.link_faces ) }
+
+		self.m_faces = region_faces
+		self.m_edges = [ e for e in region_edges if e.is_wire ]
+
+	def __len__( self ):
+		if self.m_full:
+			return len( self.m_source.faces )
+		return len( self.m_faces )
+
+	@property
+	def source( self ):
+		"""
+		The patch as it was when the region was built. Read it, edit copies of it.
+		"""
+		return self.m_source
+
+	def Copy( self ):
+		"""
+		Returns a new bmesh of the patch as it was when the region was built. The caller owns it.
+		"""
+		sub = self.m_source.copy()
+		sub.verts.ensure_lookup_table()
+		self.m_copies[ id( sub ) ] = [ sub.verts[ i ] for i, v in self.m_outline ]
+		return sub
+
+	def Splice( self, bm, sub ):
+		"""
+		Replaces the patch in bm with sub, a bmesh returned by Copy or the source. Returns dicts that
+		map the verts and faces of sub to their counterparts in bm.
+		"""
+		if self.m_full:
+			return self.__SpliceAll( bm, sub )
+
+		if sub is self.m_source:
+			self.m_source.verts.ensure_lookup_table()
+			sub_outline = [ self.m_source.verts[ i ] for i, v in self.m_outline ]
+		else:
+			sub_outline = self.m_copies.pop( id( sub ) )
+		outline = [ ( sv, v ) for sv, ( i, v ) in zip( sub_outline, self.m_outline ) ]
+
+		#remove the patch by hand, bmesh.ops.delete walks every element of the mesh
+		edges = { e for f in self.m_faces for e in f.edges }
+		edges.update( self.m_edges )
+		verts = { v for e in edges for v in e.verts }
+		for f in self.m_faces:
+			bm.faces.remove( f )
+		for e in edges:
+			if not e.link_faces:
+				bm.edges.remove( e )
+		for v in verts:
+			if not v.link_edges:
+				bm.verts.remove( v )
+
+		layers = LayerCopy( sub, bm )
+		vmap = dict( outline )
+		for v, nv in outline:
+			#an outline vert the tool merged away keeps the position it has in bm
+			if v.is_valid:
+				nv.co = v.co
+				CopyVert( layers, v, nv )
+		for v in sub.verts:
+			if v not in vmap:
+				nv = bm.verts.new( v.co )
+				CopyVert( layers, v, nv )
+				vmap[ v ] = nv
+		emap = {}
+		for e in sub.edges:
+			verts = [ vmap[ v ] for v in e.verts ]
+			ne = bm.edges.get( verts )
+			if ne is None:
+				ne = bm.edges.new( verts )
+			CopyEdge( layers, e, ne )
+			emap[ e ] = ne
+		fmap = {}
+		for f in sub.faces:
+			nf = bm.faces.new( [ vmap[ v ] for v in f.verts ] )
+			CopyFace( layers, f, nf )
+			fmap[ f ] = nf
+		for elem in sub.select_history:
+			mapped = vmap.get( elem, emap.get( elem, fmap.get( elem ) ) )
+			if mapped is not None:
+				bm.select_history.add( mapped )
+
+		self.m_faces = list( fmap.values() )
+		self.m_edges = [ emap[ e ] for e in sub.edges if e.is_wire ]
+		UpdateRegionNormals( bm, [ v for v in vmap.values() ] )
+		return vmap, fmap
+
+	def __SpliceAll( self, bm, sub ):
+		self.m_copies.pop( id( sub ), None )
+		select_mode = bm.select_mode
+		scratch = bpy.data.meshes.new( '.rm_region' )
+		sub.to_mesh( scratch )
+		bm.clear()
+		bm.from_mesh( scratch )
+		bpy.data.meshes.remove( scratch )
+		bm.select_mode = select_mode
+
+		#from_mesh keeps the order of sub, so elements map by index
+		sub.verts.index_update()
+		sub.faces.index_update()
+		bm.verts.ensure_lookup_table()
+		bm.faces.ensure_lookup_table()
+		return IndexMap( bm.verts ), IndexMap( bm.faces )
+
+	def Restore( self, bm ):
+		"""
+		Puts the patch back into bm the way it was when the region was built, at its original indices.
+		Sorting the element sequences moves the elements around in memory, so element refs into bm
+		taken before a Restore point at other elements afterwards.
+		"""
+		if self.m_full:
+			#the whole mesh swap keeps the order of the source, which is a copy of the original
+			self.Splice( bm, self.m_source )
+			return
+
+		vmap, fmap = self.Splice( bm, self.m_source )
+		vert_order, edge_order, face_order = self.m_order
+		outline = { i for i, v in self.m_outline }
+
+		#every index is assigned before the first sort, a sort invalidates the refs in vmap and fmap
+		self.__AssignOrder( bm.verts, { nv : vert_order[ v.index ] for v, nv in vmap.items() if v.index not in outline } )
+		self.__AssignOrder( bm.edges, { bm.edges.get( [ vmap[ v ] for v in e.verts ] ) : edge_order[ e.index ] for e in self.m_source.edges if e.index not in self.m_kept_edges } )
+		self.__AssignOrder( bm.faces, { nf : face_order[ f.index ] for f, nf in fmap.items() } )
+		for seq in ( bm.verts, bm.edges, bm.faces ):
+			seq.sort()
+		self.__Bind( bm )
+
+	def __Bind( self, bm ):
+		#point the region at the patch sitting at its original indices in bm
+		for seq in ( bm.verts, bm.edges, bm.faces ):
+			seq.ensure_lookup_table()
+		vert_order, edge_order, face_order = self.m_order
+		self.m_outline = [ ( i, bm.verts[ vert_order[ i ] ] ) for i, v in self.m_outline ]
+		self.m_faces = [ bm.faces[ i ] for i in face_order ]
+		self.m_edges = [ bm.edges[ edge_order[ e.index ] ] for e in self.m_source.edges if e.is_wire ]
+
+	def __EditMesh( self, mesh ):
+		#the edit bmesh of mesh, with the region moved over to it when an undo replaced the old one
+		bm = bmesh.from_edit_mesh( mesh )
+		if bm is self.m_bmesh:
+			return bm
+		if not self.m_full:
+			if ( len( bm.verts ), len( bm.edges ), len( bm.faces ) ) != self.m_totals:
+				raise ReferenceError( 'the edit mesh of {} no longer holds the region'.format( mesh.name ) )
+			self.__Bind( bm )
+		self.m_bmesh = bm
+		return bm
+
+	@staticmethod
+	def __AssignOrder( seq, targets ):
+		#restored elements get their original index, the rest fill the other slots in the order they
+		#already have. nothing outside of the patch was added or removed, so this is the original order.
+		taken = set( targets.values() )
+		i = 0
+		for elem in seq:
+			index = targets.get( elem )
+			if index is None:
+				while i in taken:
+					i += 1
+				index = i
+				i += 1
+			elem.index = index
+
+	def Commit( self, mesh, sub ):
+		"""
+		Splices sub into the edit mesh of mesh and updates it in place. Returns the maps of Splice.
+		"""
+		maps = self.Splice( self.__EditMesh( mesh ), sub )
+		UpdateEditMesh( mesh )
+		return maps
+
+	def Revert( self, mesh ):
+		"""
+		Restores the patch in the edit mesh of mesh, used when a modal tool is cancelled.
+		"""
+		self.Restore( self.__EditMesh( mesh ) )
+		UpdateEditMesh( mesh )
+
+	def Free( self ):
+		self.m_bmesh = None
+		self.m_faces = []
+		self.m_edges = []
+		self.m_outline = []
+		self.m_order = None
+		self.m_kept_edges = set()
+		self.m_copies.clear()
+		if self.m_source is not None:
+			self.m_source.free()
+			self.m_source = None
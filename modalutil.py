@@ -0,0 +1,88 @@
+import time
+import rmlib
+
+FRAME_BUDGET_RATE = 60.0
+
+
+class FrameBudget():
+	"""
+	Coalesces mouse moves for modal operators. Expensive updates run at most once per frame
+	budget and moves that arrive in between only mark an update as pending, so a heavy tool
+	always works on the latest mouse position instead of a backlog of stale ones. A window
+	timer flushes the pending update once the mouse stops moving.
+	"""
+	def __init__( self, rate=None ):
+		self.m_rate = rate
+		self.m_interval = 1.0 / ( rate or FRAME_BUDGET_RATE )
+		self.m_last = 0.0
+		self.m_pending = False
+		self.m_timer = None
+
+	@property
+	def pending( self ):
+		return self.m_pending
+
+	def Start( self, context ):
+		#the module rate is read on every start so it can be changed without reloading the tools
+		self.Stop( context )
+		self.m_interval = 1.0 / ( self.m_rate or FRAME_BUDGET_RATE )
+		self.m_last = 0.0
+		self.m_pending = False
+		self.m_timer = context.window_manager.event_timer_add( self.m_interval, window=context.window )
+
+	def Stop( self, context ):
+		if self.m_timer is not None:
+			context.window_manager.event_timer_remove( self.m_timer )
+			self.m_timer = None
+		self.m_pending = False
+
+	def Poll( self, event ):
+		"""
+		Returns True if the caller should run its update for this event. Mouse moves inside the
+		budget and timer ticks without a pending move return False. Any other event flushes.
+		"""
+		if event.type == 'INBETWEEN_MOUSEMOVE':
+			return False
+
+		now = time.perf_counter()
+		if event.type == 'MOUSEMOVE':
+			self.m_pending = True
+			if now - self.m_last < self.m_interval:
+				return False
+		elif event.type == 'TIMER':
+			if not self.m_pending or now - self.m_last < self.m_interval:
+				return False
+
+		self.m_pending = False
+		self.m_last = now
+		return True
+
+
+class ViewCache():
+	"""
+	Holds the rmViewport and workplane orientation used by a modal operator and only rebuilds
+	them when the view, region or transform orientation changed since the last event.
+	"""
+	def __init__( self ):
+		self.m_key = None
+		self.m_viewport = None
+		self.m_orientation = None
+
+	def Invalidate( self ):
+		self.m_key = None
+		self.m_viewport = None
+		self.m_orientation = None
+
+	def Update( self, context ):
+		rv3d = context.region_data
+		slot = context.scene.transform_orientation_slots[ 0 ]
+		key = ( tuple( tuple( row ) for row in rv3d.view_matrix ),
+				rv3d.view_perspective,
+				context.region.width,
+				context.region.height,
+				slot.type )
+		if key != self.m_key:
+			self.m_key = key
+			self.m_viewport = rmlib.rmViewport( context )
+			self.m_orientation = rmlib.rmCustomOrientation.from_selection( context )
+		return self.m_viewport, self.m_orientation
@@ -1,6 +1,7 @@
 import mathutils
 import rmlib
 import bpy, bmesh
+from .meshutil import UpdateRegionNormals
 
 def find_furthest( elems, dir_vec, center ):
 	plane_pos = None
@@ -82,7 +83,8 @@ def move_to_furthest( elems, plane_pos, plane_nml, constrain, center, local ):
 				for v in g:
 					dist = mathutils.geometry.distance_point_to_plane( v.co.copy(), plane_pos_objspc, plane_nml_objspc )
 					v.co = v.co.copy() + ( -plane_nml_objspc * dist )
-					
+
+		UpdateRegionNormals( rmmesh.bmesh, [ v for g in groups for v in g ] )
 		bmesh.update_edit_mesh( rmmesh.mesh, loop_triangles=True, destructive=True )
 				
 				
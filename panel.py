@@ -1,5 +1,6 @@
 import bpy
 import rmlib
+from .linear_deformer import GetFalloffCurveNode
 
 
 class VIEW3D_PT_UTILS( bpy.types.Panel ):
@@ -84,6 +85,13 @@ class VIEW3D_PT_MESHEDIT( bpy.types.Panel ):
 		c1.operator( 'wm.call_menu_pie', text='Move To Furthest' ).name = 'VIEW3D_MT_PIE_movetofurthest'
 		c1.operator( 'wm.call_menu_pie', text='Screen Reflect' ).name = 'OBJECT_MT_rm_screenreflect'
 		c1.operator( 'mesh.rm_falloff', text='Falloff Transform' )
+		c1.prop( context.scene.rmkit_props, 'falloff_shape', text='' )
+		c1.prop( context.scene.rmkit_props, 'falloff_cutoff' )
+		curve_node = GetFalloffCurveNode()
+		if curve_node is None:
+			c1.operator( 'mesh.rm_falloffcurve', text='Add Falloff Curve' )
+		else:
+			c1.template_curve_mapping( curve_node, 'mapping' )
 
 		r2 = layout.row()
 		r2.operator( 'mesh.rm_contextbevel', text='Bevel' )
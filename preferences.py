@@ -165,12 +165,16 @@ class RMKITPreferences( bpy.types.AddonPreferences ):
 
 	export_manager_basepath: bpy.props.StringProperty(name='BasePath', default='$SceneDir\\$SceneName_$ObjectName', get=get_basepath, set=set_basepath)
 
+	falloff_history_budget: bpy.props.IntProperty( name='Falloff Undo Budget (MB)', description='Memory budget for the Falloff Transform undo history. Oldest steps are dropped once it is exceeded.', default=64, min=1 )
+
 	v3d_checkbox: bpy.props.BoolProperty( name="3D View", default=False )
 	mesh_checkbox: bpy.props.BoolProperty( name="Mesh", default=False )
 
 	def draw( self, context ):
 		layout = self.layout
 
+		layout.prop( self, 'falloff_history_budget' )
+
 		box = layout.box()
 
 		row_view3d = box.row()
@@ -67,7 +67,35 @@ class RMKitSceneProperties(bpy.types.PropertyGroup):
 	vn_selsetweighted: bpy.props.BoolProperty(
 		name="Area Weights",
 		default=False,
-		description="Use triangle surface area weights when computing for vertex normals."
+		description="Weight face normals by polygon surface area when computing vertex normals."
+	)
+	vn_angleweighted: bpy.props.BoolProperty(
+		name="Angle Weights",
+		default=False,
+		description="Weight face normals by the corner angle at the vertex when computing vertex normals. Combines with Area Weights."
+	)
+	vn_live: bpy.props.BoolProperty(
+		name="Live",
+		default=False,
+		description="Re-apply all selection sets around edited faces whenever the mesh has been idle for a moment. Edits made in edit mode are applied when leaving it. Requires numpy."
+	)
+
+	# Properties from linear_deformer.py
+	falloff_shape: bpy.props.EnumProperty(
+		items=[ ( "LINEAR", "Linear", "Falloff along the handle", 1 ),
+				( "RADIAL", "Radial", "Falloff by screen space distance from the handle start", 2 ),
+				( "SPHERICAL", "Spherical", "Falloff by 3d distance from the handle start", 3 ),
+				( "CYLINDRICAL", "Cylindrical", "Falloff by distance from the workplane z axis through the handle start", 4 ) ],
+		name="Falloff Shape",
+		default="LINEAR"
+	)
+	falloff_cutoff: bpy.props.FloatProperty(
+		name="Influence Cutoff",
+		default=0.0,
+		min=0.0,
+		max=1.0,
+		soft_max=0.25,
+		description="Verts whose falloff weight is at or below this value are left untouched by the Falloff Transform."
 	)
 
 	# Properties from workplane.py
@@ -2,6 +2,8 @@ import bpy
 import bmesh
 import rmlib
 import mathutils
+from .modalutil import FrameBudget
+from .meshutil import MeshRegion
 
 def BridgeSurfaces( bm, faces1, faces2 ):
 	new_faces = rmlib.rmPolygonSet( [] )
@@ -71,10 +73,13 @@ class MESH_OT_thicken( bpy.types.Operator ):
 		default=False
 	)
 
+	def cleanup( self ):
+		if getattr( self, 'region', None ) is not None:
+			self.region.Free()
+			self.region = None
+
 	def cancel( self, context ):
-		if hasattr( self, 'bmesh' ):
-			if self.bmesh is not None:
-				self.bmesh.free()
+		self.cleanup()
 	
 	@classmethod
 	def poll( cls, context ):
@@ -84,9 +89,11 @@ class MESH_OT_thicken( bpy.types.Operator ):
 				context.object.data.is_editmode )
 		
 	def execute( self, context ):
-		bpy.ops.object.mode_set( mode='OBJECT', toggle=False )
-		
-		bm = self.bmesh.copy()
+		if getattr( self, 'region', None ) is None:
+			return { 'CANCELLED' }
+
+		#thicken a copy of the selected faces and their one-ring
+		bm = self.region.Copy()
 
 		polys = rmlib.rmPolygonSet( [ f for f in bm.faces if f.select ] )
 		for g in polys.group():
@@ -125,32 +132,40 @@ class MESH_OT_thicken( bpy.types.Operator ):
 		#delete original geo
 		bmesh.ops.delete( bm, geom=polys, context='FACES' )
 
-		targetMesh = context.active_object.data
-		bm.to_mesh( targetMesh )
-		bm.calc_loop_triangles()
-		targetMesh.update()
+		#stitch the result into the edit mesh
+		self.region.Commit( context.active_object.data, bm )
 		bm.free()
 		
-		bpy.ops.object.mode_set( mode='EDIT', toggle=False )
-		
 		return { 'FINISHED' }
 
 	def modal( self, context, event ):
 		if event.type == 'LEFTMOUSE':
+			if self._budget.pending:
+				self.execute( context )
+			self._budget.Stop( context )
 			return { 'FINISHED' }
 		elif event.type == 'MOUSEMOVE':
 			delta_x = float( event.mouse_x - event.mouse_prev_press_x ) / context.region.width
 			if delta_x != self.prev_delta:
 				self.prev_delta = delta_x
 				self.thickness = delta_x * 4.0
-				self.execute( context )			
+				if self._budget.Poll( event ):
+					self.execute( context )
+		elif event.type == 'TIMER':
+			if self._budget.Poll( event ):
+				self.execute( context )
 		elif event.type == 'ESC':
+			self._budget.Stop( context )
+			self.region.Revert( context.active_object.data )
+			self.cleanup()
 			return { 'CANCELLED' }
 
 		return { 'RUNNING_MODAL' }
 	
 	def invoke( self, context, event ):
-		self.bmesh = None
+		#the region of the previous run is kept for redo until now
+		self.cleanup()
+		self.region = None
 		self.prev_delta = 0
 
 		if context.object is None or context.mode == 'OBJECT':
@@ -166,9 +181,11 @@ class MESH_OT_thicken( bpy.types.Operator ):
 		rmmesh = rmlib.rmMesh.GetActive( context )
 		if rmmesh is not None:
 			with rmmesh as rmmesh:
-				rmmesh.readme = True
-				self.bmesh = rmmesh.bmesh.copy()
-				
+				rmmesh.readonly = True
+				self.region = MeshRegion( rmmesh.bmesh, [ f for f in rmmesh.bmesh.faces if f.select ] )
+
+		self._budget = FrameBudget()
+		self._budget.Start( context )
 		context.window_manager.modal_handler_add( self )
 		return { 'RUNNING_MODAL' }
 
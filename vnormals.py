@@ -1,49 +1,85 @@
 import bpy, bmesh, mathutils
 from bpy.app.handlers import persistent
 import rmlib
-
-CUSTOM_VNORM_LAYERNAME = 'rm_vnorm'
-
-def AddSelSet( polys, selset, value ):
-	for p in polys:
-		current_value = p[selset].decode( 'utf-8' ).strip()
-		contained_selsets = current_value.split( ';' )
-		if value in contained_selsets:
-			continue
-		contained_selsets.append( value )
-		new_value = ''
-		for ss in contained_selsets:
-			if ss == '':
+from .meshutil import REGION_FULL_UPDATE_RATIO
+
+import time
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+CUSTOM_VNORM_LAYERNAME = 'rm_vnorm' #legacy string layer, holds 'SELSET1;SELSET3;' style membership
+VNORM_SELSET_LAYERNAME = 'rm_vnorm_sets' #int layer, one bit per selection set
+MAX_SELSETS = 31 #bits of the signed 32 bit int layer
+
+LIVE_IDLE_DELAY = 0.3 #seconds without depsgraph updates before live mode re-applies vnorms
+LIVE_SELSETS = [ 'SELSET1', 'SELSET2', 'SELSET3' ]
+
+def SelSetMask( value ):
+	"""
+	Bit of the selection set named 'SELSETn', n counts from 1.
+	"""
+	idx = int( value[6:] ) - 1
+	if idx < 0 or idx >= MAX_SELSETS:
+		raise ValueError( 'Selection set {} out of range'.format( value ) )
+	return 1 << idx
+
+def GetSelSetLayer( bm, create=True ):
+	"""
+	Returns the int face layer holding selection set membership. Meshes saved with the legacy string
+	layer are migrated into it and the string layer is removed. If the mesh has neither layer, one is
+	created or None is returned when create is False.
+	"""
+	intlayers = bm.faces.layers.int
+	layer = intlayers.get( VNORM_SELSET_LAYERNAME, None )
+	if layer is not None:
+		return layer
+
+	strlayers = bm.faces.layers.string
+	legacy = strlayers.get( CUSTOM_VNORM_LAYERNAME, None )
+	if legacy is None and not create:
+		return None
+	layer = intlayers.new( VNORM_SELSET_LAYERNAME )
+	if legacy is not None:
+		masks = {}
+		for p in bm.faces:
+			value = p[legacy]
+			if not value:
 				continue
-			new_value += ss + ';'
-		p[selset] = bytes( new_value, 'utf-8' )
+			mask = masks.get( value, None )
+			if mask is None:
+				mask = 0
+				for ss in value.decode( 'utf-8', 'replace' ).strip().split( ';' ):
+					if not ss.startswith( 'SELSET' ):
+						continue
+					#a malformed or out of range token has no set to migrate into, drop it
+					try:
+						mask |= SelSetMask( ss )
+					except ValueError:
+						continue
+				masks[value] = mask
+			p[layer] = mask
+		strlayers.remove( legacy )
+		layer = intlayers[ VNORM_SELSET_LAYERNAME ] #removing a layer invalidates the others
+	return layer
+
+def AddSelSet( polys, selset, mask ):
+	for p in polys:
+		p[selset] |= mask
 		
-def RemoveSelSet( polys, selset, value ):
+def RemoveSelSet( polys, selset, mask ):
+	keep = ~mask
 	for p in polys:
-		current_value = p[selset].decode( 'utf-8' ).strip()
-		contained_selsets = current_value.split( ';' )
-		if value not in contained_selsets:
-			continue
-		new_value = ''
-		for ss in contained_selsets:
-			if ss == '' or ss == value:
-				continue
-			new_value += ss + ';'
-		if value in current_value:
-			p[selset] = bytes( new_value, 'utf-8' )
+		p[selset] &= keep
 		
 def ClearSelSet( polys, selset ):
 	for p in polys:
-		p[selset] = bytes( '', 'utf-8' )
+		p[selset] = 0
 		
-def GetPolysBySelSet( bm, selset, value ):
-	value += ';'
-	member_polys = rmlib.rmPolygonSet()
-	for p in bm.faces:
-		current_value = p[selset].decode( 'utf-8' ).strip()
-		if value in current_value:
-			member_polys.append( p )
-	return member_polys
+def GetPolysBySelSet( bm, selset, mask ):
+	return rmlib.rmPolygonSet( p for p in bm.faces if p[selset] & mask )
 	
 
 class MESH_OT_setvnormselset( bpy.types.Operator ):    
@@ -87,22 +123,20 @@ class MESH_OT_setvnormselset( bpy.types.Operator ):
 		rmmesh = rmlib.rmMesh.GetActive( context )
 		with rmmesh as rmmesh:
 
-			strlayers = rmmesh.bmesh.faces.layers.string
-			selset = strlayers.get( CUSTOM_VNORM_LAYERNAME, None )
-			if selset is None:
-				selset = strlayers.new( CUSTOM_VNORM_LAYERNAME )
+			selset = GetSelSetLayer( rmmesh.bmesh )
 			rmmesh.bmesh.faces.ensure_lookup_table()
 
-			if self.override:
+			#CLEAR is not a set of its own, there is nothing to take the other faces out of
+			if self.override and self.selset != 'CLEAR':
 				overridden_polys = rmlib.rmPolygonSet.from_mesh( rmmesh, filter_hidden=True )
-				RemoveSelSet( overridden_polys, selset, self.selset )
+				RemoveSelSet( overridden_polys, selset, SelSetMask( self.selset ) )
 			
 			polys = rmlib.rmPolygonSet.from_selection( rmmesh )
 				
 			if self.selset == 'CLEAR':
 				ClearSelSet( polys, selset )
 			else:
-				AddSelSet( polys, selset, self.selset )
+				AddSelSet( polys, selset, SelSetMask( self.selset ) )
 			
 		return { 'FINISHED' }
 	
@@ -141,15 +175,11 @@ class MESH_OT_removevnormselset( bpy.types.Operator ):
 
 		rmmesh = rmlib.rmMesh.GetActive( context )
 		with rmmesh as rmmesh:
-			strlayers = rmmesh.bmesh.faces.layers.string
-			selset = strlayers.get( CUSTOM_VNORM_LAYERNAME, None )
-			if selset is None:
-				selset = strlayers.new( CUSTOM_VNORM_LAYERNAME )
+			selset = GetSelSetLayer( rmmesh.bmesh )
 			rmmesh.bmesh.faces.ensure_lookup_table()
 
 			polys = rmlib.rmPolygonSet.from_selection( rmmesh )
-				
-			RemoveSelSet( polys, selset, self.selset )
+			RemoveSelSet( polys, selset, SelSetMask( self.selset ) )
 			
 		return { 'FINISHED' }
 	
@@ -191,13 +221,10 @@ class MESH_OT_selectvnormselset( bpy.types.Operator ):
 			for f in rmmesh.bmesh.faces:
 				f.select = False
 
-			strlayers = rmmesh.bmesh.faces.layers.string
-			selset = strlayers.get( CUSTOM_VNORM_LAYERNAME, None )
-			if selset is None:
-				selset = strlayers.new( CUSTOM_VNORM_LAYERNAME )
+			selset = GetSelSetLayer( rmmesh.bmesh )
 			rmmesh.bmesh.faces.ensure_lookup_table()
 				
-			polys = GetPolysBySelSet( rmmesh.bmesh, selset, self.selset )
+			polys = GetPolysBySelSet( rmmesh.bmesh, selset, SelSetMask( self.selset ) )
 			for p in polys:
 				p.select = True
 			
@@ -248,62 +275,275 @@ def GetSortedLoops( vert ):
 
 	return sorted_loops
 
-def ApplyVNorms( context, selset ):
-	if context.object is None or context.mode == 'OBJECT':
-		return { 'CANCELLED' }
-	
-	if context.object.type != 'MESH':
-		return { 'CANCELLED' }
-
-	bpy.ops.object.mode_set( mode='OBJECT', toggle=False )
-
-	weighted = context.scene.rmkit_props.vn_selsetweighted
-	
-	#use rmmesh interface to init vnorms
+def SolveVNormsBMesh( context, masks, area_weighted, angle_weighted ):
+	"""
+	Per vert fan walk over the bmesh of the active object. Returns the loop normals as a list of
+	vectors, empty if the mesh has no selection sets.
+	"""
 	vnorms = []
 	rmmesh = rmlib.rmMesh.GetActive( context )
 	with rmmesh as rmmesh:
 		rmmesh.readonly = True
 		
 		#get selset layer
-		str_layer = rmmesh.bmesh.faces.layers.string.get( CUSTOM_VNORM_LAYERNAME, None )
-		if str_layer is not None:
-			#set smoothing on mesh object to make custom vnorms visible
-			if bpy.app.version < (4,0,0):
-				rmmesh.mesh.use_auto_smooth = True
-				rmmesh.mesh.create_normals_split()
+		selset_layer = GetSelSetLayer( rmmesh.bmesh, create=False )
+		if selset_layer is None:
+			return vnorms
 			
-			vnorms = [ mathutils.Vector( loop.normal ) for loop in rmmesh.mesh.loops ]
-				
-			#store all pidxs and vertices for this selset
-			vertices = set()
-			selset_pidxs = set()
+		vnorms = [ mathutils.Vector( loop.normal ) for loop in rmmesh.mesh.loops ]
 
-			for p in GetPolysBySelSet( rmmesh.bmesh, str_layer, selset ):
-				vertices |= set( p.verts )
-				selset_pidxs.add( p.index )
-			
-			for v in vertices:					
-				#compute the vnorm for this poly group. a group is all polys that link a vert broken up by sharp edges
-				loop_group = []
-				for loop in GetSortedLoops( v ):
-					if not loop.edge.smooth or loop.edge.is_boundary :
-						nml = loopgroupnormal( loop_group, weighted, selset_pidxs )
-						if nml.length > 0.0:
-							for l in loop_group:
-								vnorms[l.index] = nml							
-						loop_group.clear()
-
-					loop_group.append( loop )
-					
-				if len( loop_group ) > 0:
-					nml = loopgroupnormal( loop_group, weighted, selset_pidxs )
-					if nml.length > 0.0:
+		#face normals, scaled by face area for area weights, computed once for every fan they are in
+		rmmesh.bmesh.faces.index_update()
+		if area_weighted:
+			face_normals = [ f.normal * f.calc_area() for f in rmmesh.bmesh.faces ]
+		else:
+			face_normals = [ f.normal.copy() for f in rmmesh.bmesh.faces ]
+
+		any_mask = 0
+		for mask in masks:
+			any_mask |= mask
+
+		#store all vertices of any selset
+		vertices = set()
+		for p in GetPolysBySelSet( rmmesh.bmesh, selset_layer, any_mask ):
+			vertices |= set( p.verts )
+		
+		for v in vertices:					
+			#compute the vnorm for this poly group. a group is all polys that link a vert broken up by sharp edges
+			loop_group = []
+			for loop in GetSortedLoops( v ):
+				if not loop.edge.smooth or loop.edge.is_boundary :
+					nml = loopgroupnormal( loop_group, face_normals, angle_weighted, selset_layer, masks )
+					if nml is not None:
 						for l in loop_group:
-							vnorms[l.index] = nml
+							vnorms[l.index] = nml							
+					loop_group.clear()
+
+				loop_group.append( loop )
+				
+			if len( loop_group ) > 0:
+				nml = loopgroupnormal( loop_group, face_normals, angle_weighted, selset_layer, masks )
+				if nml is not None:
+					for l in loop_group:
+						vnorms[l.index] = nml
+
+	return vnorms
+
+def FanLabels( count, a, b ):
+	"""
+	Union-find over count loops joined pairwise by the index arrays a and b. Returns the root label of
+	every loop, roots are the smallest loop index of their set.
+	"""
+	labels = np.arange( count )
+	while True:
+		la = labels[a]
+		lb = labels[b]
+		split = la != lb
+		if not split.any():
+			return labels
+		a = a[split]
+		b = b[split]
+		lo = np.minimum( la[split], lb[split] )
+		hi = np.maximum( la[split], lb[split] )
+
+		#hook the larger root under the smaller one, then flatten every chain down to its root
+		np.minimum.at( labels, hi, lo )
+		while True:
+			jumped = labels[labels]
+			if np.array_equal( jumped, labels ):
+				break
+			labels = jumped
+
+def SolveVNorms( mesh, masks, area_weighted, angle_weighted ):
+	"""
+	Vectorized solve of the same loop normals as SolveVNormsBMesh. Mesh data is read in bulk, the
+	smoothing fans are labeled by a union-find of the corners of each vert across its smooth manifold
+	edges and the member face normals are summed per fan by scatter-add. Returns an array of loop
+	normals with one row per loop.
+	"""
+	loop_count = len( mesh.loops )
+	edge_count = len( mesh.edges )
+	face_count = len( mesh.polygons )
+
+	vnorms = np.empty( loop_count * 3, dtype=np.float32 )
+	if hasattr( mesh, 'corner_normals' ):
+		mesh.corner_normals.foreach_get( 'vector', vnorms )
+	else:
+		mesh.loops.foreach_get( 'normal', vnorms )
+	vnorms = vnorms.reshape( -1, 3 )
+
+	face_masks = np.empty( face_count, dtype=np.int32 )
+	mesh.attributes[ VNORM_SELSET_LAYERNAME ].data.foreach_get( 'value', face_masks )
+	any_mask = 0
+	for mask in masks:
+		any_mask |= mask
+	if not np.any( face_masks & any_mask ):
+		return vnorms
+
+	loop_vert = np.empty( loop_count, dtype=np.int32 )
+	mesh.loops.foreach_get( 'vertex_index', loop_vert )
+	loop_edge = np.empty( loop_count, dtype=np.int32 )
+	mesh.loops.foreach_get( 'edge_index', loop_edge )
+	loop_start = np.empty( face_count, dtype=np.int32 )
+	mesh.polygons.foreach_get( 'loop_start', loop_start )
+	loop_total = np.empty( face_count, dtype=np.int32 )
+	mesh.polygons.foreach_get( 'loop_total', loop_total )
+	sharp = np.empty( edge_count, dtype=bool )
+	mesh.edges.foreach_get( 'use_edge_sharp', sharp )
+
+	loop_face = np.repeat( np.arange( face_count ), loop_total )
+	loop_next = np.arange( 1, loop_count + 1 )
+	loop_next[ loop_start + loop_total - 1 ] = loop_start
+
+	#the two loops of every smooth manifold edge. At each end of the edge the corners of both faces
+	#on that end vert are joined, which also holds when the faces are wound inconsistently.
+	edge_loop_count = np.bincount( loop_edge, minlength=edge_count )
+	edge_first = np.cumsum( edge_loop_count ) - edge_loop_count
+	by_edge = np.argsort( loop_edge, kind='stable' )
+	smooth = np.flatnonzero( ( edge_loop_count == 2 ) & ~sharp )
+	l1 = by_edge[ edge_first[smooth] ]
+	l2 = by_edge[ edge_first[smooth] + 1 ]
+	same = loop_vert[l1] == loop_vert[l2]
+	a = np.concatenate( ( l1, loop_next[l1] ) )
+	b = np.concatenate( ( np.where( same, l2, loop_next[l2] ), np.where( same, loop_next[l2], l2 ) ) )
+	fans = FanLabels( loop_count, a, b )
+
+	face_normals = np.empty( face_count * 3, dtype=np.float32 )
+	mesh.polygons.foreach_get( 'normal', face_normals )
+	face_normals = face_normals.reshape( -1, 3 ).astype( np.float64 )
+	if area_weighted:
+		face_area = np.empty( face_count, dtype=np.float32 )
+		mesh.polygons.foreach_get( 'area', face_area )
+		face_normals *= face_area[:,None]
+	loop_normals = face_normals[loop_face]
+	if angle_weighted:
+		#angle between the two edges of every corner
+		co = np.empty( len( mesh.vertices ) * 3, dtype=np.float32 )
+		mesh.vertices.foreach_get( 'co', co )
+		co = co.reshape( -1, 3 ).astype( np.float64 )
+		loop_prev = np.arange( -1, loop_count - 1 )
+		loop_prev[loop_start] = loop_start + loop_total - 1
+		corner = co[loop_vert]
+		u = co[ loop_vert[loop_prev] ] - corner
+		v = co[ loop_vert[loop_next] ] - corner
+		angle = np.arctan2( np.linalg.norm( np.cross( u, v ), axis=1 ), np.einsum( 'ij,ij->i', u, v ) )
+		loop_normals *= angle[:,None]
+	loop_masks = face_masks[loop_face]
+
+	#lowest priority first so later sets overwrite the fans they also reach
+	fan_normals = np.zeros( ( loop_count, 3 ) )
+	solved = np.zeros( loop_count, dtype=bool )
+	for mask in reversed( masks ):
+		member = ( loop_masks & mask ) != 0
+		if not member.any():
+			continue
+		sums = np.empty( ( loop_count, 3 ) )
+		for axis in range( 3 ):
+			sums[:,axis] = np.bincount( fans, weights=np.where( member, loop_normals[:,axis], 0.0 ), minlength=loop_count )
+		length = np.linalg.norm( sums, axis=1 )
+		hit = length > 0.0
+		fan_normals[hit] = sums[hit] / length[hit,None]
+		solved |= hit
+
+	hit = solved[fans]
+	vnorms[hit] = fan_normals[ fans[hit] ]
+	return vnorms
+
+def SolveVNormsPatch( mesh, snapshot, dirty_verts, masks, area_weighted, angle_weighted ):
+	"""
+	Re-solves the fans of the dirty verts of mesh and writes them straight into its custom normal
+	attribute. The faces around the dirty verts are copied into a scratch mesh, which holds every fan
+	of those verts whole, so solving and encoding them there gives the same custom normal data as
+	doing it on the whole mesh. Returns False when the mesh has no custom normal attribute to patch
+	or the patch would cover most of it, the caller solves the whole mesh then.
+	"""
+	attr = mesh.attributes.get( 'custom_normal', None )
+	if attr is None or attr.domain != 'CORNER' or attr.data_type != 'INT16_2D':
+		return False
+
+	loop_total = snapshot.loop_total
+	loop_start = np.cumsum( loop_total ) - loop_total
+	loop_face = np.repeat( np.arange( len( loop_total ) ), loop_total )
+	faces = np.unique( loop_face[ dirty_verts[snapshot.loop_vert] ] )
+	if len( faces ) > len( loop_total ) * REGION_FULL_UPDATE_RATIO:
+		return False
+
+	#loops of the patch faces, kept in mesh order so the fans get encoded from the same start corner
+	patch_total = loop_total[faces]
+	patch_start = np.cumsum( patch_total ) - patch_total
+	patch_loops = np.repeat( loop_start[faces] - patch_start, patch_total ) + np.arange( patch_total.sum() )
+	verts, patch_loop_vert = np.unique( snapshot.loop_vert[patch_loops], return_inverse=True )
+
+	patch = bpy.data.meshes.new( '.rm_vnorm_patch' )
+	patch.vertices.add( len( verts ) )
+	patch.vertices.foreach_set( 'co', snapshot.co[verts].ravel() )
+	patch.loops.add( len( patch_loops ) )
+	patch.loops.foreach_set( 'vertex_index', patch_loop_vert.astype( np.int32 ) )
+	patch.polygons.add( len( faces ) )
+	patch.polygons.foreach_set( 'loop_start', patch_start.astype( np.int32 ) )
+	patch.update( calc_edges=True )
+	patch.polygons.foreach_set( 'use_smooth', ~snapshot.flat[faces] )
+	patch_loop_edge = np.empty( len( patch_loops ), dtype=np.int32 )
+	patch.loops.foreach_get( 'edge_index', patch_loop_edge )
+	patch_sharp = np.zeros( len( patch.edges ), dtype=bool )
+	patch_sharp[patch_loop_edge] = snapshot.sharp[ snapshot.loop_edge[patch_loops] ]
+	patch.edges.foreach_set( 'use_edge_sharp', patch_sharp )
+	patch.attributes.new( VNORM_SELSET_LAYERNAME, 'INT', 'FACE' ).data.foreach_set( 'value', snapshot.face_masks[faces] )
+
+	#the stored custom normals come along so fans outside of every set keep their current normal
+	stored = np.empty( len( snapshot.loop_vert ) * 2, dtype=np.int16 )
+	attr.data.foreach_get( 'value', stored )
+	stored = stored.reshape( -1, 2 )
+	patch.attributes.new( 'custom_normal', 'INT16_2D', 'CORNER' ).data.foreach_set( 'value', stored[patch_loops].ravel() )
+	patch.normals_split_custom_set( SolveVNorms( patch, masks, area_weighted, angle_weighted ) )
+	encoded = np.empty( len( patch_loops ) * 2, dtype=np.int16 )
+	patch.attributes[ 'custom_normal' ].data.foreach_get( 'value', encoded )
+	bpy.data.meshes.remove( patch )
+
+	#only the corners of the dirty verts have whole fans in the patch
+	written = dirty_verts[ snapshot.loop_vert[patch_loops] ]
+	stored[ patch_loops[written] ] = encoded.reshape( -1, 2 )[written]
+	attr.data.foreach_set( 'value', stored.ravel() )
+	mesh.update()
+	return True
+
+def EnableCustomNormals( mesh ):
+	#set smoothing on mesh object to make custom vnorms visible
+	if bpy.app.version < (4,0,0):
+		mesh.use_auto_smooth = True
+		mesh.create_normals_split()
+
+def ApplyVNorms( context, selsets ):
+	"""
+	Generates split normals from face membership to the selsets in one pass. Where sets overlap on a
+	loop group the later set in selsets wins, same as applying them one after the other.
+	"""
+	if context.object is None or context.mode == 'OBJECT':
+		return { 'CANCELLED' }
+	
+	if context.object.type != 'MESH':
+		return { 'CANCELLED' }
+
+	bpy.ops.object.mode_set( mode='OBJECT', toggle=False )
+
+	area_weighted = context.scene.rmkit_props.vn_selsetweighted
+	angle_weighted = context.scene.rmkit_props.vn_angleweighted
+
+	#masks in priority order, highest first
+	masks = [ SelSetMask( selset ) for selset in reversed( selsets ) ]
+
+	mesh = context.active_object.data
+	has_sets = mesh.attributes.get( VNORM_SELSET_LAYERNAME ) is not None
+	if has_sets or CUSTOM_VNORM_LAYERNAME in mesh.attributes:
+		EnableCustomNormals( mesh )
+
+	#the legacy string layer is only migrated through the bmesh
+	if np is not None and has_sets:
+		vnorms = SolveVNorms( mesh, masks, area_weighted, angle_weighted )
+	else:
+		vnorms = SolveVNormsBMesh( context, masks, area_weighted, angle_weighted )
 
 	if len( vnorms ) > 0:
-		mesh = context.active_object.data
 		mesh.normals_split_custom_set( vnorms )
 		mesh.update()
 	
@@ -333,7 +573,7 @@ class MESH_OT_applyvnorms( bpy.types.Operator ):
 				context.object.data.is_editmode )
 		
 	def execute( self, context ):
-		return ApplyVNorms( context, self.selset )
+		return ApplyVNorms( context, [ self.selset ] )
 	
 class MESH_OT_applyall( bpy.types.Operator ):
 	"""Generated Split Normals based on face membership to all selection sets."""
@@ -349,36 +589,193 @@ class MESH_OT_applyall( bpy.types.Operator ):
 				context.object.data.is_editmode )
 		
 	def execute( self, context ):
-		ApplyVNorms( context, 'SELSET1' )
-		ApplyVNorms( context, 'SELSET2' )
-		ApplyVNorms( context, 'SELSET3' )
-		return { 'FINISHED' }
+		return ApplyVNorms( context, LIVE_SELSETS )
 	
-def FaceSurfaceArea( f ):
-	area = 0.0
-	verts = f.verts
-	if len(verts) < 3:
-		return area
-
-	# Calculate the area using the shoelace formula for polygons
-	for i in range(len(verts)):
-		v1 = verts[i].co
-		v2 = verts[(i + 1) % len(verts)].co
-		area += v1.cross(v2).length / 2.0
-
-	return area
-
-def loopgroupnormal( loops, weighted, member_pidxs ):
-	avg = mathutils.Vector( ( 0.0, 0.0, 0.0 ) )
+def loopgroupnormal( loops, face_normals, angle_weighted, selset_layer, masks ):
+	"""
+	Normal of the loop group from the faces in the first of masks that has a non zero sum over the
+	group, None if there is no such set. The sums of all sets are accumulated in one walk of the loops.
+	face_normals holds the normal of every face by index, already scaled when area weighted.
+	"""
+	sums = [ mathutils.Vector( ( 0.0, 0.0, 0.0 ) ) for mask in masks ]
 	for l in loops:
 		f = l.face
-		if f.index not in member_pidxs:
+		face_mask = f[selset_layer]
+		if not face_mask:
 			continue
-		if weighted:
-			avg += f.normal.copy() * FaceSurfaceArea( f )
-		else:
-			avg += f.normal.copy()
-	return avg.normalized()
+		nml = face_normals[f.index]
+		if angle_weighted:
+			nml = nml * l.calc_angle()
+		for i, mask in enumerate( masks ):
+			if face_mask & mask:
+				sums[i] += nml
+	for avg in sums:
+		avg = avg.normalized()
+		if avg.length > 0.0:
+			return avg
+	return None
+
+def ReadAttribute( mesh, name, count, dtype, prop='value', width=1 ):
+	"""
+	Bulk read of a generic mesh attribute. Optional attributes like sharp_edge that are missing read
+	as zero.
+	"""
+	values = np.zeros( count * width, dtype=dtype )
+	attr = mesh.attributes.get( name, None )
+	if attr is not None:
+		attr.data.foreach_get( prop, values )
+	if width > 1:
+		values = values.reshape( -1, width )
+	return values
+
+class VNormSnapshot( object ):
+	"""
+	The mesh data a live apply solved from. Diffing two snapshots gives the verts whose fans have to
+	be solved again.
+	"""
+	__slots__ = ( 'co', 'loop_vert', 'loop_edge', 'loop_total', 'face_masks', 'flat', 'sharp' )
+
+	def __init__( self, mesh ):
+		#generic attributes are read in bulk, the loop and edge properties go through rna per element
+		self.co = ReadAttribute( mesh, 'position', len( mesh.vertices ), np.float32, 'vector', 3 )
+		self.loop_vert = ReadAttribute( mesh, '.corner_vert', len( mesh.loops ), np.int32 )
+		self.loop_edge = ReadAttribute( mesh, '.corner_edge', len( mesh.loops ), np.int32 )
+		loop_start = np.empty( len( mesh.polygons ) + 1, dtype=np.int32 )
+		mesh.polygons.foreach_get( 'loop_start', loop_start[:-1] )
+		loop_start[-1] = len( mesh.loops )
+		self.loop_total = np.diff( loop_start )
+		self.face_masks = ReadAttribute( mesh, VNORM_SELSET_LAYERNAME, len( mesh.polygons ), np.int32 )
+		self.flat = ReadAttribute( mesh, 'sharp_face', len( mesh.polygons ), bool )
+		self.sharp = ReadAttribute( mesh, 'sharp_edge', len( mesh.edges ), bool )
+
+	def DirtyVerts( self, prev ):
+		"""
+		Flags the verts whose fans changed since prev. Returns None when there is no prev or the
+		topology changed, then every fan has to be solved.
+		"""
+		if ( prev is None or len( self.co ) != len( prev.co ) or
+				not np.array_equal( self.loop_total, prev.loop_total ) or
+				not np.array_equal( self.loop_vert, prev.loop_vert ) or
+				not np.array_equal( self.loop_edge, prev.loop_edge ) ):
+			return None
+
+		loop_face = np.repeat( np.arange( len( self.loop_total ) ), self.loop_total )
+
+		#faces that changed membership or smoothing or have a moved vert, moving a vert changes the
+		#normal, area and corner angles of every face around it
+		dirty_faces = ( self.face_masks != prev.face_masks ) | ( self.flat != prev.flat )
+		moved = np.any( self.co != prev.co, axis=1 )
+		dirty_faces[ loop_face[ moved[self.loop_vert] ] ] = True
+		dirty_verts = np.zeros( len( self.co ), dtype=bool )
+		dirty_verts[ self.loop_vert[ dirty_faces[loop_face] ] ] = True
+
+		#toggling a sharp edge splits or joins the fans at both of its ends
+		resharpened = ( self.sharp != prev.sharp )[self.loop_edge]
+		if resharpened.any():
+			loop_start = np.cumsum( self.loop_total ) - self.loop_total
+			loop_next = np.arange( 1, len( self.loop_vert ) + 1 )
+			loop_next[ loop_start + self.loop_total - 1 ] = loop_start
+			dirty_verts[ self.loop_vert[resharpened] ] = True
+			dirty_verts[ self.loop_vert[ loop_next[resharpened] ] ] = True
+
+		return dirty_verts
+
+
+class LiveVNorms( object ):
+	"""
+	Live mode of the VNormal Kit. The depsgraph handler only records which objects changed. Once
+	there were no updates for LIVE_IDLE_DELAY the fans around whatever changed since the last live
+	apply are solved again with all selection sets and patched into the custom normals. Custom
+	normals can't be written to an edit mesh, objects in edit mode wait until they leave it.
+	"""
+	def __init__( self ):
+		self.pending = set()
+		self.snapshots = {}
+		self.last_update = 0.0
+
+	def Touch( self, obj ):
+		self.pending.add( obj.name )
+		self.last_update = time.perf_counter()
+		if not bpy.app.timers.is_registered( live_vnorms_timer ):
+			bpy.app.timers.register( live_vnorms_timer, first_interval=LIVE_IDLE_DELAY )
+
+	def Tick( self ):
+		"""
+		Timer callback, returns the seconds until the next call or None once flushed.
+		"""
+		if np is None or not bpy.context.scene.rmkit_props.vn_live:
+			#live was switched off while the timer was queued, drop what was waiting for it
+			self.pending.clear()
+			return None
+		idle = time.perf_counter() - self.last_update
+		if idle < LIVE_IDLE_DELAY:
+			return LIVE_IDLE_DELAY - idle
+		if ModalRunning( bpy.context ):
+			return LIVE_IDLE_DELAY
+		names = self.pending
+		self.pending = set()
+		deferred = self.Flush( bpy.context, [ bpy.data.objects.get( name ) for name in names ] )
+		#leaving edit mode updates the object, which touches it again
+		self.pending.update( obj.name for obj in deferred )
+		return None
+
+	def Flush( self, context, objects ):
+		"""
+		Re-solves the dirty fans of objects. Returns the objects left for later because they are in
+		edit mode. The updates caused by the live apply itself find nothing to do.
+		"""
+		props = context.scene.rmkit_props
+		masks = [ SelSetMask( selset ) for selset in reversed( LIVE_SELSETS ) ]
+		deferred = []
+		for obj in objects:
+			if obj is None or obj.type != 'MESH':
+				continue
+			if obj.mode == 'EDIT':
+				deferred.append( obj )
+				continue
+			mesh = obj.data
+			if mesh.attributes.get( VNORM_SELSET_LAYERNAME ) is None:
+				continue
+			snapshot = VNormSnapshot( mesh )
+			dirty_verts = snapshot.DirtyVerts( self.snapshots.get( mesh.name_full, None ) )
+			if dirty_verts is not None and not dirty_verts.any():
+				continue
+			EnableCustomNormals( mesh )
+			if dirty_verts is None or not SolveVNormsPatch( mesh, snapshot, dirty_verts, masks, props.vn_selsetweighted, props.vn_angleweighted ):
+				mesh.normals_split_custom_set( SolveVNorms( mesh, masks, props.vn_selsetweighted, props.vn_angleweighted ) )
+				mesh.update()
+			self.snapshots[ mesh.name_full ] = snapshot
+		return deferred
+
+	def Clear( self ):
+		self.pending.clear()
+		self.snapshots.clear()
+		if bpy.app.timers.is_registered( live_vnorms_timer ):
+			bpy.app.timers.unregister( live_vnorms_timer )
+
+
+live_vnorms = LiveVNorms()
+
+def live_vnorms_timer():
+	return live_vnorms.Tick()
+
+def ModalRunning( context ):
+	#modal tools hold references into the meshes they edit, live applies wait until they finished
+	for window in context.window_manager.windows:
+		if len( getattr( window, 'modal_operators', () ) ) > 0:
+			return True
+	return False
+
+@persistent
+def vnorm_live_update( scene, depsgraph ):
+	if np is None or not scene.rmkit_props.vn_live:
+		return
+	for update in depsgraph.updates:
+		if not update.is_updated_geometry:
+			continue
+		obj = update.id.original
+		if isinstance( obj, bpy.types.Object ) and obj.type == 'MESH':
+			live_vnorms.Touch( obj )
 
 def redraw_view3d( context ):
 	for window in context.window_manager.windows:
@@ -402,6 +799,10 @@ class VIEW3D_PT_VNORMS( bpy.types.Panel ):
 
 		row_override = box.row()
 		row_override.prop( context.scene.rmkit_props, 'vn_selsetweighted', toggle=1 )
+		row_override.prop( context.scene.rmkit_props, 'vn_angleweighted', toggle=1 )
+		row_live = row_override.row()
+		row_live.prop( context.scene.rmkit_props, 'vn_live', toggle=1 )
+		row_live.enabled = np is not None
 		row_override.alignment = 'LEFT'
 
 		row_selset1 = box.row()
@@ -456,6 +857,7 @@ def register():
 	bpy.utils.register_class( MESH_OT_applyvnorms )
 	bpy.utils.register_class( MESH_OT_applyall )
 	bpy.utils.register_class( VIEW3D_PT_VNORMS )
+	bpy.app.handlers.depsgraph_update_post.append( vnorm_live_update )
 	
 
 def unregister():
@@ -464,4 +866,7 @@ def unregister():
 	bpy.utils.unregister_class( MESH_OT_selectvnormselset )
 	bpy.utils.unregister_class( MESH_OT_applyvnorms )
 	bpy.utils.unregister_class( MESH_OT_applyall )
-	bpy.utils.unregister_class( VIEW3D_PT_VNORMS )
\ No newline at end of file
+	bpy.utils.unregister_class( VIEW3D_PT_VNORMS )
+	if vnorm_live_update in bpy.app.handlers.depsgraph_update_post:
+		bpy.app.handlers.depsgraph_update_post.remove( vnorm_live_update )
+	live_vnorms.Clear()
\ No newline at end of file